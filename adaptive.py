@@ -0,0 +1,90 @@
+import threading
+import time
+
+
+class AIMDController:
+    """Additive-increase / multiplicative-decrease control of concurrency and pacing.
+
+    Every completed request is reported with its latency and outcome. After a full
+    window of healthy requests the controller allows one more request in flight and
+    shortens the pause between requests. A timeout, error, blocked page or latency
+    above the target halves the concurrency and doubles the pause. Only one decrease
+    happens per window, since the requests already in flight were sent at the old
+    rate and report the same congestion.
+    """
+    def __init__(self, min_limit=1, max_limit=2, min_delay=0.0, max_delay=30.0, initial_delay=None,
+                 target_latency=10.0, decrease_factor=0.5, delay_step=0.5):
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.min_delay = max(0.0, float(min_delay))
+        self.max_delay = max(self.min_delay, float(max_delay))
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.delay_step = delay_step
+        self.limit = self.min_limit
+        delay = self.min_delay if initial_delay is None else float(initial_delay)
+        self.delay = min(self.max_delay, max(self.min_delay, delay))
+        self.in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self._healthy = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Block until another request may start; returns its start time for record()"""
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def record(self, started, latency, ok=True, throttled=False):
+        """Report a finished request that started at `started` (from acquire)"""
+        with self._condition:
+            congested = not ok or throttled or (self.target_latency and latency > self.target_latency)
+            if congested:
+                self._healthy = 0
+                if started >= self._last_decrease:
+                    self.limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+                    self.delay = min(self.max_delay, max(self.delay * 2, self.delay_step, self.min_delay))
+                    self._last_decrease = time.monotonic()
+                    self.decreases += 1
+                return
+            self._healthy += 1
+            if self._healthy >= self.limit:
+                self._healthy = 0
+                if self.limit < self.max_limit:
+                    self.limit += 1
+                    self._condition.notify()
+                self.delay = max(self.min_delay, self.delay - self.delay_step)
+                self.increases += 1
+
+    def state(self):
+        return {'limit': self.limit, 'delay': round(self.delay, 2), 'in_flight': self.in_flight}
+
+
+def subpage_browser_limit(config):
+    """Most browsers a job may use for subpages at once, its own driver included.
+
+    This is the subpage controller's max_concurrency, capped by the job's browser_slots
+    when the server's scheduler granted it fewer.
+    """
+    settings = config.get("concurrent_settings", {})
+    bounds = settings.get("adaptive_concurrency", {})
+    if bounds is False:
+        return 1
+    limit = int(bounds.get("max_concurrency", settings.get("max_concurrent_requests", 2)))
+    if config.get("browser_slots"):
+        limit = min(limit, int(config["browser_slots"]))
+    return max(1, limit)
+
+
+def job_browser_demand(config):
+    """Browsers a job with this config can use at once"""
+    return subpage_browser_limit(config) if config.get("scrape_subpages") else 1
@@ -0,0 +1,54 @@
+"""Stand-in for scrap.py that produces log output at a fixed rate without a browser.
+
+The load test points the server's SCRAPER_COMMAND at this script. Every line
+carries the wall-clock time it was printed (`t=<epoch seconds>`), so clients can
+measure how long it took to reach them. The job's config is read for its output
+paths and a small results file is written, so the job finishes like a real one.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from results import write_json_rows  # noqa: E402
+
+TICK = 0.01
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake scraper for server load tests')
+    parser.add_argument('--config', required=True)
+    parser.add_argument('--lines-per-second', type=float, default=20)
+    parser.add_argument('--duration', type=float, default=10, help='Seconds to keep logging')
+    parser.add_argument('--line-bytes', type=int, default=120, help='Approximate length of each line')
+    parser.add_argument('--items', type=int, default=100, help='Rows written to the results file')
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    started = time.time()
+    total = int(args.lines_per_second * args.duration)
+    sent = 0
+    while sent < total:
+        # Emit whatever is due since the start, so the rate holds even when ticks run late
+        due = min(total, int((time.time() - started) * args.lines_per_second) + 1)
+        while sent < due:
+            sent += 1
+            line = f"[fake] line {sent}/{total} t={time.time():.6f} "
+            print(line.ljust(args.line_bytes, '.'), flush=True)
+        time.sleep(TICK)
+
+    output_json = config.get('output_json')
+    if output_json:
+        os.makedirs(os.path.dirname(output_json) or '.', exist_ok=True)
+        write_json_rows(output_json, [{'title': f"Item {n}", 'price': f"{n}.00"} for n in range(1, args.items + 1)])
+    print(f"[SUCCESS] Scraping complete. {args.items} items scraped.", flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""Local HTTP server generating synthetic sites for the scraper benchmarks.
+
+Every layout serves the same deterministic catalogue of items, so runs are
+comparable across commits:
+
+    /url/page/<n>/   grid paginated by URL, with numbered page links
+    /click/          grid paginated by a "Next" button that swaps rows in place
+    /scroll/         card list that appends the next batch when scrolled to the bottom
+    /load-more/      card list that appends the next batch on a "Load more" button
+    /detail/<id>     item detail page with label-based form-group fields
+    /api/rows        one batch of rows or cards, fetched by the scripted layouts
+
+Each response is delayed by `latency` seconds plus up to +/- `jitter`, drawn
+from a seeded generator.
+"""
+import argparse
+import html
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CATEGORIES = ('Tools', 'Garden', 'Kitchen', 'Office', 'Toys')
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+<h1>{title}</h1>
+{body}
+</body>
+</html>
+"""
+
+# Fetches batch n of the current layout and hands its HTML to a callback
+FETCH_SCRIPT = """
+<script>
+var totalPages = {pages};
+function fetchBatch(page, layout, done) {{
+  var xhr = new XMLHttpRequest();
+  xhr.open('GET', '/api/rows?page=' + page + '&layout=' + layout);
+  xhr.onload = function () {{ done(xhr.responseText); }};
+  xhr.send();
+}}
+</script>
+"""
+
+CLICK_SCRIPT = """
+<script>
+var currentPage = 1;
+document.querySelector('button.next-page').addEventListener('click', function () {
+  var button = this;
+  if (currentPage >= totalPages) { return; }
+  button.disabled = true;
+  fetchBatch(currentPage + 1, 'rows', function (rows) {
+    currentPage += 1;
+    document.querySelector('table.grid tbody').innerHTML = rows;
+    document.querySelector('span.current-page').textContent = currentPage;
+    button.disabled = currentPage >= totalPages;
+  });
+});
+</script>
+"""
+
+SCROLL_SCRIPT = """
+<script>
+var loadedPages = 1;
+var loading = false;
+window.addEventListener('scroll', function () {
+  if (loading || loadedPages >= totalPages) { return; }
+  if (window.innerHeight + window.scrollY < document.body.scrollHeight - 200) { return; }
+  loading = true;
+  fetchBatch(loadedPages + 1, 'cards', function (cards) {
+    loadedPages += 1;
+    document.querySelector('div.item-list').insertAdjacentHTML('beforeend', cards);
+    loading = false;
+  });
+});
+</script>
+"""
+
+LOAD_MORE_SCRIPT = """
+<script>
+var loadedPages = 1;
+document.querySelector('button.load-more').addEventListener('click', function () {
+  var button = this;
+  if (loadedPages >= totalPages) { return; }
+  fetchBatch(loadedPages + 1, 'cards', function (cards) {
+    loadedPages += 1;
+    document.querySelector('div.item-list').insertAdjacentHTML('beforeend', cards);
+    if (loadedPages >= totalPages) { button.style.display = 'none'; }
+  });
+});
+</script>
+"""
+
+
+class FixtureSite:
+    """A synthetic catalogue of `pages` x `items_per_page` items served over HTTP.
+
+    The server runs on a daemon thread; port 0 picks a free port, see base_url.
+    """
+    def __init__(self, pages=5, items_per_page=20, latency=0.05, jitter=0.02, seed=1, host='127.0.0.1', port=0):
+        self.pages = pages
+        self.items_per_page = items_per_page
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path):
+        return self.base_url + path
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fixture-site', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def delay(self):
+        """Seconds to hold the next response for"""
+        with self._lock:
+            self.requests += 1
+            offset = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency + offset)
+
+    # Content
+
+    def item(self, item_id):
+        return {
+            'id': item_id,
+            'title': f"Item {item_id}",
+            'price': f"{(item_id * 37) % 1000 / 10 + 1:.2f}",
+            'category': CATEGORIES[item_id % len(CATEGORIES)],
+            'stock': str((item_id * 13) % 50),
+            'sku': f"SKU-{item_id:06d}",
+        }
+
+    def page_items(self, page):
+        if page < 1 or page > self.pages:
+            return []
+        first = (page - 1) * self.items_per_page + 1
+        return [self.item(item_id) for item_id in range(first, first + self.items_per_page)]
+
+    def rows_html(self, page):
+        return ''.join(
+            f'<tr class="grid-row"><td class="title">{html.escape(item["title"])}</td>'
+            f'<td class="price">{item["price"]}</td>'
+            f'<td><a class="detail" href="/detail/{item["id"]}">View</a></td></tr>'
+            for item in self.page_items(page)
+        )
+
+    def cards_html(self, page):
+        return ''.join(
+            f'<div class="item-card"><h2 class="title">{html.escape(item["title"])}</h2>'
+            f'<span class="price">{item["price"]}</span>'
+            f'<a class="detail" href="/detail/{item["id"]}">View</a></div>'
+            for item in self.page_items(page)
+        )
+
+    def _grid(self, page):
+        return f'<table class="grid"><tbody>{self.rows_html(page)}</tbody></table>'
+
+    def url_page(self, page):
+        links = ''.join(f'<li><a class="page-link" href="/url/page/{n}/">{n}</a></li>' for n in range(1, self.pages + 1))
+        body = self._grid(page) + f'<ul class="pagination">{links}</ul>'
+        return PAGE_TEMPLATE.format(title=f"URL pagination - page {page}", body=body)
+
+    def click_page(self):
+        body = (
+            self._grid(1)
+            + '<div class="pager">Page <span class="current-page">1</span>'
+            + f' of {self.pages} <button class="next-page"{" disabled" if self.pages <= 1 else ""}>Next</button></div>'
+            + FETCH_SCRIPT.format(pages=self.pages) + CLICK_SCRIPT
+        )
+        return PAGE_TEMPLATE.format(title="Button pagination", body=body)
+
+    def scroll_page(self):
+        # Tall cards so the first batch overflows the window and scrolling has to fetch more
+        body = (
+            '<style>.item-card { height: 120px; }</style>'
+            + f'<div class="item-list">{self.cards_html(1)}</div>'
+            + FETCH_SCRIPT.format(pages=self.pages) + SCROLL_SCRIPT
+        )
+        return PAGE_TEMPLATE.format(title="Infinite scroll", body=body)
+
+    def load_more_page(self):
+        hidden = ' style="display: none"' if self.pages <= 1 else ''
+        body = (
+            f'<div class="item-list">{self.cards_html(1)}</div>'
+            + f'<button class="load-more"{hidden}>Load more</button>'
+            + FETCH_SCRIPT.format(pages=self.pages) + LOAD_MORE_SCRIPT
+        )
+        return PAGE_TEMPLATE.format(title="Load more", body=body)
+
+    def detail_page(self, item_id):
+        item = self.item(item_id)
+        groups = ''.join(
+            f'<div class="form-group row"><div class="col-md-3"><label>{label}</label></div>'
+            f'<div class="col-md-3">{html.escape(value)}</div></div>'
+            for label, value in (('Category', item['category']), ('Stock', item['stock']), ('Price', item['price']))
+        )
+        body = f'<span class="sku">{item["sku"]}</span><form>{groups}</form>'
+        return PAGE_TEMPLATE.format(title=html.escape(item['title']), body=body)
+
+    def total_items(self):
+        return self.pages * self.items_per_page
+
+    def _handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(site.delay())
+                parsed = urlparse(self.path)
+                parts = [part for part in parsed.path.split('/') if part]
+                query = parse_qs(parsed.query)
+                try:
+                    if len(parts) == 3 and parts[:2] == ['url', 'page']:
+                        self._send(site.url_page(int(parts[2])))
+                    elif parts == ['click']:
+                        self._send(site.click_page())
+                    elif parts == ['scroll']:
+                        self._send(site.scroll_page())
+                    elif parts == ['load-more']:
+                        self._send(site.load_more_page())
+                    elif len(parts) == 2 and parts[0] == 'detail':
+                        self._send(site.detail_page(int(parts[1])))
+                    elif parts == ['api', 'rows']:
+                        page = int(query.get('page', ['1'])[0])
+                        layout = query.get('layout', ['rows'])[0]
+                        self._send(site.cards_html(page) if layout == 'cards' else site.rows_html(page))
+                    else:
+                        self._send('Not found', status=404)
+                except ValueError:
+                    self._send('Bad request', status=400)
+
+            def _send(self, content, status=200):
+                data = content.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the benchmark fixture site')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--items-per-page', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    args = parser.parse_args()
+
+    site = FixtureSite(args.pages, args.items_per_page, args.latency_ms / 1000, args.jitter_ms / 1000, port=args.port)
+    site.start()
+    print(json.dumps({layout: site.url(path) for layout, path in (
+        ('url', '/url/page/1/'), ('click', '/click/'), ('scroll', '/scroll/'), ('load_more', '/load-more/')
+    )}, indent=2))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        site.stop()
+
+
+if __name__ == '__main__':
+    main()
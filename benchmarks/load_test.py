@@ -0,0 +1,459 @@
+"""Load test for server.py with simulated Socket.IO clients and a stub scraper.
+
+Each step starts a fresh server whose SCRAPER_COMMAND is benchmarks/fake_scraper.py,
+connects --clients Socket.IO clients spread over --users users, submits the
+step's number of jobs through /run-scraper and keeps /job-status and /list-jobs
+traffic going until every job has finished. It records:
+
+    log latency     time from a line being printed by the stub to a client receiving it
+    delivery        lines received vs. lines the clients' users' jobs printed
+    drops           lines dropped by the log broadcaster and frames skipped for slow clients
+    api             latency and errors per endpoint
+    server          CPU and peak RSS of the server process (Linux)
+
+A step passes when every line arrived and the p95 log latency is within
+--latency-slo-ms; the largest passing step is reported as the node's capacity.
+
+Usage:
+    python benchmarks/load_test.py --jobs 4,8,16,32 --clients 50 --users 10 --lines-per-second 50
+
+Results are written to benchmarks/results/loadtest-<commit>.json unless --output is given.
+"""
+import argparse
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+import socketio
+
+from run_benchmarks import BENCHMARK_DIR, REPO_DIR, git_revision, percentile
+
+FAKE_SCRAPER = os.path.join(BENCHMARK_DIR, 'fake_scraper.py')
+LINE_TIME_PATTERN = re.compile(r't=(\d+\.\d+)')
+TERMINAL_STATUSES = ('completed', 'failed', 'error', 'stopped', 'interrupted')
+SAMPLE_INTERVAL = 0.5
+# Runs the app the way `python server.py` does, but also when stdin isn't a terminal
+SERVER_LAUNCHER = (
+    "import server; server.init_data_directories(); "
+    "server.socketio.run(server.app, host='127.0.0.1', port=server.PORT, allow_unsafe_werkzeug=True)"
+)
+
+
+def command_line(args):
+    return subprocess.list2cmdline(args) if os.name == 'nt' else shlex.join(args)
+
+
+def start_server(work_dir, port, args, max_jobs):
+    env = dict(os.environ)
+    env.update({
+        'PORT': str(port),
+        'PYTHONPATH': REPO_DIR + os.pathsep + env.get('PYTHONPATH', ''),
+        'PYTHONUNBUFFERED': '1',
+        'SCRAPER_EXECUTION_MODE': 'subprocess',
+        'SCRAPER_COMMAND': command_line([
+            sys.executable, '-u', FAKE_SCRAPER,
+            '--lines-per-second', str(args.lines_per_second),
+            '--duration', str(args.duration),
+            '--line-bytes', str(args.line_bytes),
+        ]),
+        # Every job gets a slot, so the step measures the server rather than the queue
+        'SCRAPER_MAX_BROWSERS': str(max_jobs),
+        'SCHEDULER_MAX_QUEUED': str(max(100, max_jobs)),
+    })
+    log = open(os.path.join(work_dir, 'server.log'), 'wb')
+    process = subprocess.Popen([sys.executable, '-c', SERVER_LAUNCHER], cwd=work_dir, env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+    process.log_file = log
+    return process
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    process.log_file.close()
+
+
+def wait_for_server(base_url, process=None, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if requests.get(f"{base_url}/health", timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Server at {base_url} did not become healthy within {timeout}s")
+
+
+class LoadClient:
+    """One Socket.IO client that records every log line it receives"""
+    def __init__(self, base_url, user_id, encoding):
+        self.base_url = base_url
+        self.user_id = user_id
+        self.encoding = encoding
+        self.latencies = []
+        self.lines = 0
+        self.frames = 0
+        self.dropped_lines = 0
+        self.gap_frames = 0
+        self.error = None
+        self._lock = threading.Lock()
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('log', self._on_log)
+        self.sio.on('logc', self._on_compact_log)
+        self.sio.on('log_gap', self._on_gap)
+
+    def connect(self):
+        try:
+            self.sio.connect(f"{self.base_url}?userId={self.user_id}&encoding={self.encoding}",
+                             transports=['websocket'], wait_timeout=10)
+        except Exception as e:
+            self.error = str(e)
+
+    def disconnect(self):
+        try:
+            self.sio.disconnect()
+        except Exception:
+            pass
+
+    def _record(self, messages, dropped):
+        received = time.time()
+        with self._lock:
+            self.frames += 1
+            self.dropped_lines += dropped or 0
+            for message in messages:
+                match = LINE_TIME_PATTERN.search(message)
+                if match:
+                    self.lines += 1
+                    self.latencies.append(received - float(match.group(1)))
+
+    def _on_log(self, payload):
+        self._record(payload.get('messages') or [], payload.get('dropped'))
+
+    def _on_compact_log(self, frame):
+        self._record(frame[3] or [], frame[2])
+
+    def _on_gap(self, payload):
+        with self._lock:
+            self.gap_frames += payload.get('dropped_frames', 0)
+
+
+class ApiTraffic:
+    """Background /job-status and /list-jobs requests at a fixed total rate"""
+    def __init__(self, base_url, users, job_ids, rate, threads=4):
+        self.base_url = base_url
+        self.users = users
+        self.job_ids = job_ids  # Shared list, grows as jobs are submitted
+        self.rate = rate
+        self.threads = threads
+        self.samples = {}  # Maps endpoint to a list of (seconds, ok)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._workers = []
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((seconds, ok))
+
+    def start(self):
+        if self.rate <= 0:
+            return
+        for index in range(self.threads):
+            worker = threading.Thread(target=self._loop, args=(index,), daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self):
+        self._stop.set()
+        for worker in self._workers:
+            worker.join()
+
+    def _loop(self, index):
+        session = requests.Session()
+        interval = self.threads / self.rate
+        count = 0
+        while not self._stop.wait(interval):
+            count += 1
+            if count % 2 and self.job_ids:
+                endpoint = '/job-status'
+                params = {'job_id': self.job_ids[(count + index) % len(self.job_ids)]}
+            else:
+                endpoint = '/list-jobs'
+                params = {'user_id': self.users[(count + index) % len(self.users)], 'limit': 20}
+            started = time.perf_counter()
+            try:
+                ok = session.get(self.base_url + endpoint, params=params, timeout=30).ok
+            except requests.RequestException:
+                ok = False
+            self.record(endpoint, time.perf_counter() - started, ok)
+
+    def summary(self):
+        result = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            seconds = [sample[0] for sample in samples]
+            result[endpoint] = {
+                'requests': len(samples),
+                'errors': sum(1 for sample in samples if not sample[1]),
+                'p50_ms': round(percentile(seconds, 0.5) * 1000, 1),
+                'p95_ms': round(percentile(seconds, 0.95) * 1000, 1),
+            }
+        return result
+
+
+class ProcessSampler:
+    """Samples one process's CPU use and RSS from /proc (Linux only)"""
+    def __init__(self, pid):
+        self.pid = pid
+        self.cpu_percent = []
+        self.peak_rss = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _read(self):
+        with open(f'/proc/{self.pid}/stat', 'rb') as f:
+            fields = f.read().rsplit(b')', 1)[1].split()
+        with open(f'/proc/{self.pid}/statm', 'rb') as f:
+            rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        # utime and stime, fields 14 and 15 of /proc/<pid>/stat
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK'), rss
+
+    def start(self):
+        if self.pid is None or not os.path.exists(f'/proc/{self.pid}'):
+            return
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _loop(self):
+        try:
+            last_cpu, _ = self._read()
+        except OSError:
+            return
+        last_time = time.monotonic()
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            try:
+                cpu, rss = self._read()
+            except OSError:
+                return
+            now = time.monotonic()
+            self.cpu_percent.append(100 * (cpu - last_cpu) / (now - last_time))
+            self.peak_rss = max(self.peak_rss or 0, rss)
+            last_cpu, last_time = cpu, now
+
+    def summary(self):
+        return {
+            'cpu_avg_percent': round(sum(self.cpu_percent) / len(self.cpu_percent), 1) if self.cpu_percent else None,
+            'cpu_peak_percent': round(max(self.cpu_percent), 1) if self.cpu_percent else None,
+            'rss_peak_mb': round(self.peak_rss / (1024 * 1024), 1) if self.peak_rss else None,
+        }
+
+
+def read_server_metrics(base_url, names):
+    """Unlabelled sample values of some metrics from /metrics"""
+    values = {}
+    try:
+        text = requests.get(f"{base_url}/metrics", timeout=10).text
+    except requests.RequestException:
+        return values
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[0] in names:
+            values[parts[0]] = float(parts[1])
+    return values
+
+
+def run_step(job_count, args, users):
+    work_dir = tempfile.mkdtemp(prefix='scraper-loadtest-')
+    server = None
+    if args.server_url:
+        base_url = args.server_url.rstrip('/')
+    else:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = start_server(work_dir, args.port, args, job_count)
+    try:
+        wait_for_server(base_url, server)
+        session = requests.Session()
+
+        # Let each user run all of their jobs at once
+        for user_id in users:
+            session.post(f"{base_url}/update-config", headers={'X-User-Id': user_id}, json={
+                'base_url': 'http://localhost/',
+                'container_selector': 'div',
+                'fields': {'title': 'h1'},
+                'concurrent_settings': {'max_concurrent_jobs': job_count, 'base_request_delay': 0},
+            }, timeout=30).raise_for_status()
+
+        clients = [LoadClient(base_url, users[index % len(users)], args.encoding) for index in range(args.clients)]
+        with ThreadPoolExecutor(max_workers=min(32, max(1, len(clients)))) as pool:
+            list(pool.map(LoadClient.connect, clients))
+        connect_errors = [client.error for client in clients if client.error]
+
+        job_ids = []
+        jobs_per_user = {user_id: 0 for user_id in users}
+        traffic = ApiTraffic(base_url, users, job_ids, args.api_rps)
+        sampler = ProcessSampler(server.pid if server else None)
+        sampler.start()
+        traffic.start()
+
+        started = time.monotonic()
+        for index in range(job_count):
+            user_id = users[index % len(users)]
+            request_started = time.perf_counter()
+            try:
+                response = session.post(f"{base_url}/run-scraper", json={'user_id': user_id}, timeout=30)
+                ok = response.ok
+            except requests.RequestException:
+                response, ok = None, False
+            traffic.record('/run-scraper', time.perf_counter() - request_started, ok)
+            if ok:
+                job_ids.append(response.json()['job_id'])
+                jobs_per_user[user_id] += 1
+
+        # Wait for every job to finish
+        deadline = started + args.duration * 2 + args.step_timeout
+        statuses = {}
+        while time.monotonic() < deadline:
+            for job_id in job_ids:
+                if statuses.get(job_id) not in TERMINAL_STATUSES:
+                    try:
+                        statuses[job_id] = session.get(f"{base_url}/job-status", params={'job_id': job_id}, timeout=30).json().get('status')
+                    except (requests.RequestException, ValueError):
+                        pass
+            if all(statuses.get(job_id) in TERMINAL_STATUSES for job_id in job_ids):
+                break
+            time.sleep(0.5)
+        jobs_seconds = time.monotonic() - started
+        # Give the last frames time to arrive
+        time.sleep(args.drain)
+
+        traffic.stop()
+        sampler.stop()
+        server_metrics = read_server_metrics(base_url, ('scraper_log_lines_dropped_total', 'scraper_push_frames_dropped_total', 'scraper_log_frames_total'))
+        for client in clients:
+            client.disconnect()
+    finally:
+        if server:
+            stop_server(server)
+
+    lines_per_job = int(args.lines_per_second * args.duration)
+    expected = sum(jobs_per_user[client.user_id] * lines_per_job for client in clients if not client.error)
+    received = sum(client.lines for client in clients)
+    latencies = [latency for client in clients for latency in client.latencies]
+    p95 = percentile(latencies, 0.95)
+    result = {
+        'jobs': {
+            'submitted': len(job_ids),
+            'completed': sum(1 for status in statuses.values() if status == 'completed'),
+            'unfinished': sum(1 for job_id in job_ids if statuses.get(job_id) not in TERMINAL_STATUSES),
+            'seconds': round(jobs_seconds, 2),
+        },
+        'clients': {
+            'connected': len(clients) - len(connect_errors),
+            'connect_errors': connect_errors[:5],
+        },
+        'log': {
+            'lines_per_second_per_job': args.lines_per_second,
+            'expected_lines': expected,
+            'received_lines': received,
+            'delivery_ratio': round(received / expected, 4) if expected else None,
+            'frames': sum(client.frames for client in clients),
+            'dropped_lines_reported': sum(client.dropped_lines for client in clients),
+            'dropped_frames_reported': sum(client.gap_frames for client in clients),
+            'latency_p50_ms': round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+            'latency_p95_ms': round(p95 * 1000, 1) if latencies else None,
+            'latency_p99_ms': round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+            'latency_max_ms': round(max(latencies) * 1000, 1) if latencies else None,
+        },
+        'api': traffic.summary(),
+        'server': sampler.summary(),
+        'server_metrics': server_metrics,
+    }
+    result['passed'] = bool(
+        expected and received >= expected and not connect_errors and not result['jobs']['unfinished']
+        and p95 is not None and p95 * 1000 <= args.latency_slo_ms
+    )
+    if args.keep:
+        result['work_dir'] = work_dir
+    else:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the API server with simulated clients and a stub scraper')
+    parser.add_argument('--jobs', default='4,8,16', help='Comma-separated concurrent job counts, one step each')
+    parser.add_argument('--clients', type=int, default=20, help='Socket.IO clients per step')
+    parser.add_argument('--users', type=int, default=5, help='Users the clients and jobs are spread over')
+    parser.add_argument('--encoding', choices=('verbose', 'compact'), default='verbose', help='Log frame encoding the clients ask for')
+    parser.add_argument('--lines-per-second', type=float, default=20, help='Log lines each stub job prints per second')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds each stub job runs')
+    parser.add_argument('--line-bytes', type=int, default=120)
+    parser.add_argument('--api-rps', type=float, default=10, help='Total /job-status and /list-jobs requests per second')
+    parser.add_argument('--latency-slo-ms', type=float, default=1000, help='p95 log latency a step must stay within to pass')
+    parser.add_argument('--drain', type=float, default=2, help='Seconds to wait for late frames after the jobs finish')
+    parser.add_argument('--step-timeout', type=float, default=60, help='Extra seconds allowed for a step beyond twice the job duration')
+    parser.add_argument('--port', type=int, default=5090, help='Port for the server the test starts')
+    parser.add_argument('--server-url', help='Test an already running server instead; it must run the stub scraper itself')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/loadtest-<commit>.json)')
+    parser.add_argument('--keep', action='store_true', help='Keep each step\'s server directory and log')
+    args = parser.parse_args()
+
+    try:
+        steps = [int(step) for step in args.jobs.split(',') if step.strip()]
+    except ValueError:
+        parser.error('--jobs must be a comma-separated list of integers')
+    users = [f"loadtest-user-{index + 1}" for index in range(max(1, args.users))]
+
+    commit, dirty = git_revision()
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'keep')},
+        'steps': {},
+        'capacity_jobs': None,
+    }
+    for job_count in steps:
+        print(f"Step: {job_count} jobs, {args.clients} clients, {len(users)} users ...", flush=True)
+        result = run_step(job_count, args, users)
+        report['steps'][str(job_count)] = result
+        log = result['log']
+        print(f"  delivered {log['received_lines']}/{log['expected_lines']} lines, "
+              f"p50 {log['latency_p50_ms']} ms, p95 {log['latency_p95_ms']} ms, "
+              f"dropped {log['dropped_lines_reported']} lines / {log['dropped_frames_reported']} frames, "
+              f"server CPU {result['server']['cpu_avg_percent']}%, RSS {result['server']['rss_peak_mb']} MB"
+              f" -> {'pass' if result['passed'] else 'FAIL'}", flush=True)
+        if result['passed']:
+            report['capacity_jobs'] = max(report['capacity_jobs'] or 0, job_count)
+
+    output = args.output or os.path.join(BENCHMARK_DIR, 'results', f"loadtest-{commit}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Capacity: {report['capacity_jobs'] or 0} concurrent jobs within a p95 of {args.latency_slo_ms:g} ms")
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""Run a remote-mode server with several worker nodes on localhost, using the stub scraper.
+
+Starts server.py with SCRAPER_EXECUTION_MODE=remote and --nodes worker nodes
+(`scrap.py --worker-server`), each in its own directory and running
+benchmarks/fake_scraper.py instead of scrap.py. It then submits --jobs jobs spread over
+--users users and checks that:
+
+    jobs        every job completed and its results came back from the node
+    spread      jobs ran on more than one node (when there are several)
+    log         every printed line reached the user's Socket.IO client, and the p95
+                time from print to client is within --latency-slo-ms
+
+Stub jobs print slowly by default (--lines-per-second 2), so a line that sits in a
+node's batch until the next one arrives shows up as latency.
+
+Usage:
+    python benchmarks/remote_nodes.py --nodes 3 --capacity 2 --jobs 12
+"""
+import argparse
+import os
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from load_test import (FAKE_SCRAPER, SERVER_LAUNCHER, TERMINAL_STATUSES, LoadClient, command_line, stop_server,
+                       wait_for_server)
+from run_benchmarks import REPO_DIR, SCRAPER, percentile
+
+
+def start_processes(work_dir, args, token):
+    scraper_command = command_line([
+        sys.executable, '-u', FAKE_SCRAPER,
+        '--lines-per-second', str(args.lines_per_second),
+        '--duration', str(args.duration),
+        '--items', str(args.items),
+    ])
+    env = dict(os.environ)
+    env.update({
+        'PORT': str(args.port),
+        'PYTHONPATH': REPO_DIR + os.pathsep + env.get('PYTHONPATH', ''),
+        'PYTHONUNBUFFERED': '1',
+        'SCRAPER_EXECUTION_MODE': 'remote',
+        'SCRAPER_WORKER_TOKEN': token,
+        'SCHEDULER_MAX_QUEUED': str(max(100, args.jobs)),
+    })
+    log = open(os.path.join(work_dir, 'server.log'), 'wb')
+    server = subprocess.Popen([sys.executable, '-c', SERVER_LAUNCHER], cwd=work_dir, env=env,
+                              stdout=log, stderr=subprocess.STDOUT)
+    server.log_file = log
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    nodes = []
+    for index in range(args.nodes):
+        node_dir = os.path.join(work_dir, f"node-{index + 1}")
+        os.makedirs(node_dir)
+        log = open(os.path.join(node_dir, 'node.log'), 'wb')
+        node = subprocess.Popen(
+            [sys.executable, '-u', SCRAPER, '--worker-server', base_url, '--capacity', str(args.capacity),
+             '--node-id', f"node-{index + 1}"],
+            cwd=node_dir, env=dict(env, SCRAPER_COMMAND=scraper_command), stdout=log, stderr=subprocess.STDOUT)
+        node.log_file = log
+        nodes.append(node)
+    return base_url, server, nodes
+
+
+def wait_for_nodes(session, base_url, count, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            nodes = session.get(f"{base_url}/workers", timeout=5).json().get('nodes', [])
+            if len(nodes) >= count:
+                return
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Only some of the {count} worker nodes registered within {timeout}s")
+
+
+def run(args):
+    work_dir = tempfile.mkdtemp(prefix='scraper-remote-nodes-')
+    token = secrets.token_hex(16)
+    users = [f"remote-user-{index + 1}" for index in range(max(1, args.users))]
+    base_url, server, nodes = start_processes(work_dir, args, token)
+    clients = []
+    try:
+        wait_for_server(base_url, server)
+        session = requests.Session()
+        session.headers['X-Worker-Token'] = token
+        wait_for_nodes(session, base_url, args.nodes)
+
+        for user_id in users:
+            session.post(f"{base_url}/update-config", headers={'X-User-Id': user_id}, json={
+                'base_url': 'http://localhost/',
+                'container_selector': 'div',
+                'fields': {'title': 'h1'},
+                'concurrent_settings': {'max_concurrent_jobs': args.jobs, 'base_request_delay': 0},
+            }, timeout=30).raise_for_status()
+        clients = [LoadClient(base_url, user_id, 'verbose') for user_id in users]
+        for client in clients:
+            client.connect()
+
+        job_ids = []
+        for index in range(args.jobs):
+            response = session.post(f"{base_url}/run-scraper", json={'user_id': users[index % len(users)]}, timeout=30)
+            response.raise_for_status()
+            job_ids.append(response.json()['job_id'])
+
+        # Poll job states, and note which node holds each job while it runs
+        ran_on = {}
+        statuses = {}
+        deadline = time.monotonic() + args.duration * (args.jobs / (args.nodes * args.capacity) + 1) + args.timeout
+        while time.monotonic() < deadline:
+            try:
+                for node in session.get(f"{base_url}/workers", timeout=5).json().get('nodes', []):
+                    for job_id in node['jobs']:
+                        ran_on[job_id] = node['node_id']
+            except (requests.RequestException, ValueError):
+                pass
+            for job_id in job_ids:
+                if statuses.get(job_id) not in TERMINAL_STATUSES:
+                    try:
+                        statuses[job_id] = session.get(f"{base_url}/job-status", params={'job_id': job_id}, timeout=30).json().get('status')
+                    except (requests.RequestException, ValueError):
+                        pass
+            if all(statuses.get(job_id) in TERMINAL_STATUSES for job_id in job_ids):
+                break
+            time.sleep(0.2)
+        time.sleep(args.drain)
+
+        rows = {}
+        for job_id in job_ids:
+            try:
+                response = session.get(f"{base_url}/download-results", params={'job_id': job_id, 'type': 'json'}, timeout=30)
+                rows[job_id] = len(response.json()) if response.ok else 0
+            except (requests.RequestException, ValueError):
+                rows[job_id] = 0
+    finally:
+        for client in clients:
+            client.disconnect()
+        for node in nodes:
+            node.terminate()
+        for node in nodes:
+            try:
+                node.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                node.kill()
+            node.log_file.close()
+        stop_server(server)
+
+    expected_lines = int(args.lines_per_second * args.duration) * len(job_ids)
+    received_lines = sum(client.lines for client in clients)
+    latencies = [latency for client in clients for latency in client.latencies]
+    p95 = percentile(latencies, 0.95)
+    per_node = {}
+    for node_id in ran_on.values():
+        per_node[node_id] = per_node.get(node_id, 0) + 1
+    result = {
+        'jobs': len(job_ids),
+        'completed': sum(1 for job_id in job_ids if statuses.get(job_id) == 'completed'),
+        'complete_results': sum(1 for job_id in job_ids if rows.get(job_id) == args.items),
+        'jobs_per_node': per_node,
+        'expected_lines': expected_lines,
+        'received_lines': received_lines,
+        'latency_p95_ms': round(p95 * 1000, 1) if latencies else None,
+        'latency_max_ms': round(max(latencies) * 1000, 1) if latencies else None,
+    }
+    result['passed'] = bool(
+        result['completed'] == result['complete_results'] == len(job_ids)
+        and (args.nodes == 1 or len(per_node) > 1)
+        and received_lines >= expected_lines
+        and p95 is not None and p95 * 1000 <= args.latency_slo_ms
+    )
+    if args.keep:
+        result['work_dir'] = work_dir
+    else:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run several worker nodes on localhost against a remote-mode server')
+    parser.add_argument('--nodes', type=int, default=3, help='Worker nodes to start')
+    parser.add_argument('--capacity', type=int, default=2, help='Jobs each node runs at once')
+    parser.add_argument('--jobs', type=int, default=12, help='Jobs to submit')
+    parser.add_argument('--users', type=int, default=3, help='Users the jobs are spread over, one client each')
+    parser.add_argument('--lines-per-second', type=float, default=2, help='Log lines each stub job prints per second')
+    parser.add_argument('--duration', type=float, default=5, help='Seconds each stub job runs')
+    parser.add_argument('--items', type=int, default=50, help='Rows each stub job writes')
+    parser.add_argument('--latency-slo-ms', type=float, default=1500, help='p95 log latency the run must stay within to pass')
+    parser.add_argument('--drain', type=float, default=2, help='Seconds to wait for late frames after the jobs finish')
+    parser.add_argument('--timeout', type=float, default=60, help='Extra seconds allowed beyond the expected run time')
+    parser.add_argument('--port', type=int, default=5091, help='Port for the server the script starts')
+    parser.add_argument('--keep', action='store_true', help='Keep the server and node directories and logs')
+    args = parser.parse_args()
+
+    print(f"{args.nodes} nodes x {args.capacity} slots, {args.jobs} jobs ...", flush=True)
+    result = run(args)
+    for key, value in result.items():
+        print(f"  {key}: {value}")
+    print('pass' if result['passed'] else 'FAIL')
+    return 0 if result['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Replay recorded page snapshots through scrap.py's extraction code.
+
+Record a job by adding "record_snapshots": true (or a directory name) to its config; the
+pages land in <output_dir>/snapshots. This tool then re-runs extraction on every
+recorded page through snapshots.ReplayDriver, with no browser or network:
+
+    listing pages   container lookup + extract_main_items()
+    subpages        extract_subpage_fields()
+    pagination      get_total_pages() on the first listing page
+
+For each it reports extraction time per page (p50/p95 over --repeat runs) and
+WebDriver round trips per page, and compares the extracted values with what the
+recorded run extracted. Any difference makes the exit code 1, so a recording can
+serve as an offline regression test.
+
+Usage:
+    python benchmarks/replay_extraction.py output/<job_id>/snapshots [--repeat 20] [--baseline old.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scrap  # noqa: E402
+from selenium.webdriver.common.by import By  # noqa: E402
+from snapshots import ReplayDriver, load_snapshot_config  # noqa: E402
+
+from run_benchmarks import git_revision, percentile  # noqa: E402
+
+MAX_REPORTED_MISMATCHES = 10
+
+
+def replay_listing(driver, entry, config):
+    driver.open(entry)
+    items = []
+    containers = driver.find_elements(By.CSS_SELECTOR, config["container_selector"])
+    scrap.extract_main_items(containers, config, items)
+    return items
+
+
+def replay_subpage(driver, entry, config):
+    driver.open(entry)
+    return scrap.extract_subpage_fields(driver, config)
+
+
+def replay_pagination(driver, entry, config):
+    driver.open(entry)
+    return scrap.get_total_pages(driver, config)
+
+
+def measure(driver, entries, replay, config, repeat):
+    """Run one kind of extraction over its pages; returns its summary and mismatches"""
+    seconds = []
+    commands = Counter()
+    mismatches = []
+    for entry in entries:
+        for run in range(repeat):
+            driver.commands.clear()
+            started = time.perf_counter()
+            extracted = replay(driver, entry, config)
+            seconds.append(time.perf_counter() - started)
+            if run == 0:
+                commands.update(driver.commands)
+                expected = entry.get('items') if entry['kind'] == 'listing' else entry.get('fields')
+                if expected is not None and extracted != expected and replay is not replay_pagination:
+                    mismatches.append({'url': entry['url'], 'expected': expected, 'extracted': extracted})
+    pages = len(entries)
+    summary = {
+        'pages': pages,
+        'extract_ms_p50': round(percentile(seconds, 0.5) * 1000, 3) if seconds else None,
+        'extract_ms_p95': round(percentile(seconds, 0.95) * 1000, 3) if seconds else None,
+        'round_trips_per_page': round(sum(commands.values()) / pages, 1) if pages else None,
+        'round_trips_by_command': {name: round(count / pages, 1) for name, count in commands.most_common()} if pages else {},
+        'mismatches': len(mismatches),
+    }
+    return summary, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark and check extraction against recorded page snapshots')
+    parser.add_argument('snapshots', help='Snapshot directory written by a job with record_snapshots set')
+    parser.add_argument('--config', help='Config to extract with (default: the recorded job\'s config)')
+    parser.add_argument('--repeat', type=int, default=10, help='Extractions per page, for stable timings')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Earlier results file to print changes against')
+    args = parser.parse_args()
+
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    else:
+        config = load_snapshot_config(args.snapshots)
+        if config is None:
+            parser.error('The recording has no config.json; pass --config')
+    # Replay is offline: no pacing between requests and no waits
+    scrap.configure_rate_limiter({"concurrent_settings": {"base_request_delay": 0}})
+    scrap.logger.configure({**config, "log_verbosity": "quiet"})
+
+    driver = ReplayDriver(args.snapshots)
+    listing = [entry for entry in driver.entries if entry['kind'] == 'listing']
+    subpages = [entry for entry in driver.entries if entry['kind'] == 'subpage']
+    commit, dirty = git_revision()
+    report = {'commit': commit, 'dirty': dirty, 'snapshots': os.path.abspath(args.snapshots), 'repeat': args.repeat, 'results': {}}
+    all_mismatches = []
+    for name, entries, replay in (
+        ('listing', listing, replay_listing),
+        ('subpages', subpages, replay_subpage),
+        ('pagination', listing[:1] if config.get("paginate") and config.get("next_page_selector") else [], replay_pagination),
+    ):
+        if not entries:
+            continue
+        summary, mismatches = measure(driver, entries, replay, config, max(1, args.repeat))
+        report['results'][name] = summary
+        all_mismatches.extend(mismatches)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    for name, summary in report['results'].items():
+        line = (f"{name:<10} {summary['pages']:>5} pages  p50 {summary['extract_ms_p50']} ms  "
+                f"p95 {summary['extract_ms_p95']} ms  {summary['round_trips_per_page']} round trips/page")
+        previous = ((baseline or {}).get('results') or {}).get(name)
+        if previous and previous.get('extract_ms_p50'):
+            change = 100 * (summary['extract_ms_p50'] - previous['extract_ms_p50']) / previous['extract_ms_p50']
+            line += f"  (p50 {change:+.0f}%, round trips {previous['round_trips_per_page']} -> {summary['round_trips_per_page']})"
+        if summary['mismatches']:
+            line += f"  {summary['mismatches']} MISMATCHED"
+        print(line)
+    for mismatch in all_mismatches[:MAX_REPORTED_MISMATCHES]:
+        print(f"Mismatch on {mismatch['url']}:\n  recorded:  {mismatch['expected']}\n  extracted: {mismatch['extracted']}")
+
+    if args.output:
+        report['mismatches'] = all_mismatches[:MAX_REPORTED_MISMATCHES]
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 1 if all_mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,343 @@
+"""Run scraper configs against the local fixture site and record how fast they were.
+
+Each mode runs scrap.py as a separate process on a generated config, exactly as
+the server would, then reads the job's trace and results:
+
+    pages_per_second   listing and detail pages over the pagination + subpage phases
+    items_per_second   scraped items over the same phases
+    page_latency       p50/p95 seconds per page: from one listing page to the next
+                       (navigation and waits included), or one detail page visit
+    peak_rss_mb        largest sampled RSS of the scraper and its browser processes
+
+Usage:
+    python benchmarks/run_benchmarks.py [--modes url,click] [--baseline benchmarks/results/abc1234.json]
+
+Results are written to benchmarks/results/<commit>.json unless --output is given.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from fixture_site import FixtureSite
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+SCRAPER = os.path.join(REPO_DIR, 'scrap.py')
+RSS_SAMPLE_INTERVAL = 0.2
+
+GRID_FIELDS = {
+    'title': 'td.title',
+    'price': 'td.price',
+    'link': {'selector': 'a.detail', 'attribute': 'href', 'is_link': True},
+}
+CARD_FIELDS = {
+    'title': '.title',
+    'price': '.price',
+    'link': {'selector': 'a.detail', 'attribute': 'href', 'is_link': True},
+}
+SUBPAGE_FIELDS = {
+    'sku': 'span.sku',
+    'category': {'use_label': True, 'label': 'Category'},
+    'stock': {'use_label': True, 'label': 'Stock'},
+}
+
+# Mode name -> (path on the fixture site, config keys for that layout)
+MODES = {
+    'url': ('/url/page/1/', {
+        'container_selector': 'tr.grid-row',
+        'fields': GRID_FIELDS,
+        'paginate': True,
+        'next_page_selector': 'a.page-link',
+    }),
+    'click': ('/click/', {
+        'container_selector': 'tr.grid-row',
+        'fields': GRID_FIELDS,
+        'paginate': True,
+        'next_page_selector': 'button.next-page',
+    }),
+    'scroll': ('/scroll/', {
+        'container_selector': 'div.item-card',
+        'fields': CARD_FIELDS,
+        'scroll': True,
+    }),
+    'load_more': ('/load-more/', {
+        'container_selector': 'div.item-card',
+        'fields': CARD_FIELDS,
+        'load_more_selector': 'button.load-more',
+        'max_load_more_clicks': 50,
+    }),
+    'subpages': ('/url/page/1/', {
+        'container_selector': 'tr.grid-row',
+        'fields': GRID_FIELDS,
+        'paginate': True,
+        'next_page_selector': 'a.page-link',
+        'scrape_subpages': True,
+        'subpage_fields': SUBPAGE_FIELDS,
+    }),
+    'subpages_pipelined': ('/url/page/1/', {
+        'container_selector': 'tr.grid-row',
+        'fields': GRID_FIELDS,
+        'paginate': True,
+        'next_page_selector': 'a.page-link',
+        'scrape_subpages': True,
+        'subpage_fields': SUBPAGE_FIELDS,
+        'pipeline_subpages': True,
+    }),
+}
+
+
+def build_config(mode, site, work_dir, waits):
+    path, layout = MODES[mode]
+    output_dir = os.path.join(work_dir, mode)
+    config = {
+        'base_url': site.url(path),
+        'max_pages': site.pages,
+        'output_dir': output_dir,
+        'output_json': os.path.join(output_dir, 'scraped_data.json'),
+        'log_file': os.path.join(output_dir, 'scraper.log'),
+        'trace': True,
+        # The fixture is local, so the politeness limit would only measure itself
+        'concurrent_settings': {'base_request_delay': 0},
+    }
+    config.update(waits)
+    config.update(layout)
+    return config
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _process_tree_rss(root_pid):
+    """Resident bytes of a process and all its descendants (Linux only), or None"""
+    if not os.path.isdir('/proc'):
+        return None
+    children = {}
+    rss = {}
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'rb') as f:
+                fields = f.read().rsplit(b')', 1)[1].split()
+            with open(f'/proc/{name}/statm', 'rb') as f:
+                rss[int(name)] = int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(name))
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, ()))
+    return total
+
+
+def run_scraper(config_path, work_dir):
+    """Run scrap.py on a config; returns (exit code, wall seconds, peak tree RSS bytes or None)"""
+    peak = [None]
+    started = time.perf_counter()
+    with open(os.path.join(work_dir, 'stdout.log'), 'wb') as out:
+        # The working directory is the scratch dir, so no token.pickle is picked up for uploads
+        process = subprocess.Popen([sys.executable, SCRAPER, '--config', config_path], cwd=work_dir,
+                                   stdout=out, stderr=subprocess.STDOUT)
+        done = threading.Event()
+
+        def sample():
+            while not done.is_set():
+                rss = _process_tree_rss(process.pid)
+                if rss is not None and (peak[0] is None or rss > peak[0]):
+                    peak[0] = rss
+                done.wait(RSS_SAMPLE_INTERVAL)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        try:
+            return_code = process.wait()
+        finally:
+            done.set()
+            sampler.join()
+    return return_code, time.perf_counter() - started, peak[0]
+
+
+def summarize_trace(trace_path):
+    """Per-page latencies and phase seconds from a job's trace file"""
+    with open(trace_path, 'r', encoding='utf-8') as f:
+        events = json.load(f)
+    if isinstance(events, dict):
+        events = events.get('traceEvents', [])
+    spans = [event for event in events if event.get('ph') == 'X']
+    listing = sorted((event for event in spans if event.get('cat') == 'page'), key=lambda event: event['ts'])
+    latencies = []
+    for current, following in zip(listing, listing[1:]):
+        latencies.append((following['ts'] - current['ts']) / 1e6)
+    if listing:
+        latencies.append(listing[-1]['dur'] / 1e6)
+    subpages = [event['dur'] / 1e6 for event in spans if event.get('cat') == 'subpage']
+    phases = {}
+    for event in spans:
+        if event.get('cat') == 'phase':
+            phases[event['name']] = phases.get(event['name'], 0.0) + event['dur'] / 1e6
+    return {
+        'listing_pages': len(listing),
+        'subpages': len(subpages),
+        'latencies': latencies + subpages,
+        'phases': phases,
+    }
+
+
+def count_items(results_path):
+    if not os.path.exists(results_path):
+        return 0
+    with open(results_path, 'r', encoding='utf-8') as f:
+        return len(json.load(f))
+
+
+def run_mode(mode, site, work_dir, waits):
+    mode_dir = os.path.join(work_dir, mode)
+    os.makedirs(mode_dir, exist_ok=True)
+    config = build_config(mode, site, work_dir, waits)
+    config_path = os.path.join(mode_dir, 'config.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+
+    requests_before = site.requests
+    return_code, wall_seconds, peak_rss = run_scraper(config_path, mode_dir)
+    result = {
+        'exit_code': return_code,
+        'wall_seconds': round(wall_seconds, 3),
+        'requests': site.requests - requests_before,
+        'peak_rss_mb': round(peak_rss / (1024 * 1024), 1) if peak_rss is not None else None,
+        'items': count_items(config['output_json']),
+        'expected_items': site.total_items(),
+    }
+    trace_path = os.path.join(mode_dir, 'trace.json')
+    if os.path.exists(trace_path):
+        trace = summarize_trace(trace_path)
+        scrape_seconds = trace['phases'].get('pagination', 0.0) + trace['phases'].get('subpages', 0.0)
+        pages = trace['listing_pages'] + trace['subpages']
+        result.update({
+            'pages': pages,
+            'listing_pages': trace['listing_pages'],
+            'subpages': trace['subpages'],
+            'scrape_seconds': round(scrape_seconds, 3),
+            'pages_per_second': round(pages / scrape_seconds, 3) if scrape_seconds else None,
+            'items_per_second': round(result['items'] / scrape_seconds, 3) if scrape_seconds else None,
+            'page_latency_p50': round(percentile(trace['latencies'], 0.5), 3) if trace['latencies'] else None,
+            'page_latency_p95': round(percentile(trace['latencies'], 0.95), 3) if trace['latencies'] else None,
+            'phases': {name: round(seconds, 3) for name, seconds in trace['phases'].items()},
+        })
+    return result
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+
+
+def print_report(report, baseline=None):
+    columns = ('pages_per_second', 'items_per_second', 'page_latency_p50', 'page_latency_p95', 'peak_rss_mb')
+    print(f"{'mode':<10} {'exit':>4} {'items':>11} " + ' '.join(f"{column:>18}" for column in columns))
+    for mode, result in report['results'].items():
+        cells = []
+        for column in columns:
+            value = result.get(column)
+            cell = '-' if value is None else f"{value:g}"
+            previous = ((baseline or {}).get('results', {}).get(mode) or {}).get(column)
+            if value is not None and previous:
+                cell += f" ({100 * (value - previous) / previous:+.0f}%)"
+            cells.append(f"{cell:>18}")
+        items = f"{result['items']}/{result['expected_items']}"
+        print(f"{mode:<10} {result['exit_code']:>4} {items:>11} " + ' '.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the scraper against a local fixture site')
+    parser.add_argument('--modes', default=','.join(MODES), help=f"Comma-separated modes (default: all of {', '.join(MODES)})")
+    parser.add_argument('--pages', type=int, default=5, help='Listing pages (or batches) per site')
+    parser.add_argument('--items-per-page', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=50, help='Added to every fixture response')
+    parser.add_argument('--jitter-ms', type=float, default=20, help='Uniform +/- variation of the latency')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--wait', type=float, default=0.5, help='Value for the config wait settings (initial_wait, page_wait, ...)')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--baseline', help='Earlier results file to print changes against')
+    parser.add_argument('--keep', action='store_true', help='Keep the scratch directory with configs, logs and traces')
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(unknown)}")
+    waits = {
+        'initial_wait': args.wait,
+        'page_wait': args.wait,
+        'subpage_wait': args.wait,
+        'scroll_wait': args.wait,
+        'load_more_wait': args.wait,
+    }
+
+    commit, dirty = git_revision()
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'pages': args.pages,
+            'items_per_page': args.items_per_page,
+            'latency_ms': args.latency_ms,
+            'jitter_ms': args.jitter_ms,
+            'seed': args.seed,
+            'waits': waits,
+        },
+        'results': {},
+    }
+
+    work_dir = tempfile.mkdtemp(prefix='scraper-bench-')
+    with FixtureSite(args.pages, args.items_per_page, args.latency_ms / 1000, args.jitter_ms / 1000, seed=args.seed) as site:
+        for mode in modes:
+            print(f"Running {mode} against {site.url(MODES[mode][0])} ...", flush=True)
+            report['results'][mode] = run_mode(mode, site, work_dir, waits)
+
+    output = args.output or os.path.join(BENCHMARK_DIR, 'results', f"{commit}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"Results written to {output}")
+    if args.keep:
+        print(f"Scratch files kept in {work_dir}")
+    else:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0 if all(result['exit_code'] == 0 for result in report['results'].values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import copy
+import json
+import os
+import threading
+
+# Key the store keeps in every config it writes; bumped on each write
+VERSION_KEY = 'config_version'
+
+
+class ConfigStore:
+    """Parsed user configs cached in memory, with atomic per-user writes.
+
+    A cached config is reused as long as its file's mtime and size are unchanged, so
+    edits made outside the server are still picked up. Writes go to a temp file that
+    is renamed over the config, so readers only ever see a complete file.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self._cache = {}  # Maps user_id to (mtime_ns, size, config)
+        self._locks = {}  # Maps user_id to the lock serializing that user's writes
+        self._locks_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, user_id):
+        return os.path.join(self.directory, f'config_{user_id}.json')
+
+    def _lock(self, user_id):
+        with self._locks_lock:
+            lock = self._locks.get(user_id)
+            if lock is None:
+                lock = self._locks[user_id] = threading.RLock()
+            return lock
+
+    def exists(self, user_id):
+        return os.path.exists(self.path(user_id))
+
+    def get(self, user_id):
+        """A copy of the user's config, or None if they have none"""
+        path = self.path(user_id)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self._cache.pop(user_id, None)
+            return None
+        cached = self._cache.get(user_id)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            self.hits += 1
+            return copy.deepcopy(cached[2])
+        self.misses += 1
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        self._cache[user_id] = (st.st_mtime_ns, st.st_size, config)
+        return copy.deepcopy(config)
+
+    def version(self, user_id):
+        config = self.get(user_id)
+        return config.get(VERSION_KEY, 0) if config else None
+
+    def put(self, user_id, config):
+        """Atomically replace the user's config; returns its new version"""
+        with self._lock(user_id):
+            current = self.get(user_id)
+            config = dict(config)
+            config[VERSION_KEY] = (current.get(VERSION_KEY, 0) if current else 0) + 1
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.path(user_id)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(config, f, ensure_ascii=False, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            st = os.stat(path)
+            self._cache[user_id] = (st.st_mtime_ns, st.st_size, config)
+            return config[VERSION_KEY]
+
+    def get_or_create(self, user_id, default_factory):
+        """The user's config, writing default_factory() first if they have none"""
+        config = self.get(user_id)
+        if config is not None:
+            return config
+        with self._lock(user_id):
+            config = self.get(user_id)
+            if config is None:
+                self.put(user_id, default_factory())
+                config = self.get(user_id)
+            return config
@@ -0,0 +1,181 @@
+import csv
+import io
+import json
+import logging
+import os
+
+from results import ResultsFile
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Maps a download type to its file extension and MIME type
+EXPORT_FORMATS = {
+    'json': ('json', 'application/json'),
+    'ndjson': ('ndjson', 'application/x-ndjson'),
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+EXPORT_DIR = 'exports'
+PARQUET_BATCH_ROWS = 10000
+
+
+class ExportUnavailable(Exception):
+    """Raised when a format needs an optional package that isn't installed"""
+
+
+def iter_rows(results_file):
+    for raw in results_file.rows():
+        yield json.loads(raw)
+
+
+def columns_of(results_file):
+    """Every key used by any row, in order of first appearance"""
+    columns = {}
+    for row in iter_rows(results_file):
+        for key in row:
+            columns.setdefault(key, None)
+    return list(columns)
+
+
+def cell_value(value):
+    """Flatten a value for formats without nested types"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def cache_path(json_file, fmt):
+    """Where the export of a results file is cached; the source mtime is part of the name"""
+    mtime_ns = os.stat(json_file).st_mtime_ns
+    extension = EXPORT_FORMATS[fmt][0]
+    return os.path.join(os.path.dirname(json_file), EXPORT_DIR, f"scraped_data.{mtime_ns}.{extension}")
+
+
+def remove_stale_exports(path):
+    """Delete older cached exports of the same format"""
+    directory = os.path.dirname(path)
+    extension = os.path.splitext(path)[1]
+    for name in os.listdir(directory):
+        candidate = os.path.join(directory, name)
+        if candidate != path and name.startswith('scraped_data.') and name.endswith(extension):
+            try:
+                os.remove(candidate)
+            except OSError:
+                pass
+
+
+def stream_ndjson(results_file):
+    for raw in results_file.rows():
+        yield raw + b'\n'
+
+
+def stream_csv(results_file, chunk_rows=500):
+    columns = columns_of(results_file)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for number, row in enumerate(iter_rows(results_file), 1):
+        writer.writerow(['' if row.get(column) is None else cell_value(row.get(column)) for column in columns])
+        if number % chunk_rows == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def write_xlsx_rows(path, columns, rows):
+    """Write a header and rows of values (lists in columns order) as a streamed workbook"""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Results')
+    sheet.append(columns)
+    for row in rows:
+        sheet.append([cell_value(value) for value in row])
+    workbook.save(path)
+
+
+def write_xlsx(results_file, path):
+    columns = columns_of(results_file)
+    rows = ([row.get(column) for column in columns] for row in iter_rows(results_file))
+    write_xlsx_rows(path, columns, rows)
+
+
+def write_parquet(results_file, path):
+    if pyarrow is None:
+        raise ExportUnavailable("Parquet export needs the pyarrow package")
+    columns = columns_of(results_file)
+    # Scraped values are text or links; anything else is stored as its JSON text
+    schema = pyarrow.schema([(column, pyarrow.string()) for column in columns])
+    writer = pyarrow.parquet.ParquetWriter(path, schema)
+    try:
+        batch = {column: [] for column in columns}
+        count = 0
+        for row in iter_rows(results_file):
+            for column in columns:
+                value = row.get(column)
+                batch[column].append(None if value is None else str(cell_value(value)))
+            count += 1
+            if count == PARQUET_BATCH_ROWS:
+                writer.write_table(pyarrow.table(batch, schema=schema))
+                batch = {column: [] for column in columns}
+                count = 0
+        if count or not columns:
+            writer.write_table(pyarrow.table(batch, schema=schema))
+    finally:
+        writer.close()
+
+
+# Formats whose bytes can be sent while they are produced
+STREAMED_EXPORTS = {'csv': stream_csv, 'ndjson': stream_ndjson}
+# Formats that must be written completely before they can be sent
+FILE_EXPORTS = {'xlsx': write_xlsx, 'parquet': write_parquet}
+
+
+def export_results(json_file, fmt):
+    """Return ('file', path) for a cached export, or ('stream', chunks) while one is produced.
+
+    A streamed export is also written to the cache as it goes and only becomes
+    visible there once complete, so later downloads can be sent straight from disk.
+    """
+    if fmt == 'json':
+        return 'file', json_file
+    path = cache_path(json_file, fmt)
+    if os.path.exists(path):
+        return 'file', path
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    results_file = ResultsFile(json_file)
+    temp_path = f"{path}.{os.getpid()}.{id(results_file)}.tmp"
+
+    if fmt in FILE_EXPORTS:
+        try:
+            FILE_EXPORTS[fmt](results_file, temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        remove_stale_exports(path)
+        return 'file', path
+
+    def tee():
+        completed = False
+        try:
+            with open(temp_path, 'wb') as f:
+                for chunk in STREAMED_EXPORTS[fmt](results_file):
+                    f.write(chunk)
+                    yield chunk
+            os.replace(temp_path, path)
+            completed = True
+            remove_stale_exports(path)
+        finally:
+            if not completed and os.path.exists(temp_path):
+                os.remove(temp_path)
+    return 'stream', tee()
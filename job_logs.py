@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import struct
+import threading
+from array import array
+from collections import deque
+from datetime import datetime
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+JOB_LOG_FILE = 'job_log.jsonl'
+JOB_LOG_INDEX_FILE = 'job_log.idx'
+
+# Index file layout: journal size and stride, followed by one byte offset per stride records
+INDEX_HEADER = struct.Struct('<qq')
+
+
+class JobLogBuffer:
+    """Recent log records of one job, addressable by a monotonically increasing sequence number.
+
+    The newest `capacity` records are kept in a ring buffer in memory. Every record is
+    also appended to a JSON-lines journal in the job's output directory, with a sparse
+    offset index (one entry per `index_stride` records) so older ranges can be read
+    without scanning the whole file.
+    """
+    def __init__(self, output_dir, capacity=1000, index_stride=256):
+        self.path = os.path.join(output_dir, JOB_LOG_FILE)
+        self.index_path = os.path.join(output_dir, JOB_LOG_INDEX_FILE)
+        self.capacity = capacity
+        self.index_stride = index_stride
+        self._records = deque(maxlen=capacity)  # (seq, timestamp, message) tuples
+        self._offsets = array('q')
+        self._next_seq = 1
+        self._size = 0
+        self._file = None
+        self._closed = False
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            self._load_index()
+
+    @property
+    def last_seq(self):
+        return self._next_seq - 1
+
+    def append(self, message):
+        """Record a log line and return its sequence number, or None once the buffer is closed"""
+        timestamp = datetime.now().isoformat()
+        with self._lock:
+            if self._closed:
+                # Late output after the job finished; the journal and its index are final
+                return None
+            seq = self._next_seq
+            self._next_seq += 1
+            self._records.append((seq, timestamp, message))
+            try:
+                if self._file is None:
+                    self._file = open(self.path, 'ab')
+                if (seq - 1) % self.index_stride == 0:
+                    self._offsets.append(self._size)
+                line = json.dumps({'seq': seq, 'timestamp': timestamp, 'message': message}, ensure_ascii=False).encode('utf-8') + b'\n'
+                self._file.write(line)
+                self._size += len(line)
+            except Exception as e:
+                logger.error(f"Failed to write job log journal {self.path}: {str(e)}")
+        return seq
+
+    def read(self, since=0, limit=100):
+        """Return up to `limit` records with a sequence number greater than `since`"""
+        with self._lock:
+            oldest = self._records[0][0] if self._records else self._next_seq
+            if since + 1 >= oldest:
+                # Fast path: everything requested is still in memory
+                start = since + 1 - oldest
+                return [self._as_dict(record) for record in islice(self._records, start, start + limit)]
+            if self._file:
+                self._file.flush()
+        return self._read_journal(since, limit)
+
+    def close(self):
+        """Flush the journal and persist its offset index; later appends are ignored"""
+        with self._lock:
+            self._closed = True
+            if self._file:
+                try:
+                    self._file.close()
+                except Exception:
+                    pass
+                self._file = None
+            try:
+                with open(self.index_path, 'wb') as f:
+                    f.write(INDEX_HEADER.pack(self._size, self.index_stride))
+                    self._offsets.tofile(f)
+            except Exception as e:
+                logger.error(f"Failed to write job log index {self.index_path}: {str(e)}")
+
+    @staticmethod
+    def _as_dict(record):
+        seq, timestamp, message = record
+        return {'seq': seq, 'timestamp': timestamp, 'message': message}
+
+    def _load_index(self):
+        """Restore sequence state for an existing journal, rebuilding the index if it is stale"""
+        self._size = os.path.getsize(self.path)
+        try:
+            with open(self.index_path, 'rb') as f:
+                size, stride = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+                if size == self._size and stride == self.index_stride:
+                    self._offsets.frombytes(f.read())
+        except (OSError, struct.error):
+            pass
+
+        if self._offsets:
+            # Only the records after the last indexed offset need to be counted
+            seq = (len(self._offsets) - 1) * self.index_stride
+            start = self._offsets[-1]
+        else:
+            seq = 0
+            start = 0
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if seq % self.index_stride == 0 and (seq // self.index_stride) >= len(self._offsets):
+                    self._offsets.append(offset)
+                offset += len(line)
+                seq += 1
+        self._next_seq = seq + 1
+
+    def _read_journal(self, since, limit):
+        block = since // self.index_stride
+        if block >= len(self._offsets):
+            return []
+        records = []
+        seq = block * self.index_stride
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self._offsets[block])
+                for line in f:
+                    seq += 1
+                    if seq <= since:
+                        continue
+                    records.append(json.loads(line))
+                    if len(records) >= limit:
+                        break
+        except Exception as e:
+            logger.error(f"Failed to read job log journal {self.path}: {str(e)}")
+        return records
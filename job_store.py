@@ -0,0 +1,216 @@
+import base64
+import sqlite3
+import threading
+from datetime import datetime
+
+# Statuses a job can no longer leave
+TERMINAL_STATUSES = ('completed', 'failed', 'error', 'stopped', 'interrupted')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    completed_at TEXT,
+    updated_at TEXT NOT NULL,
+    item_count INTEGER,
+    output_dir TEXT,
+    output_json TEXT,
+    log_file TEXT,
+    config_version INTEGER,
+    compacted_at TEXT,
+    evicted_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at, job_id);
+CREATE INDEX IF NOT EXISTS jobs_user_created ON jobs (user_id, created_at, job_id);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at, job_id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+COLUMNS = (
+    'job_id', 'user_id', 'status', 'priority', 'created_at', 'started_at', 'completed_at',
+    'updated_at', 'item_count', 'output_dir', 'output_json', 'log_file', 'config_version',
+    'compacted_at', 'evicted_at'
+)
+
+# Columns added after the first release, created on stores that predate them
+ADDED_COLUMNS = {
+    'config_version': 'INTEGER',
+    'compacted_at': 'TEXT',
+    'evicted_at': 'TEXT',
+}
+
+
+def _timestamp(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_cursor(job):
+    """Opaque cursor pointing just past a job in newest-first order"""
+    return base64.urlsafe_b64encode(f"{job['created_at']}|{job['job_id']}".encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """(created_at, job_id) from a cursor; raises ValueError if it is malformed"""
+    try:
+        created_at, job_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 1)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return created_at, job_id
+
+
+class JobStore:
+    """Persistent registry of every scraper job, kept in SQLite (WAL mode).
+
+    The server keeps live handles (processes, log buffers) in memory only while a job
+    is queued or running; everything about a job's state and history is read from here.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SCHEMA)
+            existing = {row[1] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+            for name, column_type in ADDED_COLUMNS.items():
+                if name not in existing:
+                    self._conn.execute(f'ALTER TABLE jobs ADD COLUMN {name} {column_type}')
+
+    def create(self, job_id, user_id, status, created_at, **fields):
+        values = {
+            'job_id': job_id,
+            'user_id': user_id,
+            'status': status,
+            'created_at': _timestamp(created_at),
+            'updated_at': datetime.now().isoformat(),
+        }
+        values.update({key: _timestamp(value) for key, value in fields.items()})
+        names = ', '.join(values)
+        placeholders = ', '.join('?' for _ in values)
+        with self._lock:
+            self._conn.execute(f'INSERT OR REPLACE INTO jobs ({names}) VALUES ({placeholders})', tuple(values.values()))
+
+    def update(self, job_id, **fields):
+        """Set some columns of a job"""
+        unknown = set(fields) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+        fields['updated_at'] = datetime.now()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f'UPDATE jobs SET {assignments} WHERE job_id = ?',
+                tuple(_timestamp(value) for value in fields.values()) + (job_id,)
+            )
+
+    def get(self, job_id):
+        """A job as a dict, or None if it is unknown"""
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, user_id=None, status=None, since=None, until=None, cursor=None, limit=50):
+        """One page of jobs, newest first, and the cursor of the next page (None on the last page).
+
+        since/until bound created_at (ISO timestamps, inclusive/exclusive). Pages are
+        read by seeking the (created_at, job_id) indexes, so the cost of a page does not
+        depend on how many jobs precede it.
+        """
+        conditions = []
+        params = []
+        if user_id:
+            conditions.append('user_id = ?')
+            params.append(user_id)
+        if status:
+            statuses = [status] if isinstance(status, str) else list(status)
+            conditions.append(f"status IN ({', '.join('?' for _ in statuses)})")
+            params.extend(statuses)
+        if since:
+            conditions.append('created_at >= ?')
+            params.append(_timestamp(since))
+        if until:
+            conditions.append('created_at < ?')
+            params.append(_timestamp(until))
+        if cursor:
+            conditions.append('(created_at, job_id) < (?, ?)')
+            params.extend(decode_cursor(cursor))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT * FROM jobs {where} ORDER BY created_at DESC, job_id DESC LIMIT ?',
+                params + [limit + 1]
+            ).fetchall()
+        jobs = [dict(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(jobs[-1]) if len(rows) > limit else None
+        return jobs, next_cursor
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def count(self, status):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (status,)).fetchone()[0]
+
+    def finished(self, job_ids):
+        """The subset of job_ids whose jobs have reached a terminal status"""
+        job_ids = list(job_ids)
+        finished = []
+        placeholders = ', '.join('?' for _ in TERMINAL_STATUSES)
+        with self._lock:
+            # Chunked to stay below SQLite's host parameter limit
+            for start in range(0, len(job_ids), 500):
+                chunk = job_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT job_id FROM jobs WHERE status IN ({placeholders}) AND job_id IN ({', '.join('?' for _ in chunk)})",
+                    TERMINAL_STATUSES + tuple(chunk)
+                ).fetchall()
+                finished.extend(row[0] for row in rows)
+        return finished
+
+    def retained_jobs(self):
+        """Finished jobs whose output hasn't been evicted, oldest first"""
+        placeholders = ', '.join('?' for _ in TERMINAL_STATUSES)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT job_id, user_id, created_at, completed_at, output_dir, compacted_at FROM jobs "
+                f"WHERE status IN ({placeholders}) AND evicted_at IS NULL ORDER BY COALESCE(completed_at, created_at)",
+                TERMINAL_STATUSES
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def unfinished_job_ids(self):
+        placeholders = ', '.join('?' for _ in TERMINAL_STATUSES)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT job_id FROM jobs WHERE status NOT IN ({placeholders})", TERMINAL_STATUSES).fetchall()
+        return {row[0] for row in rows}
+
+    def mark_interrupted(self, keep=None):
+        """Close out jobs left queued or running by a previous server process; returns how many.
+
+        keep is an optional predicate on job_id for unfinished jobs that must be left
+        alone, e.g. ones another live API worker is running.
+        """
+        now = datetime.now().isoformat()
+        with self._lock:
+            job_ids = [row[0] for row in self._conn.execute("SELECT job_id FROM jobs WHERE status IN ('queued', 'running')")]
+            if keep:
+                job_ids = [job_id for job_id in job_ids if not keep(job_id)]
+            for job_id in job_ids:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'interrupted', completed_at = ?, updated_at = ? WHERE job_id = ?",
+                    (now, now, job_id)
+                )
+            return len(job_ids)
@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class RoomLogQueue:
+    """Bounded queue of pending log lines for one Socket.IO room"""
+    def __init__(self, max_lines):
+        self.lines = deque()  # (job_id, message, seq) tuples in arrival order
+        self.max_lines = max_lines
+        self.dropped = {}  # Maps job_id to lines dropped since the last frame
+        self.first_queued_at = None
+
+    def push(self, job_id, message, seq):
+        if len(self.lines) >= self.max_lines:
+            # Under backpressure keep the newest lines and remember how many were lost
+            dropped_job_id = self.lines.popleft()[0]
+            self.dropped[dropped_job_id] = self.dropped.get(dropped_job_id, 0) + 1
+        if not self.lines:
+            self.first_queued_at = time.monotonic()
+        self.lines.append((job_id, message, seq))
+
+    def take(self):
+        lines, dropped = self.lines, self.dropped
+        self.lines = deque()
+        self.dropped = {}
+        self.first_queued_at = None
+        return lines, dropped
+
+
+class LogBroadcaster:
+    """Coalesces job log lines into batched frames per room and job.
+
+    A room's frame is sent once it holds max_batch_lines lines or its oldest line
+    has waited max_batch_delay seconds. Each room buffers at most max_queue_lines;
+    older lines are dropped and reported as a count in the next frame.
+    """
+    def __init__(self, emit, max_batch_lines=50, max_batch_delay=0.25, max_queue_lines=2000):
+        self._emit = emit  # Callable taking (room, payload)
+        self.max_batch_lines = max_batch_lines
+        self.max_batch_delay = max_batch_delay
+        self.max_queue_lines = max_queue_lines
+        self._rooms = {}  # Maps room name to RoomLogQueue
+        self._lock = threading.Lock()
+        self._emit_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self.frames_sent = 0
+        self.lines_sent = 0
+        self.lines_dropped = 0
+
+    def start(self):
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+        logger.info(f"Started log broadcaster (batch {self.max_batch_lines} lines / {int(self.max_batch_delay * 1000)} ms)")
+
+    def publish(self, room, job_id, message, seq=None):
+        """Queue one log line for a room; seq is the line's position in the job log"""
+        with self._lock:
+            room_queue = self._rooms.get(room)
+            if room_queue is None:
+                room_queue = self._rooms[room] = RoomLogQueue(self.max_queue_lines)
+            room_queue.push(job_id, message, seq)
+            full = len(room_queue.lines) >= self.max_batch_lines
+        if full:
+            self._wakeup.set()
+
+    def flush(self, room=None):
+        """Send everything queued, for one room or for all rooms"""
+        self._send_due(force=True, only_room=room)
+
+    def discard(self, room):
+        """Forget a room's pending lines, e.g. once its last client has left"""
+        with self._lock:
+            self._rooms.pop(room, None)
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(self.max_batch_delay)
+            self._wakeup.clear()
+            try:
+                self._send_due()
+            except Exception as e:
+                logger.error(f"Error flushing log frames: {str(e)}")
+
+    def _send_due(self, force=False, only_room=None):
+        with self._emit_lock:
+            now = time.monotonic()
+            due = []
+            with self._lock:
+                for room, room_queue in list(self._rooms.items()):
+                    if only_room is not None and room != only_room:
+                        continue
+                    if not room_queue.lines:
+                        if not room_queue.dropped:
+                            del self._rooms[room]
+                        continue
+                    if force or len(room_queue.lines) >= self.max_batch_lines or now - room_queue.first_queued_at >= self.max_batch_delay:
+                        due.append((room, room_queue.take()))
+
+            for room, (lines, dropped) in due:
+                self._send_room(room, lines, dropped)
+
+    def _send_room(self, room, lines, dropped):
+        # Group the room's lines by job so every frame belongs to a single job
+        by_job = {}
+        for job_id, message, seq in lines:
+            by_job.setdefault(job_id, []).append((message, seq))
+        for job_id in dropped:
+            by_job.setdefault(job_id, [])
+
+        timestamp = datetime.now().isoformat()
+        for job_id, entries in by_job.items():
+            dropped_count = dropped.get(job_id, 0)
+            if dropped_count:
+                self.lines_dropped += dropped_count
+                entries = [(f"... {dropped_count} log lines skipped because the client could not keep up ...", None)] + entries
+            # Split oversized backlogs into frames of at most max_batch_lines, each naming its own last line
+            for start in range(0, len(entries), self.max_batch_lines):
+                chunk = [message for message, _ in entries[start:start + self.max_batch_lines]]
+                seqs = [seq for _, seq in entries[start:start + self.max_batch_lines] if seq is not None]
+                payload = {
+                    'type': 'log',
+                    'job_id': job_id,
+                    'message': '\n'.join(chunk),
+                    'messages': chunk,
+                    'dropped': dropped_count if start == 0 else 0,
+                    'last_seq': seqs[-1] if seqs else None,
+                    'timestamp': timestamp
+                }
+                try:
+                    self._emit(room, payload)
+                    self.frames_sent += 1
+                    self.lines_sent += len(chunk)
+                except Exception as e:
+                    logger.error(f"Failed to send log frame to room {room}: {str(e)}")
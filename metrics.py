@@ -0,0 +1,237 @@
+import json
+import math
+import threading
+import time
+
+# Scraper processes report metrics to the server as stdout lines starting with this marker
+METRICS_LINE_PREFIX = '@@metrics '
+
+# Default latency buckets in seconds, from a fast WebDriver call to a slow page load
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_key, extra=None):
+    pairs = list(label_key)
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, func=None):
+        self.name = name
+        self.help_text = help_text
+        self.func = func  # Optional callable returning the current value at scrape time
+        self._values = {}  # Maps label key to value
+        self._lock = threading.Lock()
+
+    def samples(self):
+        if self.func:
+            yield self.name, (), self.func()
+            return
+        with self._lock:
+            items = list(self._values.items())
+        for label_key, value in items:
+            yield self.name, label_key, value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        for name, label_key, value in self.samples():
+            lines.append(f'{name}{_format_labels(label_key)} {_format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        for label_key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(label_key, ("le", _format_value(bound)))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(label_key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(label_key)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the server's metrics and renders them in the Prometheus text format"""
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, func=None):
+        return self.register(Counter(name, help_text, func))
+
+    def gauge(self, name, help_text, func=None):
+        return self.register(Gauge(name, help_text, func))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def ingest(self, report):
+        """Apply a report sent by a scraper process; names the server doesn't know are ignored"""
+        for name, labels, amount in report.get('counters', []):
+            metric = self._metrics.get(name)
+            if isinstance(metric, Counter):
+                metric.inc(amount, **labels)
+        for name, labels, values in report.get('observations', []):
+            metric = self._metrics.get(name)
+            if isinstance(metric, Histogram):
+                for value in values:
+                    metric.observe(value, **labels)
+
+    def ingest_line(self, line):
+        """Parse a METRICS_LINE_PREFIX line; returns False if it isn't one"""
+        if not line.startswith(METRICS_LINE_PREFIX):
+            return False
+        try:
+            self.ingest(json.loads(line[len(METRICS_LINE_PREFIX):]))
+        except (ValueError, TypeError, AttributeError):
+            pass
+        return True
+
+
+class MetricsReporter:
+    """Scraper-side collector that aggregates metric updates and sends them as one line per interval"""
+    def __init__(self, sink, interval=2.0):
+        self.sink = sink  # Callable taking one encoded line
+        self.interval = interval
+        self._counters = {}
+        self._observations = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._thread.start()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._observations.setdefault(key, []).append(round(value, 6))
+
+    def time(self, name, **labels):
+        """Context manager observing the duration of a block"""
+        return _Timer(self, name, labels)
+
+    def flush(self):
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            observations, self._observations = self._observations, {}
+        if not counters and not observations:
+            return
+        report = {
+            'counters': [[name, dict(label_key), amount] for (name, label_key), amount in counters.items()],
+            'observations': [[name, dict(label_key), values] for (name, label_key), values in observations.items()],
+        }
+        try:
+            self.sink(METRICS_LINE_PREFIX + json.dumps(report, separators=(',', ':')))
+        except Exception:
+            pass
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+
+class _Timer:
+    def __init__(self, reporter, name, labels):
+        self.reporter = reporter
+        self.name = name
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.reporter.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Trace events kept per job; beyond this only the totals keep growing
+MAX_TRACE_EVENTS = 200000
+
+
+class Tracer:
+    """Records a job's phases, steps and waits and writes them as Chrome trace-event JSON.
+
+    The output file opens in Perfetto (ui.perfetto.dev) or chrome://tracing. Spans in
+    the "wait" category are time spent sleeping or polling, so they can be told apart
+    from real work when reading the timeline or the summary.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.events = []
+        self.totals = {}  # Maps category to seconds
+        self.phase_totals = {}  # Maps phase name to seconds
+        self._origin = time.perf_counter()
+        self._started_at = self._origin
+        self._thread_ids = {}
+        self._phase = None
+        self._lock = threading.Lock()
+
+    def start(self, path=None, enabled=True):
+        """Begin tracing a new job, writing to path on save()"""
+        with self._lock:
+            self.enabled = enabled
+            self.path = path
+            self.events = []
+            self.totals = {}
+            self.phase_totals = {}
+            self._origin = time.perf_counter()
+            self._started_at = self._origin
+            self._thread_ids = {}
+            self._phase = None
+        if enabled:
+            self._metadata('process_name', name='scraper job')
+
+    def _tid(self):
+        ident = threading.get_ident()
+        with self._lock:
+            tid = self._thread_ids.get(ident)
+            if tid is None:
+                # Numbered under the lock, so two new threads can't get the same tid
+                tid = self._thread_ids[ident] = len(self._thread_ids) + 1
+                self.events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid,
+                                    'args': {'name': threading.current_thread().name}})
+        return tid
+
+    def _metadata(self, kind, tid=0, **args):
+        with self._lock:
+            self.events.append({'name': kind, 'ph': 'M', 'pid': 1, 'tid': tid, 'args': args})
+
+    def _record(self, name, category, started, ended, args):
+        duration = ended - started
+        tid = self._tid()
+        with self._lock:
+            self.totals[category] = self.totals.get(category, 0.0) + duration
+            if len(self.events) < MAX_TRACE_EVENTS:
+                event = {
+                    'name': name,
+                    'cat': category,
+                    'ph': 'X',
+                    'ts': round((started - self._origin) * 1e6, 1),
+                    'dur': round(duration * 1e6, 1),
+                    'pid': 1,
+                    'tid': tid,
+                }
+                if args:
+                    event['args'] = args
+                self.events.append(event)
+
+    @contextmanager
+    def span(self, name, category='work', **args):
+        """Time a block as one complete trace event"""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, category, started, time.perf_counter(), args)
+
+    def sleep(self, seconds, name='sleep'):
+        """time.sleep() that shows up as a wait span"""
+        with self.span(name, 'wait', seconds=seconds):
+            time.sleep(seconds)
+
+    def phase(self, name):
+        """End the current top-level phase, if any, and start the next one"""
+        now = time.perf_counter()
+        if self._phase:
+            previous, started = self._phase
+            self.phase_totals[previous] = self.phase_totals.get(previous, 0.0) + now - started
+            if self.enabled:
+                self._record(previous, 'phase', started, now, None)
+        self._phase = (name, now) if name else None
+
+    def summary(self):
+        """One-line timing summary of the job so far"""
+        elapsed = time.perf_counter() - self._started_at
+        parts = [f"total {elapsed:.1f}s"]
+        if self.phase_totals:
+            parts.append("phases: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.phase_totals.items()))
+        waited = self.totals.get('wait', 0.0)
+        if waited:
+            parts.append(f"waiting {waited:.1f}s ({100 * waited / elapsed:.0f}%)" if elapsed else f"waiting {waited:.1f}s")
+        for category in ('navigation', 'subpage', 'page'):
+            if category in self.totals:
+                parts.append(f"{category} {self.totals[category]:.1f}s")
+        return "; ".join(parts)
+
+    def save(self):
+        """Close the open phase and write the trace file"""
+        self.phase(None)
+        if not self.enabled or not self.path:
+            return None
+        with self._lock:
+            events = list(self.events)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return self.path
@@ -0,0 +1,107 @@
+import logging
+
+import socketio
+from engineio import packet as eio_packet
+from socketio import packet
+
+logger = logging.getLogger(__name__)
+
+# Event a client receives after frames were dropped for it, before its next frame
+GAP_EVENT = 'log_gap'
+# Room suffix for clients that asked for the compact encoding
+COMPACT_ROOM_SUFFIX = ':c'
+
+
+def compact_log_frame(payload):
+    """The compact form of a log frame: [job_id, last_seq, dropped, lines].
+
+    Verbose frames carry every line twice (joined and as a list) plus repeated key
+    names and a timestamp; at high log rates the compact form is a fraction of that.
+    """
+    return [payload['job_id'], payload.get('last_seq'), payload.get('dropped', 0), payload['messages']]
+
+
+class BoundedQueueManager(socketio.Manager):
+    """Client manager that bounds what may pile up for each client.
+
+    Frames of the droppable events (high-rate log traffic) are skipped for a client
+    whose Engine.IO send queue already holds max_client_queue packets, so one slow
+    client can't grow server memory or hold back the others. The client is told how
+    many frames it missed once it catches up and can re-read them from /job-logs.
+    Other events are always delivered. Each frame is encoded once per broadcast.
+
+    It reads the Engine.IO socket queue and sends through the server's _send_packet
+    and _send_eio_packet, which are not public API; requirements.txt pins
+    python-socketio and python-engineio to the versions this was written against.
+    """
+    def __init__(self, max_client_queue=256, droppable_events=('log',)):
+        super().__init__()
+        self._setup_bounds(max_client_queue, droppable_events)
+
+    def _setup_bounds(self, max_client_queue, droppable_events):
+        self.max_client_queue = max_client_queue
+        self.droppable_events = set(droppable_events)
+        self.dropped = {}  # Maps sid to frames dropped since its last delivered frame
+        self.frames_dropped = 0
+
+    def _backlog(self, eio_sid):
+        eio_socket = self.server.eio.sockets.get(eio_sid)
+        if eio_socket is None:
+            return 0
+        try:
+            return eio_socket.queue.qsize()
+        except (AttributeError, NotImplementedError):
+            return 0
+
+    def emit(self, event, data, namespace, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        if event not in self.droppable_events or callback:
+            return super().emit(event, data, namespace, room=room, skip_sid=skip_sid, callback=callback, to=to, **kwargs)
+        room = to or room
+        if namespace not in self.rooms:
+            return
+        data = list(data) if isinstance(data, tuple) else ([] if data is None else [data])
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+        encoded = self.server.packet_class(packet.EVENT, namespace=namespace, data=[event] + data).encode()
+        eio_packets = [eio_packet.Packet(eio_packet.MESSAGE, p) for p in (encoded if isinstance(encoded, list) else [encoded])]
+        for sid, eio_sid in self.get_participants(namespace, room):
+            if sid in skip_sid:
+                continue
+            if self._backlog(eio_sid) >= self.max_client_queue:
+                self.dropped[sid] = self.dropped.get(sid, 0) + 1
+                self.frames_dropped += 1
+                continue
+            gap = self.dropped.pop(sid, 0)
+            if gap:
+                self.server._send_packet(eio_sid, self.server.packet_class(
+                    packet.EVENT, namespace=namespace, data=[GAP_EVENT, {'type': GAP_EVENT, 'dropped_frames': gap}]))
+            for eio_pkt in eio_packets:
+                self.server._send_eio_packet(eio_sid, eio_pkt)
+
+    def disconnect(self, sid, namespace, **kwargs):
+        self.dropped.pop(sid, None)
+        return super().disconnect(sid, namespace, **kwargs)
+
+
+def create_client_manager(message_queue=None, max_client_queue=256, droppable_events=('log',), channel='flask-socketio'):
+    """A BoundedQueueManager, layered under a message-queue manager when one is configured.
+
+    The queue manager publishes every emit to all API workers; each worker then
+    delivers to its own clients through the bounded emit above.
+    """
+    if not message_queue:
+        return BoundedQueueManager(max_client_queue, droppable_events)
+    if message_queue.startswith(('redis://', 'rediss://')):
+        queue_class = socketio.RedisManager
+    elif message_queue.startswith('kafka://'):
+        queue_class = socketio.KafkaManager
+    elif message_queue.startswith('zmq'):
+        queue_class = socketio.ZmqManager
+    else:
+        queue_class = socketio.KombuManager
+    # MRO: queue manager -> PubSubManager -> BoundedQueueManager -> Manager, so received
+    # messages are delivered through the bounded emit
+    manager_class = type(f"Bounded{queue_class.__name__}", (queue_class, BoundedQueueManager), {})
+    manager = manager_class(message_queue, channel=channel)
+    manager._setup_bounds(max_client_queue, droppable_events)
+    return manager
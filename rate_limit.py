@@ -0,0 +1,79 @@
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Seconds between requests to one domain when a config doesn't set base_request_delay
+DEFAULT_REQUEST_DELAY = 2
+
+
+def domain_of(url):
+    """Host a URL points at, without a leading www."""
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class DomainRateLimiter:
+    """Token bucket per target domain, shared by every scraper process on the host.
+
+    Bucket state lives in a SQLite database, so jobs running in separate processes
+    (or pool workers) draw from the same bucket when they hit the same site, while
+    jobs on different sites never wait for each other. With db_path=None the buckets
+    are private to this process.
+    """
+    def __init__(self, db_path=None, rate=1 / DEFAULT_REQUEST_DELAY, burst=2, domains=None):
+        self.rate = rate  # Requests per second allowed per domain
+        self.burst = burst  # Requests that may go out back to back after an idle period
+        self.domains = {domain_of('//' + host) or host: limits for host, limits in (domains or {}).items()}
+        self._conn = sqlite3.connect(db_path or ':memory:', timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            if db_path:
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets (domain TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+
+    def close(self):
+        """Close the bucket database connection"""
+        with self._lock:
+            self._conn.close()
+
+    def limits_for(self, domain):
+        """(rate, burst) for a domain, falling back to the defaults"""
+        limits = self.domains.get(domain) or {}
+        return float(limits.get('rate', self.rate)), float(limits.get('burst', self.burst))
+
+    def _take(self, domain, rate, burst):
+        """Take a token if one is available; otherwise return the seconds until one will be"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                row = self._conn.execute('SELECT tokens, updated FROM buckets WHERE domain = ?', (domain,)).fetchone()
+                tokens = burst if row is None else min(burst, row[0] + max(0.0, now - row[1]) * rate)
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / rate
+                self._conn.execute('INSERT OR REPLACE INTO buckets (domain, tokens, updated) VALUES (?, ?, ?)', (domain, tokens, now))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return wait
+
+    def acquire(self, url):
+        """Block until a request to url's domain is allowed; returns the seconds spent waiting"""
+        domain = domain_of(url)
+        rate, burst = self.limits_for(domain)
+        if not domain or rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            wait = self._take(domain, rate, max(1.0, burst))
+            if not wait:
+                return waited
+            time.sleep(wait)
+            waited += wait
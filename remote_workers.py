@@ -0,0 +1,443 @@
+import json
+import logging
+import os
+import queue
+import re
+import shlex
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = 'X-Worker-Token'
+HEARTBEAT_INTERVAL = 10.0  # Seconds between a node's heartbeats
+LEASE_WAIT = 20.0  # Longest time a lease request is held open waiting for a job
+LOG_BATCH_LINES = 200
+LOG_BATCH_DELAY = 0.5
+UPLOAD_SKIP_SUFFIXES = ('.idx', '.tmp')  # Derived or partial files the server rebuilds itself
+SCRAPER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scrap.py')
+
+
+class RemoteNode:
+    """A registered worker node and the jobs it currently holds"""
+    def __init__(self, node_id, hostname, capacity):
+        self.node_id = node_id
+        self.hostname = hostname
+        self.capacity = capacity
+        self.jobs = set()
+        self.last_seen = time.monotonic()
+
+
+class RemoteJob:
+    def __init__(self, job_id, config):
+        self.job_id = job_id
+        self.config = config
+        self.node_id = None
+        self.stop_requested = False
+        self.messages = queue.Queue()  # ('logs', lines) and ('done', return_code) from the node
+
+
+class RemoteWorkerRegistry:
+    """Queue of jobs leased to scraper worker nodes that connect over HTTP.
+
+    Nodes register with a capacity, lease jobs, send heartbeats, stream log lines and
+    upload output files. run_job mirrors ScraperWorkerPool.run_job, so the scheduler
+    and run_scraper_process work the same whether a job runs locally or on a node.
+    A node that misses heartbeats for `timeout` seconds is dropped and its jobs are
+    reported like a crashed worker.
+    """
+    def __init__(self, timeout=30.0, on_capacity_change=None):
+        self.timeout = timeout
+        self.on_capacity_change = on_capacity_change  # Called with the total capacity of live nodes
+        self._nodes = {}  # Maps node_id to RemoteNode
+        self._jobs = {}  # Maps job_id to RemoteJob, from submission until the node reports it done
+        self._pending = deque()  # RemoteJobs not leased yet, oldest first
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def start(self):
+        threading.Thread(target=self._reap_loop, daemon=True).start()
+
+    @property
+    def capacity(self):
+        with self._condition:
+            return sum(node.capacity for node in self._nodes.values())
+
+    def nodes(self):
+        """A summary of every live node"""
+        now = time.monotonic()
+        with self._condition:
+            return [{
+                'node_id': node.node_id,
+                'hostname': node.hostname,
+                'capacity': node.capacity,
+                'jobs': sorted(node.jobs),
+                'last_seen_seconds': round(now - node.last_seen, 1),
+            } for node in self._nodes.values()]
+
+    def register(self, hostname, capacity, node_id=None):
+        node_id = node_id or uuid.uuid4().hex[:12]
+        with self._condition:
+            previous = self._nodes.get(node_id)
+            if previous:
+                # A node that restarted with the same id has lost whatever it was running
+                self._fail_jobs_locked(previous)
+            self._nodes[node_id] = RemoteNode(node_id, hostname, max(1, int(capacity)))
+        logger.info(f"Registered scraper node {node_id} ({hostname}) with capacity {capacity}")
+        self._capacity_changed()
+        return node_id
+
+    def unregister(self, node_id):
+        with self._condition:
+            node = self._nodes.pop(node_id, None)
+            if node:
+                self._fail_jobs_locked(node)
+        if node:
+            logger.info(f"Scraper node {node_id} left")
+            self._capacity_changed()
+        return node is not None
+
+    def heartbeat(self, node_id):
+        """Refresh a node's lease; returns the job ids it must stop, or None if the node is unknown"""
+        with self._condition:
+            node = self._nodes.get(node_id)
+            if not node:
+                return None
+            node.last_seen = time.monotonic()
+            return [job_id for job_id in node.jobs if self._jobs[job_id].stop_requested]
+
+    def lease(self, node_id, wait=LEASE_WAIT):
+        """Hand the oldest pending job to a node with a free slot, waiting up to `wait` seconds.
+
+        Returns (job_id, config), None if nothing became available, or raises KeyError
+        for an unknown node.
+        """
+        deadline = time.monotonic() + wait
+        with self._condition:
+            while True:
+                node = self._nodes.get(node_id)
+                if not node:
+                    raise KeyError(node_id)
+                node.last_seen = time.monotonic()
+                if self._pending and len(node.jobs) < node.capacity:
+                    job = self._pending.popleft()
+                    job.node_id = node_id
+                    node.jobs.add(job.job_id)
+                    logger.info(f"Leased job {job.job_id} to scraper node {node_id}")
+                    return job.job_id, job.config
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed:
+                    return None
+                self._condition.wait(remaining)
+
+    def holds(self, node_id, job_id):
+        """Whether a node currently holds a job, i.e. may report on it"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return bool(job and job.node_id == node_id and node_id in self._nodes)
+
+    def add_logs(self, node_id, job_id, lines):
+        with self._condition:
+            if not self.holds(node_id, job_id):
+                return False
+            self._jobs[job_id].messages.put(('logs', lines))
+            self._nodes[node_id].last_seen = time.monotonic()
+            return True
+
+    def finish(self, node_id, job_id, return_code):
+        with self._condition:
+            if not self.holds(node_id, job_id):
+                return False
+            job = self._jobs.pop(job_id)
+            self._nodes[node_id].jobs.discard(job_id)
+            self._condition.notify_all()
+        job.messages.put(('done', return_code))
+        return True
+
+    def run_job(self, job_id, config_path, on_output):
+        """Queue a job for the nodes and block until one finishes it, streaming its log lines to on_output.
+
+        Returns the job's exit code, like the return code of a scrap.py subprocess.
+        """
+        with open(config_path, 'r', encoding='utf-8') as f:
+            job = RemoteJob(job_id, json.load(f))
+        with self._condition:
+            self._jobs[job_id] = job
+            self._pending.append(job)
+            self._condition.notify_all()
+        while True:
+            kind, payload = job.messages.get()
+            if kind == 'logs':
+                for line in payload:
+                    on_output(line)
+            elif kind == 'done':
+                return payload
+
+    def cancel(self, job_id):
+        """Stop a job: drop it if no node leased it yet, otherwise tell its node on the next heartbeat"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if not job:
+                return False
+            if job.node_id is None:
+                self._pending.remove(job)
+                del self._jobs[job_id]
+                job.messages.put(('done', -1))
+            else:
+                job.stop_requested = True
+        logger.info(f"Cancelling remote job {job_id}")
+        return True
+
+    def shutdown(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _fail_jobs_locked(self, node):
+        for job_id in node.jobs:
+            job = self._jobs.pop(job_id, None)
+            if job:
+                logger.warning(f"Lost scraper node {node.node_id} while it ran job {job_id}")
+                job.messages.put(('done', -1))
+        node.jobs.clear()
+        self._condition.notify_all()
+
+    def _capacity_changed(self):
+        if self.on_capacity_change:
+            self.on_capacity_change(self.capacity)
+
+    def _reap_loop(self):
+        while not self._closed:
+            time.sleep(min(5.0, self.timeout / 3))
+            now = time.monotonic()
+            with self._condition:
+                expired = [node for node in self._nodes.values() if now - node.last_seen > self.timeout]
+                for node in expired:
+                    logger.warning(f"Scraper node {node.node_id} missed its heartbeats, dropping it")
+                    del self._nodes[node.node_id]
+                    self._fail_jobs_locked(node)
+            if expired:
+                self._capacity_changed()
+
+
+class WorkerNode:
+    """A scraper worker node: leases jobs from the server and runs each as a scrap.py subprocess.
+
+    command replaces `python -u scrap.py` like the server's SCRAPER_COMMAND; --config <path> is appended.
+    """
+    def __init__(self, server_url, capacity=1, token=None, node_id=None, work_dir='.', command=None):
+        self.server_url = server_url.rstrip('/')
+        self.capacity = capacity
+        self.node_id = node_id
+        self.work_dir = work_dir
+        self.command = shlex.split(command, posix=os.name != 'nt') if command else [sys.executable, '-u', SCRAPER_PATH]
+        self.session = requests.Session()
+        if token:
+            self.session.headers[TOKEN_HEADER] = token
+        self._processes = {}  # Maps job_id to its scrap.py process
+        self._lock = threading.Lock()
+        self._registered = threading.Event()
+
+    def _url(self, *parts):
+        return '/'.join((self.server_url, 'workers') + parts)
+
+    def register(self):
+        while True:
+            try:
+                response = self.session.post(self._url('register'), json={
+                    'node_id': self.node_id,
+                    'hostname': socket.gethostname(),
+                    'capacity': self.capacity,
+                }, timeout=30)
+                response.raise_for_status()
+                self.node_id = response.json()['node_id']
+                self._registered.set()
+                logger.info(f"Registered with {self.server_url} as node {self.node_id}")
+                return
+            except Exception as e:
+                logger.error(f"Could not register with {self.server_url}: {str(e)}")
+                time.sleep(HEARTBEAT_INTERVAL)
+
+    def run(self):
+        self.register()
+        threading.Thread(target=self._heartbeat_loop, daemon=True).start()
+        slots = [threading.Thread(target=self._slot_loop, name=f"node-slot-{number}", daemon=True) for number in range(self.capacity)]
+        for slot in slots:
+            slot.start()
+        try:
+            for slot in slots:
+                slot.join()
+        except KeyboardInterrupt:
+            self.stop_all()
+            try:
+                self.session.post(self._url(self.node_id, 'leave'), timeout=5)
+            except Exception:
+                pass
+
+    def stop_all(self):
+        with self._lock:
+            processes = list(self._processes.items())
+        for job_id, process in processes:
+            self._stop(job_id, process)
+
+    def _stop(self, job_id, process):
+        logger.info(f"Stopping job {job_id}")
+        try:
+            process.terminate()
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        except Exception:
+            pass
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            try:
+                response = self.session.post(self._url(self.node_id, 'heartbeat'), timeout=30)
+                if response.status_code == 404:
+                    # The server dropped us (restart or missed heartbeats); our jobs are already failed there
+                    logger.warning("Server no longer knows this node, registering again")
+                    self._registered.clear()
+                    self.stop_all()
+                    self.register()
+                    continue
+                response.raise_for_status()
+                for job_id in response.json().get('stop', []):
+                    with self._lock:
+                        process = self._processes.get(job_id)
+                    if process:
+                        self._stop(job_id, process)
+            except Exception as e:
+                logger.error(f"Heartbeat failed: {str(e)}")
+
+    def _slot_loop(self):
+        while True:
+            self._registered.wait()
+            try:
+                response = self.session.post(self._url(self.node_id, 'lease'), timeout=LEASE_WAIT + 30)
+                if response.status_code == 204:
+                    continue
+                if response.status_code == 404:
+                    # Registering again is up to the heartbeat thread
+                    time.sleep(HEARTBEAT_INTERVAL)
+                    continue
+                response.raise_for_status()
+                lease = response.json()
+            except Exception as e:
+                logger.error(f"Lease request failed: {str(e)}")
+                time.sleep(HEARTBEAT_INTERVAL)
+                continue
+            self._run_job(lease['job_id'], lease['config'])
+
+    def _run_job(self, job_id, config):
+        output_dir = os.path.join(self.work_dir, config.get('output_dir') or os.path.join('output', job_id))
+        os.makedirs(output_dir, exist_ok=True)
+        # Domain rate limits are shared by the jobs of this node rather than the server's
+        config['rate_limit_db'] = os.path.abspath(os.path.join(self.work_dir, 'data', 'rate_limits.sqlite'))
+        os.makedirs(os.path.dirname(config['rate_limit_db']), exist_ok=True)
+        # Response archives live on the node that recorded them, one directory per user
+        if isinstance(config.get('response_cache'), dict):
+            user_dir = re.sub(r'[^\w-]', '_', os.path.basename(config['response_cache'].get('dir') or '')) or '_'
+            config['response_cache']['dir'] = os.path.abspath(os.path.join(self.work_dir, 'data', 'response_cache', user_dir))
+        config_path = os.path.join(output_dir, 'config.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False, indent=4)
+
+        logger.info(f"Running job {job_id}")
+        return_code = -1
+        try:
+            process = subprocess.Popen(
+                self.command + ['--config', os.path.abspath(config_path)],
+                cwd=self.work_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                universal_newlines=True,
+                encoding='utf-8',
+                errors='replace',
+                bufsize=1
+            )
+            with self._lock:
+                self._processes[job_id] = process
+            self._stream_output(job_id, process)
+            return_code = process.wait()
+        except Exception as e:
+            logger.error(f"Job {job_id} failed to run: {str(e)}")
+            self._send_logs(job_id, [f"Scraper node {self.node_id} could not run the job: {str(e)}"])
+        finally:
+            with self._lock:
+                self._processes.pop(job_id, None)
+
+        try:
+            self._upload_outputs(job_id, output_dir)
+        except Exception as e:
+            logger.error(f"Uploading outputs of job {job_id} failed: {str(e)}")
+            self._send_logs(job_id, [f"Uploading results from scraper node {self.node_id} failed: {str(e)}"])
+            if return_code == 0:
+                return_code = 1
+        try:
+            self.session.post(self._url(self.node_id, 'jobs', job_id, 'done'), json={'return_code': return_code}, timeout=30)
+        except Exception as e:
+            logger.error(f"Reporting job {job_id} as done failed: {str(e)}")
+
+    def _stream_output(self, job_id, process):
+        """Forward the process output to the server in batches.
+
+        A reader thread hands lines over through a queue, so a batch goes out
+        LOG_BATCH_DELAY after its first line even if the job then stays quiet.
+        """
+        lines = queue.Queue()
+
+        def read():
+            try:
+                for line in process.stdout:
+                    lines.put(line)
+            finally:
+                lines.put(None)
+        threading.Thread(target=read, name=f"node-output-{job_id}", daemon=True).start()
+
+        batch = []
+        deadline = None
+        while True:
+            try:
+                line = lines.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                line = ''
+            if line is None:
+                break
+            line = line.rstrip('\r\n')
+            if line:
+                if not batch:
+                    deadline = time.monotonic() + LOG_BATCH_DELAY
+                batch.append(line)
+            if batch and (len(batch) >= LOG_BATCH_LINES or time.monotonic() >= deadline):
+                self._send_logs(job_id, batch)
+                batch = []
+                deadline = None
+        if batch:
+            self._send_logs(job_id, batch)
+
+    def _send_logs(self, job_id, lines):
+        try:
+            self.session.post(self._url(self.node_id, 'jobs', job_id, 'logs'), json={'lines': lines}, timeout=30)
+        except Exception as e:
+            logger.error(f"Sending logs of job {job_id} failed: {str(e)}")
+
+    def _upload_outputs(self, job_id, output_dir):
+        """Upload every file the job wrote, keeping its path relative to the job's output directory"""
+        for root, _, names in os.walk(output_dir):
+            for name in names:
+                if name == 'config.json' and root == output_dir or name.endswith(UPLOAD_SKIP_SUFFIXES):
+                    continue
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, output_dir).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    response = self.session.put(self._url(self.node_id, 'jobs', job_id, 'files', relative), data=f, timeout=300)
+                response.raise_for_status()
@@ -0,0 +1,110 @@
+import random
+import threading
+import time
+from collections import deque
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter between attempts of one request"""
+    def __init__(self, attempts=3, base_delay=2.0, max_delay=60.0):
+        self.attempts = max(1, int(attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        """Seconds to wait before retry number `attempt` (1 = first retry)"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """Stops requests to a domain once too many of the recent ones have failed.
+
+    The breaker opens when at least min_requests of the last `window` outcomes
+    are known and the share of failures reaches failure_rate. After `cooldown`
+    seconds it lets a single trial request through (half-open): success closes it,
+    failure opens it again for another cooldown.
+
+    admit() hands each request a ticket to pass back to record(). Outcomes of
+    requests admitted before the breaker last changed state are ignored, so a slow
+    request from before an opening can't close or reopen the breaker in place of
+    the trial.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_rate=0.5, window=10, min_requests=4, cooldown=60.0):
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._outcomes = deque(maxlen=window)
+        self._tickets = 0  # Tickets handed out so far
+        self._changed_at = 0  # Tickets handed out when the state last changed
+        self._trial = None  # Ticket of the half-open trial request
+        self._lock = threading.Lock()
+
+    def admit(self):
+        """(0.0, ticket) if a request may go out now, otherwise (seconds until the breaker could allow one, None)"""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.cooldown - time.monotonic()
+                if remaining > 0:
+                    return remaining, None
+                self._change(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self._trial is not None:
+                    return min(self.cooldown, 1.0), None
+                self._tickets += 1
+                self._trial = self._tickets
+                return 0.0, self._trial
+            self._tickets += 1
+            return 0.0, self._tickets
+
+    def record(self, ok, ticket):
+        """Report the outcome of an admitted request; returns True if this opened the breaker"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if ticket != self._trial:
+                    return False
+                if ok:
+                    self._change(self.CLOSED)
+                    return False
+                return self._open()
+            if self.state == self.OPEN or ticket <= self._changed_at:
+                return False
+            self._outcomes.append(ok)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_requests and failures / len(self._outcomes) >= self.failure_rate:
+                return self._open()
+            return False
+
+    def _change(self, state):
+        self.state = state
+        self._changed_at = self._tickets
+        self._trial = None
+        self._outcomes.clear()
+
+    def _open(self):
+        self._change(self.OPEN)
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        return True
+
+
+class CircuitBreakers:
+    """One CircuitBreaker per domain, created on first use"""
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, domain):
+        with self._lock:
+            breaker = self._breakers.get(domain)
+            if breaker is None:
+                breaker = self._breakers[domain] = CircuitBreaker(**self.settings)
+            return breaker
@@ -0,0 +1,428 @@
+import argparse
+import base64
+import datetime as dt
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import select
+import socket
+import sqlite3
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urldefrag, urlsplit, urlunsplit
+
+import requests
+
+try:
+    from cryptography import x509  # Optional: needed to record and replay HTTPS
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+except ImportError:
+    x509 = None
+
+logger = logging.getLogger(__name__)
+
+MODES = ('record', 'replay')
+# Headers that describe one connection rather than the response, never stored or forwarded
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'proxy-connection',
+    'te', 'trailer', 'trailers', 'transfer-encoding', 'upgrade',
+}
+# Bodies are stored decoded, so these are recomputed when a response is served
+BODY_HEADERS = {'content-encoding', 'content-length'}
+TUNNEL_BUFFER = 65536
+
+
+def _now():
+    return dt.datetime.now().isoformat()
+
+
+class ResponseArchive:
+    """On-disk archive of HTTP responses, keyed by method, URL and request body.
+
+    Metadata lives in a SQLite index (WAL mode) and bodies in content-addressed files
+    under bodies/, so identical bodies (e.g. shared scripts) are stored once.
+    """
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS responses (
+        key TEXT PRIMARY KEY,
+        method TEXT NOT NULL,
+        url TEXT NOT NULL,
+        status INTEGER NOT NULL,
+        reason TEXT,
+        headers TEXT NOT NULL,
+        body TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        elapsed REAL,
+        recorded_at TEXT NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    );
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, 'bodies'), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, 'index.sqlite'), timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def request_key(method, url, body=b'', ignore_params=()):
+        """Key of a request: fragment and ignored query parameters (e.g. cache busters) don't count"""
+        url = urldefrag(url)[0]
+        if ignore_params:
+            parts = urlsplit(url)
+            query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True) if name not in ignore_params]
+            url = urlunsplit(parts._replace(query=urlencode(query)))
+        key = f"{method.upper()} {url}"
+        if body and method.upper() not in ('GET', 'HEAD'):
+            key += f" {hashlib.sha256(body).hexdigest()}"
+        return key
+
+    def _body_path(self, digest):
+        return os.path.join(self.directory, 'bodies', digest[:2], digest)
+
+    def get(self, key):
+        """A stored response as a dict with its body, or None"""
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute('UPDATE responses SET hits = hits + 1 WHERE key = ?', (key,))
+        response = dict(row)
+        try:
+            with open(self._body_path(row['body']), 'rb') as f:
+                response['content'] = f.read()
+        except OSError:
+            return None
+        response['headers'] = json.loads(row['headers'])
+        return response
+
+    def put(self, key, method, url, status, reason, headers, content, elapsed=None):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._body_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, method, url, status, reason, headers, body, size, elapsed, recorded_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, method, url, status, reason, json.dumps(headers), digest, len(content), elapsed, _now())
+            )
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def to_har(self, path):
+        """Write the archive as a HAR 1.2 file, e.g. to inspect it in browser dev tools"""
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM responses ORDER BY recorded_at').fetchall()
+        entries = []
+        for row in rows:
+            try:
+                with open(self._body_path(row['body']), 'rb') as f:
+                    content = f.read()
+            except OSError:
+                continue
+            headers = json.loads(row['headers'])
+            mime_type = next((value for name, value in headers if name.lower() == 'content-type'), '')
+            try:
+                text, encoding = content.decode('utf-8'), None
+            except UnicodeDecodeError:
+                text, encoding = base64.b64encode(content).decode('ascii'), 'base64'
+            body = {'size': row['size'], 'mimeType': mime_type, 'text': text}
+            if encoding:
+                body['encoding'] = encoding
+            entries.append({
+                'startedDateTime': row['recorded_at'],
+                'time': round((row['elapsed'] or 0) * 1000, 1),
+                'request': {'method': row['method'], 'url': row['url'], 'httpVersion': 'HTTP/1.1', 'headers': [],
+                            'queryString': [], 'cookies': [], 'headersSize': -1, 'bodySize': -1},
+                'response': {'status': row['status'], 'statusText': row['reason'] or '', 'httpVersion': 'HTTP/1.1',
+                             'headers': [{'name': name, 'value': value} for name, value in headers], 'cookies': [],
+                             'content': body, 'redirectURL': '', 'headersSize': -1, 'bodySize': row['size']},
+                'cache': {},
+                'timings': {'send': 0, 'wait': round((row['elapsed'] or 0) * 1000, 1), 'receive': 0},
+            })
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'log': {'version': '1.2', 'creator': {'name': 'response_cache', 'version': '1'}, 'entries': entries}}, f)
+        return len(entries)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CertificateAuthority:
+    """Issues certificates so the proxy can read HTTPS traffic it records or replays.
+
+    The CA is created once per archive directory (ca.pem). Browsers started by the
+    scraper skip certificate checks while they use the proxy; other clients must trust ca.pem.
+    """
+    def __init__(self, directory):
+        if x509 is None:
+            raise RuntimeError("HTTPS recording needs the cryptography package")
+        self.directory = os.path.join(directory, 'certs')
+        os.makedirs(self.directory, exist_ok=True)
+        self._contexts = {}
+        self._lock = threading.Lock()
+        ca_path = os.path.join(directory, 'ca.pem')
+        key_path = os.path.join(directory, 'ca-key.pem')
+        if os.path.exists(ca_path) and os.path.exists(key_path):
+            with open(ca_path, 'rb') as f:
+                self.ca_cert = x509.load_pem_x509_certificate(f.read())
+            with open(key_path, 'rb') as f:
+                self.ca_key = serialization.load_pem_private_key(f.read(), password=None)
+        else:
+            self.ca_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+            name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'Scraper response cache CA')])
+            self.ca_cert = self._builder(name, name, self.ca_key.public_key(), days=3650) \
+                .add_extension(x509.BasicConstraints(ca=True, path_length=0), critical=True) \
+                .sign(self.ca_key, hashes.SHA256())
+            fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self.ca_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+            with open(ca_path, 'wb') as f:
+                f.write(self.ca_cert.public_bytes(serialization.Encoding.PEM))
+        # One key for every host certificate; generating RSA keys is the slow part
+        self.host_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    @staticmethod
+    def _builder(subject, issuer, public_key, days):
+        now = dt.datetime.now(dt.timezone.utc)
+        return x509.CertificateBuilder().subject_name(subject).issuer_name(issuer).public_key(public_key) \
+            .serial_number(x509.random_serial_number()) \
+            .not_valid_before(now - dt.timedelta(days=1)).not_valid_after(now + dt.timedelta(days=days))
+
+    def context_for(self, host):
+        """Server-side SSL context presenting a certificate for host"""
+        with self._lock:
+            context = self._contexts.get(host)
+            if context is not None:
+                return context
+            try:
+                alt_name = x509.IPAddress(ipaddress.ip_address(host))
+            except ValueError:
+                alt_name = x509.DNSName(host)
+            cert = self._builder(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, host[:64])]), self.ca_cert.subject,
+                                 self.host_key.public_key(), days=365) \
+                .add_extension(x509.SubjectAlternativeName([alt_name]), critical=False) \
+                .sign(self.ca_key, hashes.SHA256())
+            path = os.path.join(self.directory, f"{hashlib.sha1(host.encode('utf-8')).hexdigest()}.pem")
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(cert.public_bytes(serialization.Encoding.PEM))
+                f.write(self.ca_cert.public_bytes(serialization.Encoding.PEM))
+                f.write(self.host_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(path)
+            self._contexts[host] = context
+            return context
+
+
+class CachingProxy:
+    """Local HTTP(S) proxy that records responses into an archive or replays them from it.
+
+    In 'record' mode every request goes upstream and its response is stored,
+    replacing an older copy. In 'replay' mode responses come from the archive only
+    and a request that wasn't recorded gets a 504, so no traffic reaches the site.
+    HTTPS is intercepted with certificates from a local CertificateAuthority; without
+    the cryptography package HTTPS is tunnelled unrecorded in record mode and refused
+    in replay mode.
+    """
+    def __init__(self, archive, mode='replay', ignore_params=(), host='127.0.0.1', port=0, upstream_timeout=30):
+        if mode not in MODES:
+            raise ValueError(f"Unknown response cache mode: {mode}")
+        self.archive = archive
+        self.mode = mode
+        self.ignore_params = set(ignore_params)
+        self.upstream_timeout = upstream_timeout
+        self.served = 0
+        self.recorded = 0
+        self.misses = 0
+        self.upstream_errors = 0
+        self._session = requests.Session()
+        self._session.trust_env = False
+        self._stats_lock = threading.Lock()
+        self._authority = None
+        if x509 is not None:
+            self._authority = CertificateAuthority(archive.directory)
+        else:
+            logger.warning("cryptography is not installed: HTTPS responses will not be recorded or replayed")
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name='response-cache-proxy', daemon=True).start()
+        logger.info(f"Response cache proxy in {self.mode} mode on {self.url} ({self.archive.count()} responses archived)")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def summary(self):
+        return f"{self.served} served from the archive, {self.recorded} recorded, {self.misses} not in the archive, {self.upstream_errors} upstream errors"
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def respond(self, method, url, headers, body):
+        """(status, reason, headers, content) for one proxied request"""
+        key = ResponseArchive.request_key(method, url, body, self.ignore_params)
+        if self.mode == 'replay':
+            cached = self.archive.get(key)
+            if cached is None:
+                self._count('misses')
+                return 504, 'Not Recorded', [('Content-Type', 'text/plain; charset=utf-8')], f"Not in the response archive: {method} {url}".encode('utf-8')
+            self._count('served')
+            return cached['status'], cached['reason'], cached['headers'], cached['content']
+
+        forwarded = {name: value for name, value in headers
+                     if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() not in ('host', 'accept-encoding')}
+        # Only encodings requests can decode, since bodies are stored decoded
+        forwarded['Accept-Encoding'] = 'gzip, deflate'
+        started = time.perf_counter()
+        try:
+            upstream = self._session.request(method, url, headers=forwarded, data=body or None, allow_redirects=False,
+                                             timeout=self.upstream_timeout)
+        except requests.RequestException as e:
+            self._count('upstream_errors')
+            return 502, 'Bad Gateway', [('Content-Type', 'text/plain; charset=utf-8')], f"Upstream request failed: {e}".encode('utf-8')
+        response_headers = [(name, value) for name, value in upstream.raw.headers.items()
+                            if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() not in BODY_HEADERS]
+        content = upstream.content
+        self.archive.put(key, method, url, upstream.status_code, upstream.reason, response_headers, content,
+                         time.perf_counter() - started)
+        self._count('recorded')
+        return upstream.status_code, upstream.reason, response_headers, content
+
+    def _handler_class(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            tunnel = None  # 'host:port' inside an intercepted CONNECT tunnel
+
+            def _proxy(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                url = self.path
+                if self.tunnel is not None:
+                    authority = self.tunnel[:-len(':443')] if self.tunnel.endswith(':443') else self.tunnel
+                    url = f"https://{authority}{self.path}"
+                try:
+                    status, reason, headers, content = proxy.respond(self.command, url, list(self.headers.items()), body)
+                except Exception as e:
+                    logger.error(f"Response cache failed for {url}: {str(e)}")
+                    status, reason, headers, content = 502, 'Bad Gateway', [('Content-Type', 'text/plain')], str(e).encode('utf-8')
+                self.send_response(status, reason)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = _proxy
+
+            def do_CONNECT(self):
+                host = self.path.rsplit(':', 1)[0].strip('[]')
+                if proxy._authority is None:
+                    if proxy.mode == 'replay':
+                        self.send_error(502, 'HTTPS replay needs the cryptography package')
+                        return
+                    self._blind_tunnel()
+                    return
+                self.send_response(200, 'Connection Established')
+                self.end_headers()
+                try:
+                    connection = proxy._authority.context_for(host).wrap_socket(self.connection, server_side=True)
+                except (ssl.SSLError, OSError) as e:
+                    logger.warning(f"TLS handshake with the browser failed for {host}: {str(e)}")
+                    self.close_connection = True
+                    return
+                handler = type('TunnelHandler', (Handler,), {'tunnel': self.path})
+                try:
+                    handler(connection, self.client_address, self.server)
+                finally:
+                    self.close_connection = True
+
+            def _blind_tunnel(self):
+                host, _, port = self.path.rpartition(':')
+                try:
+                    upstream = socket.create_connection((host.strip('[]'), int(port or 443)), timeout=proxy.upstream_timeout)
+                except OSError as e:
+                    self.send_error(502, f"Cannot reach {self.path}: {e}")
+                    return
+                self.send_response(200, 'Connection Established')
+                self.end_headers()
+                sockets = [self.connection, upstream]
+                try:
+                    while True:
+                        readable, _, _ = select.select(sockets, [], [], proxy.upstream_timeout)
+                        if not readable:
+                            break
+                        for source in readable:
+                            data = source.recv(TUNNEL_BUFFER)
+                            if not data:
+                                return
+                            (upstream if source is self.connection else self.connection).sendall(data)
+                finally:
+                    upstream.close()
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                logger.debug(f"Response cache: {format % args}")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record/replay proxy for scraper development')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve = subparsers.add_parser('serve', help='Run the proxy until interrupted')
+    serve.add_argument('directory')
+    serve.add_argument('--mode', choices=MODES, default='replay')
+    serve.add_argument('--port', type=int, default=8899)
+    serve.add_argument('--ignore-param', action='append', default=[], help='Query parameter left out of request keys')
+    export = subparsers.add_parser('export-har', help='Write an archive as a HAR file')
+    export.add_argument('directory')
+    export.add_argument('output')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s - %(message)s')
+    archive = ResponseArchive(args.directory)
+    if args.command == 'export-har':
+        print(f"Wrote {archive.to_har(args.output)} entries to {args.output}")
+        return
+    proxy = CachingProxy(archive, mode=args.mode, ignore_params=args.ignore_param, port=args.port).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        logger.info(proxy.summary())
+        proxy.stop()
+
+
+if __name__ == '__main__':
+    main()
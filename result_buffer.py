@@ -0,0 +1,241 @@
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+from array import array
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+
+# Cell lengths: -1 marks a row without the field, -2 and below a JSON value of (-2 - length) bytes
+MISSING = -1
+JSON_BASE = -2
+# Share of the in-memory pool held by replaced or discarded cells above which a spill drops them
+COMPACT_FRACTION = 0.25
+
+
+class ResultBuffer:
+    """Scraped rows stored column by column instead of as one dict per row.
+
+    Each column holds two typed arrays with one entry per row: where the cell's UTF-8
+    bytes start in a byte pool shared by all columns, and how many there are. Text is
+    stored as is and any other value (None, numbers, lists) as JSON. Field names are
+    interned once per column, so a cell costs 12 bytes plus its text rather than a
+    dict slot and a str object. When the pool outgrows memory_limit it is appended to
+    a temporary file and read back from there, so only the arrays stay in memory.
+
+    Rows read back are new dicts; stored rows change through update() and discard().
+    Neither frees the old cell's bytes at once: they stay in the pool until the next
+    spill, which leaves out the in-memory ones when they make up COMPACT_FRACTION of
+    the pool. Bytes already spilled stay in the file until the buffer is closed.
+    """
+    def __init__(self, memory_limit=DEFAULT_MEMORY_LIMIT, spill_dir=None):
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.spills = 0
+        self._columns = {}  # Field name -> (starts, lengths)
+        self._present = {}  # Field name -> number of rows that have it
+        self._rows = 0
+        self._pool = bytearray()
+        self._spilled = 0  # Pool offsets below this are in the spill file
+        self._spill_file = None
+        self._garbage = 0  # Pool bytes of cells that were replaced or discarded
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_rows(cls, rows, **kwargs):
+        buffer = cls(**kwargs)
+        for row in rows:
+            buffer.append(row)
+        return buffer
+
+    # Storage
+
+    def _column(self, name):
+        column = self._columns.get(name)
+        if column is None:
+            name = sys.intern(name)
+            column = (array('q', [0]) * self._rows, array('i', [MISSING]) * self._rows)
+            self._columns[name] = column
+            self._present[name] = 0
+        return column
+
+    def _store(self, value):
+        if isinstance(value, str):
+            data = value.encode('utf-8')
+            length = len(data)
+        else:
+            data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+            length = JSON_BASE - len(data)
+        # Spill before adding, so a compacting spill never moves a cell that isn't recorded yet
+        if self.memory_limit and self._pool and len(self._pool) + len(data) > self.memory_limit:
+            self._spill()
+        start = self._spilled + len(self._pool)
+        self._pool += data
+        return start, length
+
+    def _spill(self):
+        if self._spill_file is None:
+            if self.spill_dir:
+                os.makedirs(self.spill_dir, exist_ok=True)
+            self._spill_file = tempfile.TemporaryFile(prefix='results-', suffix='.spill', dir=self.spill_dir)
+        self._spill_file.seek(0, os.SEEK_END)
+        if self._garbage >= COMPACT_FRACTION * len(self._pool):
+            self._spill_file.write(self._compacted_pool())
+        else:
+            self._spill_file.write(self._pool)
+        self._spilled = self._spill_file.tell()
+        self._pool = bytearray()
+        self._garbage = 0
+        self.spills += 1
+        logger.info(f"Result buffer spilled to disk ({self._spilled / 1048576:.1f} MB on disk, {self._rows} rows)")
+
+    def _compacted_pool(self):
+        """The pool's live cells packed together, with their starts moved to match"""
+        cells = []
+        for starts, lengths in self._columns.values():
+            for index in range(self._rows):
+                if lengths[index] != MISSING and starts[index] >= self._spilled:
+                    cells.append((starts[index], starts, index, lengths[index]))
+        cells.sort(key=lambda cell: cell[0])
+        packed = bytearray()
+        for start, starts, index, length in cells:
+            size = length if length >= 0 else JSON_BASE - length
+            offset = start - self._spilled
+            starts[index] = self._spilled + len(packed)
+            packed += self._pool[offset:offset + size]
+        return packed
+
+    def _release(self, start, length):
+        """Count a replaced or discarded cell's bytes as garbage if they are still in memory"""
+        if length != MISSING and start >= self._spilled:
+            self._garbage += length if length >= 0 else JSON_BASE - length
+
+    def _load(self, start, length):
+        size = length if length >= 0 else JSON_BASE - length
+        if start >= self._spilled:
+            offset = start - self._spilled
+            data = bytes(self._pool[offset:offset + size])
+        else:
+            self._spill_file.seek(start)
+            data = self._spill_file.read(size)
+        text = data.decode('utf-8')
+        return text if length >= 0 else json.loads(text)
+
+    def _set(self, index, name, value):
+        starts, lengths = self._column(name)
+        if lengths[index] == MISSING:
+            self._present[name] += 1
+        start, length = self._store(value)
+        self._release(starts[index], lengths[index])
+        starts[index], lengths[index] = start, length
+
+    # Rows
+
+    def append(self, row):
+        """Add a row (a dict of field values); returns its index"""
+        with self._lock:
+            for name in row:
+                self._column(name)
+            index = self._rows
+            for starts, lengths in self._columns.values():
+                starts.append(0)
+                lengths.append(MISSING)
+            self._rows += 1
+            for name, value in row.items():
+                self._set(index, name, value)
+            return index
+
+    def update(self, index, values):
+        """Set fields of a stored row, like dict.update()"""
+        with self._lock:
+            self._check(index)
+            for name, value in values.items():
+                self._set(index, name, value)
+
+    def discard(self, index, name):
+        """Remove a field from a stored row if it has it"""
+        with self._lock:
+            self._check(index)
+            column = self._columns.get(name)
+            if column is not None and column[1][index] != MISSING:
+                self._release(column[0][index], column[1][index])
+                column[1][index] = MISSING
+                self._present[name] -= 1
+
+    def get(self, index, name, default=None):
+        with self._lock:
+            self._check(index)
+            column = self._columns.get(name)
+            if column is None or column[1][index] == MISSING:
+                return default
+            return self._load(column[0][index], column[1][index])
+
+    def row(self, index):
+        with self._lock:
+            self._check(index)
+            return {name: self._load(starts[index], lengths[index])
+                    for name, (starts, lengths) in self._columns.items() if lengths[index] != MISSING}
+
+    def _check(self, index):
+        if not 0 <= index < self._rows:
+            raise IndexError(f"Row {index} out of range for {self._rows} rows")
+
+    def __len__(self):
+        return self._rows
+
+    def __iter__(self):
+        for index in range(self._rows):
+            yield self.row(index)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.row(index) for index in range(*key.indices(self._rows))]
+        return self.row(key + self._rows if key < 0 else key)
+
+    # Column access for writers
+
+    @property
+    def columns(self):
+        """Fields held by at least one row, in order of first appearance"""
+        with self._lock:
+            return [name for name, count in self._present.items() if count]
+
+    def column(self, name, default=None):
+        """Every row's value of one field"""
+        for index in range(self._rows):
+            yield self.get(index, name, default)
+
+    def rows_as_lists(self, columns=None, missing=None):
+        """Rows as lists of values in columns order (default: self.columns), without building dicts"""
+        columns = self.columns if columns is None else columns
+        for index in range(self._rows):
+            with self._lock:
+                cells = []
+                for name in columns:
+                    column = self._columns.get(name)
+                    if column is None or column[1][index] == MISSING:
+                        cells.append(missing)
+                    else:
+                        cells.append(self._load(column[0][index], column[1][index]))
+            yield cells
+
+    def memory_bytes(self):
+        """Bytes held in memory by the pool and the column arrays"""
+        with self._lock:
+            arrays = sum(starts.itemsize * len(starts) + lengths.itemsize * len(lengths) for starts, lengths in self._columns.values())
+            return len(self._pool) + arrays
+
+    @property
+    def spilled_bytes(self):
+        return self._spilled
+
+    def close(self):
+        with self._lock:
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+            self._pool = bytearray()
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import re
+import struct
+import threading
+from array import array
+
+logger = logging.getLogger(__name__)
+
+RESULTS_INDEX_SUFFIX = '.idx'
+
+# Index file layout: results file size, mtime (ns) and row count, then a (start, end) byte range per row
+INDEX_HEADER = struct.Struct('<qqq')
+
+# Bytes read at a time when scanning a results file in another layout
+SCAN_CHUNK_SIZE = 1 << 20
+
+# A whole string is skipped in one match; a lone '"' means the string runs past the chunk
+_STRUCTURE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}",]', re.DOTALL)
+_STRING_END = re.compile(rb'["\\]')
+_NON_SPACE = re.compile(rb'\S')
+
+
+def write_json_rows(path, rows):
+    """Write rows as a JSON array with one row per line, plus its row index.
+
+    The file is still an ordinary JSON array, but every row sits on its own line so
+    rows can later be located and served without parsing the whole file.
+    """
+    offsets = array('q')
+    with open(path, 'wb') as f:
+        f.write(b'[\n')
+        position = 2
+        for number, row in enumerate(rows):
+            if number:
+                f.write(b',\n')
+                position += 2
+            line = json.dumps(row, ensure_ascii=False).encode('utf-8')
+            f.write(line)
+            offsets.append(position)
+            offsets.append(position + len(line))
+            position += len(line)
+        f.write(b'\n]\n')
+    ResultsFile(path)._save_index(offsets)
+    return len(offsets) // 2
+
+
+class ResultsFile:
+    """Random access to the rows of a scraped_data.json file through its row index"""
+    _build_locks = {}
+    _build_locks_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + RESULTS_INDEX_SUFFIX
+        self._offsets = None
+
+    def stat(self):
+        st = os.stat(self.path)
+        return st.st_size, st.st_mtime_ns
+
+    @property
+    def row_count(self):
+        return len(self._load()) // 2
+
+    def rows(self, offset=0, limit=None):
+        """Raw UTF-8 JSON of the rows in [offset, offset + limit), read straight from disk"""
+        offsets = self._load()
+        end_row = self.row_count if limit is None else min(self.row_count, offset + limit)
+        if offset >= end_row:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(offsets[2 * offset])
+            for number in range(offset, end_row):
+                start, end = offsets[2 * number], offsets[2 * number + 1]
+                if f.tell() != start:
+                    f.seek(start)
+                yield f.read(end - start)
+
+    def _load(self):
+        if self._offsets is not None:
+            return self._offsets
+        size, mtime_ns = self.stat()
+        offsets = self._read_index(size, mtime_ns)
+        if offsets is None:
+            # Concurrent requests for the same file build its index once
+            with self._build_locks_lock:
+                lock = self._build_locks.setdefault(self.path, threading.Lock())
+            with lock:
+                size, mtime_ns = self.stat()
+                offsets = self._read_index(size, mtime_ns)
+                if offsets is None:
+                    offsets = self._build_index()
+        self._offsets = offsets
+        return offsets
+
+    def _read_index(self, size, mtime_ns):
+        try:
+            with open(self.index_path, 'rb') as f:
+                indexed_size, indexed_mtime, count = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+                if indexed_size != size or indexed_mtime != mtime_ns:
+                    return None
+                offsets = array('q')
+                offsets.frombytes(f.read())
+        except (OSError, struct.error, ValueError):
+            return None
+        return offsets if len(offsets) == 2 * count else None
+
+    def _save_index(self, offsets):
+        size, mtime_ns = self.stat()
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(size, mtime_ns, len(offsets) // 2))
+            offsets.tofile(f)
+        os.replace(temp_path, self.index_path)
+
+    def _build_index(self):
+        # Files written before rows were kept one per line (e.g. indented) are
+        # indexed by scanning the array itself; the file is left as it is
+        offsets = self._scan_rows()
+        if offsets is None:
+            offsets = self._scan_array()
+        self._save_index(offsets)
+        return offsets
+
+    def _scan_rows(self):
+        """Row ranges of a one-row-per-line file, or None if the file isn't in that layout"""
+        offsets = array('q')
+        with open(self.path, 'rb') as f:
+            if f.readline().strip() != b'[':
+                return None
+            position = f.tell()
+            for line in f:
+                content = line.rstrip(b'\r\n')
+                if content.endswith(b','):
+                    content = content[:-1]
+                if content.strip() == b']':
+                    break
+                if not content.startswith((b'{', b'[')) or not offsets and not self._is_json(content):
+                    return None
+                offsets.append(position)
+                offsets.append(position + len(content))
+                position += len(line)
+        return offsets
+
+    def _scan_array(self):
+        """Row ranges of any JSON array file, found by tracking nesting and strings chunk by chunk"""
+        offsets = array('q')
+        depth = 0
+        in_string = escaped = False
+        seeking = False     # between '[' or ',' and the first byte of the next row
+        start = None        # first byte of the current row
+        tail = None         # end of the current row's content as of the previous chunk
+        closed = False
+        base = 0
+        with open(self.path, 'rb') as f:
+            while not closed:
+                chunk = f.read(SCAN_CHUNK_SIZE)
+                if not chunk:
+                    break
+                position = 0
+                if escaped:
+                    position, escaped = 1, False
+                segment = 0  # where the current row's bytes in this chunk begin
+                while position < len(chunk):
+                    if in_string:
+                        match = _STRING_END.search(chunk, position)
+                        if match is None:
+                            break
+                        position = match.end()
+                        if match.group() == b'\\':
+                            if position == len(chunk):
+                                escaped = True
+                            position += 1
+                        else:
+                            in_string = False
+                        continue
+                    if depth == 0:
+                        match = _NON_SPACE.search(chunk, position)
+                        if match is None:
+                            break
+                        if match.group() != b'[':
+                            raise ValueError(f"{self.path} is not a JSON array")
+                        position = match.start()
+                    elif seeking:
+                        match = _NON_SPACE.search(chunk, position)
+                        if match is None:
+                            break
+                        position = segment = match.start()
+                        seeking = False
+                        if chunk[position:position + 1] != b']':
+                            start, tail = base + position, None
+                    match = _STRUCTURE.search(chunk, position)
+                    if match is None:
+                        break
+                    position = match.end()
+                    token = match.group()
+                    if token[:1] == b'"':
+                        in_string = len(token) == 1
+                    elif token in (b'{', b'['):
+                        seeking = depth == 0
+                        depth += 1
+                    elif depth > 1:
+                        if token != b',':
+                            depth -= 1
+                    else:
+                        # A ',' or the closing ']' of the top-level array ends the current row
+                        if start is not None:
+                            content = len(chunk[segment:match.start()].rstrip())
+                            offsets.append(start)
+                            offsets.append(base + segment + content if content else tail)
+                            start = None
+                        if token == b']':
+                            closed = True
+                            break
+                        seeking = True
+                if start is not None and not in_string:
+                    content = len(chunk[segment:].rstrip())
+                    if content:
+                        tail = base + segment + content
+                base += len(chunk)
+        if not closed:
+            raise ValueError(f"{self.path} is not a JSON array")
+        return offsets
+
+    @staticmethod
+    def _is_json(content):
+        try:
+            json.loads(content)
+            return True
+        except ValueError:
+            return False
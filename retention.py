@@ -0,0 +1,307 @@
+import gzip
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+
+try:
+    import zstandard  # Optional: only needed for zstd compaction
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl  # Not on Windows, where sweeps aren't coordinated between processes
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSED_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+# Files compaction compresses; everything else (config.json, indexes, spreadsheets) is left as is
+COMPACTED_SUFFIXES = ('.json', '.jsonl', '.log', '.csv', '.ndjson')
+# Files compaction deletes because they are rebuilt on demand
+DERIVED_SUFFIXES = ('.json.idx',)
+DERIVED_DIRS = ('exports',)
+CHUNK_SIZE = 1024 * 1024
+
+_thaw_locks = {}
+_thaw_locks_lock = threading.Lock()
+
+
+def directory_size(path):
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _compress(path, compression):
+    target = path + COMPRESSED_SUFFIXES[compression]
+    temp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        with open(path, 'rb') as source, open(temp_path, 'wb') as f:
+            if compression == 'zstd':
+                with zstandard.ZstdCompressor(level=10).stream_writer(f, closefd=False) as writer:
+                    shutil.copyfileobj(source, writer, CHUNK_SIZE)
+            else:
+                with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=6) as writer:
+                    shutil.copyfileobj(source, writer, CHUNK_SIZE)
+        # Keep the original mtime so the file looks unchanged once it is thawed
+        st = os.stat(path)
+        os.replace(temp_path, target)
+        os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.remove(path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def thaw(path):
+    """Make sure `path` exists uncompressed, restoring it from a compacted copy if needed.
+
+    Returns the path, or None if neither the file nor a compacted copy exists.
+    """
+    if os.path.exists(path):
+        return path
+    with _thaw_locks_lock:
+        lock = _thaw_locks.setdefault(path, threading.Lock())
+    with lock:
+        if os.path.exists(path):
+            return path
+        for compression, suffix in COMPRESSED_SUFFIXES.items():
+            compressed = path + suffix
+            if not os.path.exists(compressed):
+                continue
+            if compression == 'zstd' and zstandard is None:
+                logger.error(f"Cannot restore {compressed}: the zstandard package is not installed")
+                return None
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(compressed, 'rb') as source, open(temp_path, 'wb') as f:
+                    if compression == 'zstd':
+                        with zstandard.ZstdDecompressor().stream_reader(source) as reader:
+                            shutil.copyfileobj(reader, f, CHUNK_SIZE)
+                    else:
+                        with gzip.GzipFile(fileobj=source, mode='rb') as reader:
+                            shutil.copyfileobj(reader, f, CHUNK_SIZE)
+                st = os.stat(compressed)
+                os.utime(temp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+                os.replace(temp_path, path)
+                os.remove(compressed)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            logger.info(f"Restored compacted file {path}")
+            return path
+    return None
+
+
+class RetentionPolicy:
+    """Limits applied to finished jobs' output directories; 0 disables a limit"""
+    def __init__(self, max_age_days=0, max_total_mb=0, max_user_mb=0, compact_after_hours=24,
+                 compression='gzip', temp_max_age_hours=24):
+        if compression == 'zstd' and zstandard is None:
+            logger.warning("zstd compaction needs the zstandard package, falling back to gzip")
+            compression = 'gzip'
+        if compression not in COMPRESSED_SUFFIXES:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.max_age = timedelta(days=max_age_days) if max_age_days else None
+        self.max_total_bytes = int(max_total_mb * 1024 * 1024)
+        self.max_user_bytes = int(max_user_mb * 1024 * 1024)
+        self.compact_after = timedelta(hours=compact_after_hours) if compact_after_hours else None
+        self.compression = compression
+        self.temp_max_age = timedelta(hours=temp_max_age_hours) if temp_max_age_hours else None
+
+
+class RetentionEngine:
+    """Keeps the disk used by job outputs bounded.
+
+    A sweep compacts cold jobs (finished longer than compact_after ago), then evicts
+    whole job directories: first those past max_age, then the oldest jobs of users over
+    their quota, then the oldest jobs overall while the total is over the global quota.
+    Unfinished jobs are never touched. Sweeps run when request_sweep() is called (e.g.
+    after a job finishes) and at least every `interval` seconds for age-based limits.
+    With a lock_path, processes sharing the output directory take turns: a sweep is
+    skipped while another process holds the lock, since that process's sweep covers it.
+    """
+    def __init__(self, job_store, policy, output_root='output', temp_root='temp', interval=3600, lock_path=None):
+        self.job_store = job_store
+        self.policy = policy
+        self.output_root = output_root
+        self.temp_root = temp_root
+        self.interval = interval
+        self.lock_path = lock_path
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self.jobs_evicted = 0
+        self.bytes_evicted = 0
+        self.jobs_compacted = 0
+
+    def start(self):
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def request_sweep(self):
+        self._wakeup.set()
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Error in retention sweep: {str(e)}")
+
+    def _claim(self):
+        """Open and lock lock_path; None if another process is sweeping"""
+        handle = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+        return handle
+
+    def sweep(self):
+        with self._lock:
+            handle = None
+            if self.lock_path and fcntl is not None:
+                handle = self._claim()
+                if handle is None:
+                    logger.debug("Skipping retention sweep, another process is sweeping")
+                    return
+            try:
+                self._sweep()
+            finally:
+                if handle:
+                    handle.close()
+
+    def _sweep(self):
+        now = datetime.now()
+        jobs = self._finished_jobs()
+        if self.policy.compact_after:
+            for job in jobs:
+                age = now - job['finished']
+                expired = self.policy.max_age and age >= self.policy.max_age
+                if not job['compacted_at'] and age >= self.policy.compact_after and not expired:
+                    self._compact(job)
+        for job in jobs:
+            job['bytes'] = directory_size(job['path'])
+
+        evict = []
+        if self.policy.max_age:
+            evict.extend(job for job in jobs if now - job['finished'] >= self.policy.max_age)
+        evicted = {job['job_id'] for job in evict}
+        if self.policy.max_user_bytes:
+            usage = {}
+            for job in jobs:
+                if job['job_id'] not in evicted:
+                    usage[job['user_id']] = usage.get(job['user_id'], 0) + job['bytes']
+            # Oldest first, so each over-quota user loses their oldest jobs
+            for job in jobs:
+                if job['job_id'] not in evicted and job['user_id'] and usage[job['user_id']] > self.policy.max_user_bytes:
+                    usage[job['user_id']] -= job['bytes']
+                    evict.append(job)
+                    evicted.add(job['job_id'])
+        if self.policy.max_total_bytes:
+            total = directory_size(self.output_root) - sum(job['bytes'] for job in evict)
+            for job in jobs:
+                if total <= self.policy.max_total_bytes:
+                    break
+                if job['job_id'] not in evicted:
+                    total -= job['bytes']
+                    evict.append(job)
+                    evicted.add(job['job_id'])
+
+        for job in evict:
+            self._evict(job)
+        self._clean_temp()
+
+    def _finished_jobs(self):
+        """Finished jobs that still have files, oldest first; legacy directories without a record included"""
+        jobs = []
+        known = set()
+        for record in self.job_store.retained_jobs():
+            known.add(record['job_id'])
+            path = record['output_dir'] or os.path.join(self.output_root, record['job_id'])
+            if not os.path.isdir(path):
+                continue
+            try:
+                finished = datetime.fromisoformat(record['completed_at'] or record['created_at'])
+            except (TypeError, ValueError):
+                finished = datetime.fromtimestamp(os.path.getmtime(path))
+            jobs.append({
+                'job_id': record['job_id'],
+                'user_id': record['user_id'],
+                'path': path,
+                'finished': finished,
+                'compacted_at': record['compacted_at'],
+                'recorded': True,
+            })
+        if os.path.isdir(self.output_root):
+            unfinished = self.job_store.unfinished_job_ids()
+            for name in os.listdir(self.output_root):
+                path = os.path.join(self.output_root, name)
+                if name in known or name in unfinished or not os.path.isdir(path):
+                    continue
+                jobs.append({
+                    'job_id': name,
+                    'user_id': None,
+                    'path': path,
+                    'finished': datetime.fromtimestamp(os.path.getmtime(path)),
+                    'compacted_at': None,
+                    'recorded': False,
+                })
+        jobs.sort(key=lambda job: job['finished'])
+        return jobs
+
+    def _compact(self, job):
+        suffix = COMPRESSED_SUFFIXES[self.policy.compression]
+        for root, dirs, names in os.walk(job['path']):
+            for name in list(dirs):
+                if name in DERIVED_DIRS:
+                    shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+                    dirs.remove(name)
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    if name.endswith(DERIVED_SUFFIXES):
+                        os.remove(path)
+                    elif name.endswith(COMPACTED_SUFFIXES) and name != 'config.json' and not os.path.exists(path + suffix):
+                        _compress(path, self.policy.compression)
+                except OSError as e:
+                    logger.warning(f"Could not compact {path}: {str(e)}")
+        if job['recorded']:
+            self.job_store.update(job['job_id'], compacted_at=datetime.now())
+        job['compacted_at'] = True
+        self.jobs_compacted += 1
+        logger.info(f"Compacted output of job {job['job_id']}")
+
+    def _evict(self, job):
+        shutil.rmtree(job['path'], ignore_errors=True)
+        if job['recorded']:
+            self.job_store.update(job['job_id'], evicted_at=datetime.now())
+        self.jobs_evicted += 1
+        self.bytes_evicted += job['bytes']
+        logger.info(f"Evicted output of job {job['job_id']} ({job['bytes']} bytes)")
+
+    def _clean_temp(self):
+        if not self.policy.temp_max_age or not os.path.isdir(self.temp_root):
+            return
+        cutoff = time.time() - self.policy.temp_max_age.total_seconds()
+        for name in os.listdir(self.temp_root):
+            path = os.path.join(self.temp_root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path, ignore_errors=True)
+                    else:
+                        os.remove(path)
+            except OSError:
+                pass
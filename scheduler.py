@@ -0,0 +1,290 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+# How often a scheduler waiting on the shared slot budget checks it again
+SHARED_SLOT_POLL_SECONDS = 1.0
+
+
+class QueueFullError(Exception):
+    """Raised when the scheduler queue cannot take another job"""
+
+
+def total_memory_bytes():
+    """Physical memory of the host, or None if it can't be determined"""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def browser_slot_budget(memory_per_browser_mb=500, cpus_per_browser=1.0, reserved_memory_mb=1024):
+    """Number of browsers this host can run at once, limited by both CPU and memory"""
+    cpu_slots = int((os.cpu_count() or 1) / cpus_per_browser) if cpus_per_browser > 0 else 1
+    memory = total_memory_bytes()
+    if memory:
+        usable_mb = memory / (1024 * 1024) - reserved_memory_mb
+        memory_slots = int(usable_mb // memory_per_browser_mb) if memory_per_browser_mb > 0 else cpu_slots
+        return max(1, min(cpu_slots, memory_slots))
+    return max(1, cpu_slots)
+
+
+class SharedSlotBudget:
+    """A host's browser slots, leased through the shared state backend.
+
+    Every API worker on the host takes its jobs' slots from the same budget, so K
+    workers together still run at most `slots` browsers, and a user's job limit holds
+    across workers. Leases are renewed while their jobs run and expire if the worker dies.
+    """
+    def __init__(self, backend, node_id, host, slots, ttl=60):
+        self.backend = backend
+        self.node_id = node_id
+        self.host = host
+        self.slots = slots
+        self.ttl = ttl
+
+    def start(self):
+        threading.Thread(target=self._renew_loop, daemon=True).start()
+        return self
+
+    def acquire(self, job, wanted, user_limit=None):
+        """Slots granted to the job, 0 if the host or the user has none left"""
+        return self.backend.acquire_slots(job.job_id, self.node_id, self.host, job.user_id, wanted, self.slots,
+                                          user_limit=user_limit, ttl=self.ttl)
+
+    def release(self, job):
+        self.backend.release_slots(job.job_id)
+
+    def _renew_loop(self):
+        while True:
+            time.sleep(self.ttl / 3)
+            try:
+                self.backend.renew_slots(self.node_id, ttl=self.ttl)
+            except Exception as e:
+                logger.error(f"Could not renew browser slot leases: {str(e)}")
+
+
+class JobScheduler:
+    """Admits scraper jobs into a fixed number of browser slots.
+
+    Waiting jobs are kept in one priority queue per user. When a slot frees up the
+    scheduler takes the highest priority waiting, and among users with a job at that
+    priority it rotates round-robin, so one user queuing many jobs can't starve the
+    others. A user never runs more than their own concurrency limit of jobs.
+
+    A job may ask for several browsers (e.g. extra subpage browsers). It is admitted
+    once one slot is free and granted as many of the slots it asked for as are free
+    then; the grant is set as job.browser_slots before the job runs, and the job must
+    not start more browsers than that. max_jobs optionally caps running jobs
+    regardless of slots, e.g. to the size of a worker pool. With a SharedSlotBudget
+    the slots are leased from the budget every API worker of the host shares.
+    """
+    def __init__(self, run, slots, max_queued=100, max_jobs=None, shared=None):
+        self._run = run  # Callable taking a job; called on its own thread once the job is admitted
+        self.slots = slots
+        self.shared = shared
+        self.max_queued = max_queued
+        self.max_jobs = max_jobs
+        self._queues = {}  # Maps user_id to a heap of (-priority, order, job, user_limit, browsers)
+        self._users = deque()  # Round-robin order of users with queued jobs
+        self._running = {}  # Maps user_id to number of running jobs
+        self._running_total = 0
+        self.slots_used = 0
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self.admitted = 0
+        self.rejected = 0
+
+    def start(self):
+        threading.Thread(target=self._dispatch_loop, daemon=True).start()
+        logger.info(f"Started job scheduler with {self.slots} browser slots and room for {self.max_queued} queued jobs")
+
+    def submit(self, job, priority=0, user_limit=None, browsers=1):
+        """Queue a job that uses up to `browsers` browsers and return its position in the dispatch order (1 = next).
+
+        Raises QueueFullError if the queue already holds max_queued jobs.
+        """
+        with self._condition:
+            if self.queued_count() >= self.max_queued:
+                self.rejected += 1
+                raise QueueFullError(f"Scheduler queue is full ({self.max_queued} jobs waiting)")
+            queue = self._queues.get(job.user_id)
+            if queue is None:
+                queue = self._queues[job.user_id] = []
+                self._users.append(job.user_id)
+            heapq.heappush(queue, (-priority, next(self._order), job, user_limit, max(1, int(browsers))))
+            self._condition.notify()
+            return self._position_locked(job.job_id)
+
+    def cancel(self, job_id):
+        """Remove a job that has not started yet; returns False if it isn't queued"""
+        with self._condition:
+            for user_id, queue in self._queues.items():
+                for index, entry in enumerate(queue):
+                    if entry[2].job_id == job_id:
+                        queue.pop(index)
+                        heapq.heapify(queue)
+                        if not queue:
+                            self._drop_user(user_id)
+                        return True
+        return False
+
+    def position(self, job_id):
+        """1-based place of a queued job in the dispatch order, or None if it isn't queued"""
+        with self._condition:
+            return self._position_locked(job_id)
+
+    def set_slots(self, slots):
+        """Change how many jobs may run at once, e.g. when worker nodes join or leave"""
+        with self._condition:
+            self.slots = slots
+            self._condition.notify()
+
+    def queued_count(self):
+        return sum(len(queue) for queue in list(self._queues.values()))
+
+    def running_count(self):
+        return self._running_total
+
+    def _admit_next(self):
+        """(user_id, entry, slots granted) for the next job that can start now, or None"""
+        if not self.shared:
+            picked = self._pick(self._queues, self._users, self._running)
+            if picked is None:
+                return None
+            user_id, entry = picked
+            return user_id, entry, min(entry[4], self.slots - self.slots_used)
+        # Users the shared budget turns away (e.g. at their limit on other workers) let the next one try
+        users = deque(self._users)
+        while users:
+            picked = self._pick(self._queues, users, self._running)
+            if picked is None:
+                return None
+            user_id, entry = picked
+            try:
+                granted = self.shared.acquire(entry[2], entry[4], user_limit=entry[3])
+            except Exception as e:
+                logger.error(f"Could not lease browser slots: {str(e)}")
+                return None
+            if granted:
+                return user_id, entry, granted
+            users.remove(user_id)
+        return None
+
+    def _has_capacity(self):
+        if self.max_jobs and self._running_total >= self.max_jobs:
+            return False
+        return self.slots_used < self.slots
+
+    def _drop_user(self, user_id):
+        del self._queues[user_id]
+        try:
+            self._users.remove(user_id)
+        except ValueError:
+            pass
+
+    def _pick(self, queues, users, running):
+        """Choose the next job from the given state without changing the live queues.
+
+        Returns (user_id, entry) or None when every waiting user is at their limit.
+        """
+        best = None
+        for user_id in users:
+            if not self._eligible_in(queues, user_id, running):
+                continue
+            priority = queues[user_id][0][0]
+            if best is None or priority < best[1]:
+                best = (user_id, priority)
+        if best is None:
+            return None
+        # First user in round-robin order whose next job has the top priority
+        for user_id in users:
+            if self._eligible_in(queues, user_id, running) and queues[user_id][0][0] == best[1]:
+                return user_id, queues[user_id][0]
+        return None
+
+    @staticmethod
+    def _eligible_in(queues, user_id, running):
+        user_limit = queues[user_id][0][3]
+        return not user_limit or running.get(user_id, 0) < user_limit
+
+    def _position_locked(self, job_id):
+        # Replay the dispatch order on a copy of the queues, assuming jobs keep running
+        queues = {user_id: list(queue) for user_id, queue in self._queues.items()}
+        users = deque(self._users)
+        running = dict(self._running)
+        position = 0
+        while users:
+            picked = self._pick(queues, users, running)
+            if picked is None:
+                # Everyone left is at their limit; order the rest by priority then age
+                rest = sorted(entry for queue in queues.values() for entry in queue)
+                for entry in rest:
+                    position += 1
+                    if entry[2].job_id == job_id:
+                        return position
+                return None
+            user_id, entry = picked
+            position += 1
+            if entry[2].job_id == job_id:
+                return position
+            heapq.heappop(queues[user_id])
+            running[user_id] = running.get(user_id, 0) + 1
+            users.remove(user_id)
+            if queues[user_id]:
+                users.append(user_id)
+            else:
+                del queues[user_id]
+        return None
+
+    def _dispatch_loop(self):
+        while True:
+            with self._condition:
+                picked = None
+                while picked is None:
+                    if self._has_capacity() and self._users:
+                        picked = self._admit_next()
+                    if picked is None:
+                        # Other workers freeing shared slots can't notify us, so check again shortly
+                        self._condition.wait(SHARED_SLOT_POLL_SECONDS if self.shared else None)
+                user_id, entry, granted = picked
+                heapq.heappop(self._queues[user_id])
+                # Move the user to the back so other users get the next slot
+                self._users.remove(user_id)
+                if self._queues[user_id]:
+                    self._users.append(user_id)
+                else:
+                    del self._queues[user_id]
+                self._running[user_id] = self._running.get(user_id, 0) + 1
+                self._running_total += 1
+                job = entry[2]
+                job.browser_slots = granted
+                self.slots_used += granted
+                self.admitted += 1
+            threading.Thread(target=self._run_job, args=(job,), daemon=True).start()
+
+    def _run_job(self, job):
+        try:
+            self._run(job)
+        except Exception as e:
+            logger.error(f"Scheduled job {job.job_id} raised: {str(e)}")
+        finally:
+            with self._condition:
+                self._running[job.user_id] -= 1
+                if not self._running[job.user_id]:
+                    del self._running[job.user_id]
+                self._running_total -= 1
+                self.slots_used -= job.browser_slots
+                self._condition.notify()
+            if self.shared:
+                try:
+                    self.shared.release(job)
+                except Exception as e:
+                    logger.error(f"Could not release browser slots of job {job.job_id}: {str(e)}")
@@ -11,6 +11,7 @@ import json
 import time
 import pandas as pd
 import logging
+import logging.handlers
 import sys
 import os
 import argparse
@@ -19,6 +20,10 @@ import zipfile
 import io
 import platform
 import re
+import gzip
+import shutil
+import threading
+import queue
 from dotenv import load_dotenv
 import subprocess
 from selenium.webdriver.common.action_chains import ActionChains
@@ -32,6 +37,16 @@ import socket
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from metrics import MetricsReporter
+from profiler import Tracer
+from rate_limit import DEFAULT_REQUEST_DELAY, DomainRateLimiter, domain_of
+from adaptive import AIMDController, subpage_browser_limit
+from resilience import RetryPolicy, CircuitBreakers
+from results import write_json_rows
+from result_buffer import ResultBuffer
+from exports import cell_value, write_xlsx_rows
+from snapshots import SnapshotRecorder
+from response_cache import CachingProxy, ResponseArchive
 
 # Load environment variables from .env file
 load_dotenv()
@@ -272,6 +287,111 @@ def upload_to_google_drive(file_path, file_name):
         logger.log(f"Error uploading to Google Drive: {str(e)}", level=logging.ERROR)
         return None
 
+# Safe replacements for emoji that some consoles and log viewers can't render
+EMOJI_REPLACEMENTS = str.maketrans({
+    '\u2705': '[SUCCESS]',  # ✅
+    '\u274c': '[ERROR]',    # ❌
+    '\u27a1': '[NEXT]',     # ➡️
+})
+
+# Named per-job verbosity levels accepted in the "log_verbosity" config key
+LOG_VERBOSITY_LEVELS = {
+    "quiet": logging.WARNING,
+    "normal": logging.INFO,
+    "verbose": logging.DEBUG,
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+class StructuredFormatter(logging.Formatter):
+    """Text formatter that appends a record's structured fields as key=value pairs"""
+    def __init__(self, fmt=None, datefmt=None):
+        super().__init__(fmt, datefmt)
+        self._cached_key = None
+        self._cached_prefix = None
+
+    def formatTime(self, record, datefmt=None):
+        # Records arrive in bursts, so only re-render the seconds part once per second;
+        # milliseconds (when there is no datefmt) are appended per record as logging.Formatter does
+        key = (int(record.created), datefmt)
+        if key != self._cached_key:
+            self._cached_prefix = time.strftime(datefmt or self.default_time_format, self.converter(record.created))
+            self._cached_key = key
+        if datefmt or not self.default_msec_format:
+            return self._cached_prefix
+        return self.default_msec_format % (self._cached_prefix, record.msecs)
+
+    def format(self, record):
+        message = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            message += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        return message
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log files that are processed by tools"""
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DeferredFlushMixin:
+    """Skip the per-record flush of a stream handler; BufferedHandler commits once per batch"""
+    def flush(self):
+        pass
+
+    def commit(self):
+        super().flush()
+
+class DeferredStreamHandler(DeferredFlushMixin, logging.StreamHandler):
+    pass
+
+class CompressedRotatingFileHandler(DeferredFlushMixin, logging.handlers.RotatingFileHandler):
+    """Size-rotated log file whose rotated backups are gzip-compressed"""
+    def __init__(self, filename, max_bytes, backup_count):
+        super().__init__(filename, mode='a', maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source, dest):
+        with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+class BufferedHandler(logging.handlers.MemoryHandler):
+    """Collects records and hands them to its target in batches.
+
+    A batch is written when the buffer is full, when a record at WARNING or above
+    arrives, or when Logger's background thread flushes on its interval.
+    """
+    def __init__(self, target, capacity):
+        super().__init__(capacity, flushLevel=logging.WARNING, target=target, flushOnClose=True)
+
+    def flush(self):
+        self.acquire()
+        try:
+            if not self.target or not self.buffer:
+                return
+            records, self.buffer = self.buffer, []
+            if hasattr(self.target, 'emit_batch'):
+                self.target.emit_batch(records)
+            else:
+                for record in records:
+                    self.target.handle(record)
+                if hasattr(self.target, 'commit'):
+                    self.target.commit()
+        finally:
+            self.release()
+
 class Logger:
     def __init__(self):
         self.logger = logging.getLogger('scraper')
@@ -286,16 +406,31 @@ class Logger:
                 pass
             self.logger.removeHandler(handler)
         
-        # Create stdout handler with immediate flushing and UTF-8 encoding
-        handler = logging.StreamHandler(sys.stdout)
-        handler.setFormatter(logging.Formatter('%(message)s'))  # Simplified format for frontend display
-        handler.flush = sys.stdout.flush  # Ensure immediate flushing
+        # Buffering and sampling settings, overridable per job through configure()
+        self.buffer_capacity = 200
+        self.flush_interval = 0.5
+        self.field_sample_every = 100
+        self.max_log_bytes = 10 * 1024 * 1024
+        self.log_backup_count = 5
+        self.file_format = "text"
+        self.buffered_handlers = []
+        self.field_counts = {}
+        self.field_total = 0
+        self._field_lock = threading.Lock()
+        
+        # Create stdout handler with UTF-8 encoding; output is flushed in batches
+        handler = DeferredStreamHandler(sys.stdout)
+        handler.setFormatter(StructuredFormatter('[%(asctime)s] %(levelname)s - %(message)s', '%Y-%m-%d %H:%M:%S'))
         
         # Set UTF-8 encoding for the handler
         if hasattr(handler.stream, 'reconfigure'):
             handler.stream.reconfigure(encoding='utf-8')
         
-        self.logger.addHandler(handler)
+        self.stream_handler = handler
+        self._add_buffered(handler)
+        
+        # Flush buffered records in the background so quiet periods still reach the UI promptly
+        threading.Thread(target=self._flush_loop, daemon=True).start()
         
         # Send initial test messages to verify logging is working
         self.log("===== LOGGER INITIALIZATION =====", level=logging.INFO)
@@ -304,39 +439,94 @@ class Logger:
         self.log("Test message 2: If you can see this, logging is working", level=logging.INFO)
         self.log("Test message 3: Proceeding with scraping...", level=logging.INFO)
         self.log("================================", level=logging.INFO)
-        
-        # Force immediate flush
-        sys.stdout.flush()
-        for handler in self.logger.handlers:
+        self.flush()
+    
+    def _add_buffered(self, target):
+        buffered = BufferedHandler(target, self.buffer_capacity)
+        self.logger.addHandler(buffered)
+        self.buffered_handlers.append(buffered)
+        return buffered
+    
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+    
+    def configure(self, config):
+        """Apply the per-job logging settings from a job config"""
+        verbosity = str(config.get("log_verbosity", "normal")).lower()
+        self.logger.setLevel(LOG_VERBOSITY_LEVELS.get(verbosity, logging.INFO))
+        self.field_sample_every = int(config.get("log_field_sample_every", 100))
+        self.flush_interval = max(0.05, float(config.get("log_flush_interval", 0.5)))
+        self.max_log_bytes = int(config.get("log_max_bytes", 10 * 1024 * 1024))
+        self.log_backup_count = int(config.get("log_backup_count", 5))
+        self.file_format = config.get("log_format", "text")
+        self.buffer_capacity = int(config.get("log_buffer_size", 200))
+        for handler in self.buffered_handlers:
+            handler.capacity = self.buffer_capacity
+        with self._field_lock:
+            self.field_counts = {}
+            self.field_total = 0
+    
+    def flush(self):
+        """Write out every buffered record"""
+        for handler in list(self.buffered_handlers):
             try:
                 handler.flush()
             except Exception:
                 pass
     
     def add_file_handler(self, log_file):
-        """Add a file handler to the logger"""
+        """Add a size-rotated, buffered file handler to the logger"""
         if log_file:
             try:
                 # Create directory for log file if it doesn't exist
                 os.makedirs(os.path.dirname(log_file), exist_ok=True)
                 
                 # Create and configure file handler with UTF-8 encoding
-                file_handler = logging.FileHandler(log_file, encoding='utf-8', mode='a')
-                file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-                file_handler.setFormatter(file_formatter)
+                file_handler = CompressedRotatingFileHandler(log_file, self.max_log_bytes, self.log_backup_count)
+                if self.file_format == "json":
+                    file_handler.setFormatter(JsonFormatter())
+                else:
+                    file_handler.setFormatter(StructuredFormatter('%(asctime)s - %(levelname)s - %(message)s'))
                 
                 # Add handler to logger
-                self.logger.addHandler(file_handler)
+                buffered = self._add_buffered(file_handler)
                 self.log(f"Added file handler for log file: {log_file}", level=logging.INFO)
+                return buffered
             except Exception as e:
                 print(f"Error setting up file handler: {str(e)}", file=sys.stderr)
                 sys.stderr.flush()
+        return None
     
-    def log(self, message, level=logging.INFO):
+    def remove_handler(self, handler):
+        """Flush, close and detach a handler added for a single job"""
+        try:
+            handler.flush()
+            handler.close()
+            if isinstance(handler, BufferedHandler) and handler.target:
+                handler.target.close()
+        except Exception:
+            pass
+        self.logger.removeHandler(handler)
+        if handler in self.buffered_handlers:
+            self.buffered_handlers.remove(handler)
+    
+    def redirect_stream(self, handler):
+        """Replace the stdout handler, e.g. to forward log lines over a worker pipe"""
+        handler.setFormatter(self.stream_handler.formatter)
+        for buffered in self.buffered_handlers:
+            if buffered.target is self.stream_handler:
+                buffered.flush()
+                buffered.setTarget(handler)
+        self.stream_handler = handler
+    
+    def log(self, message, level=logging.INFO, **fields):
+        """Log a message, optionally with structured key=value fields"""
+        # Filtered-out records cost nothing beyond this check
+        if not self.logger.isEnabledFor(level):
+            return
         try:
-            # Get current timestamp
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-            
             # Ensure message is properly encoded
             if isinstance(message, bytes):
                 message = message.decode('utf-8', errors='replace')
@@ -344,45 +534,170 @@ class Logger:
                 message = str(message)
             
             # Add emoji support while keeping safe replacements for logging
-            message = (message
-                .replace('\u2705', '[SUCCESS]')  # ✅
-                .replace('\u274c', '[ERROR]')    # ❌
-                .replace('\u27a1', '[NEXT]'))    # ➡️
+            message = message.translate(EMOJI_REPLACEMENTS)
             
-            # Add debug prefix to clearly identify messages
-            if level == logging.DEBUG:
-                formatted_message = f"[{timestamp}] DEBUG: {message}"
-            elif level == logging.INFO:
-                formatted_message = f"[{timestamp}] INFO - {message}"
-            elif level == logging.WARNING:
-                formatted_message = f"[{timestamp}] WARNING - {message}"
-            elif level == logging.ERROR:
-                formatted_message = f"[{timestamp}] ERROR - {message}"
-            else:
-                formatted_message = f"[{timestamp}] {message}"
-            
-            # Log the message with proper formatting
-            self.logger.log(level, formatted_message)
-            
-            # Force flush stdout
-            sys.stdout.flush()
-            
-            # Force flush all handlers
-            for handler in self.logger.handlers:
-                try:
-                    handler.flush()
-                except Exception:
-                    pass
-                
+            self._emit(level, message, fields)
         except Exception as e:
             # Print error directly to stderr as last resort
             error_msg = f"Error in logging: {str(e)}"
             print(error_msg, file=sys.stderr)
             sys.stderr.flush()
+    
+    def _emit(self, level, message, fields):
+        self.logger.log(level, message, extra={'fields': fields} if fields else None)
+    
+    def field(self, key, value, source="main"):
+        """Record one extracted field value.
+
+        Every value is logged at DEBUG; at normal verbosity only one in
+        field_sample_every is shown and the rest are counted for field_summary().
+        """
+        with self._field_lock:
+            self.field_counts[key] = self.field_counts.get(key, 0) + 1
+            self.field_total += 1
+            sampled = self.field_sample_every and (self.field_total - 1) % self.field_sample_every == 0
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.log(f"Extracted {source} field '{key}': {value}", level=logging.DEBUG)
+        elif sampled:
+            self.log(f"Extracted {source} field '{key}': {value} (sampled 1 in {self.field_sample_every})", level=logging.INFO)
+    
+    def field_summary(self, context):
+        """Log the per-field extraction counts gathered since the last summary"""
+        with self._field_lock:
+            counts, total = self.field_counts, self.field_total
+            self.field_counts = {}
+            self.field_total = 0
+        if total and self.logger.isEnabledFor(logging.INFO):
+            self._emit(logging.INFO, f"Extracted {total} field values {context}", counts)
 
 # Create a global logger instance
 logger = Logger()
 
+def write_metrics_line(line):
+    """Send a metrics report to the server over the job's stdout channel"""
+    sys.stdout.write(line + '\n')
+    sys.stdout.flush()
+
+# Aggregated throughput and latency metrics, reported to the server's /metrics endpoint
+metrics = MetricsReporter(write_metrics_line)
+
+# Per-job timeline of phases, page loads and waits, saved as trace.json in the output directory
+tracer = Tracer()
+
+# Per-domain politeness limit, shared with other jobs through a SQLite file when the server sets one
+rate_limiter = DomainRateLimiter()
+
+# Saves the pages a job extracts from when its config sets record_snapshots
+snapshot_recorder = None
+
+# Local record/replay proxy the job's browsers go through when its config sets response_cache
+response_proxy = None
+
+# Waits that only give a live site time to respond; replayed responses arrive at once
+REPLAY_WAIT_KEYS = ("initial_wait", "page_wait", "subpage_wait", "scroll_wait", "load_more_wait")
+
+def replace_rate_limiter(limiter):
+    """Swap in a new module rate limiter, closing the previous job's connection"""
+    global rate_limiter
+    previous, rate_limiter = rate_limiter, limiter
+    previous.close()
+
+def configure_rate_limiter(config):
+    """Point the module's rate limiter at the job's shared bucket store and limits"""
+    settings = config.get("concurrent_settings", {})
+    base_delay = settings.get("base_request_delay", DEFAULT_REQUEST_DELAY)
+    replace_rate_limiter(DomainRateLimiter(
+        config.get("rate_limit_db"),
+        rate=1 / base_delay if base_delay > 0 else 0,
+        burst=settings.get("max_concurrent_requests", 2),
+        domains=settings.get("domain_rate_limits")
+    ))
+
+def configure_snapshots(config):
+    """Start recording page snapshots if the job asks for it.
+
+    record_snapshots is true for the job's output_dir/snapshots, or the name of a
+    directory inside output_dir; paths leading out of output_dir are refused.
+    """
+    global snapshot_recorder
+    target = config.get("record_snapshots")
+    if not target:
+        snapshot_recorder = None
+        return
+    output_dir = os.path.abspath(config.get("output_dir") or ".")
+    if target is True:
+        directory = os.path.join(output_dir, "snapshots")
+    elif isinstance(target, str):
+        directory = os.path.abspath(os.path.join(output_dir, target))
+        if os.path.commonpath([output_dir, directory]) != output_dir or directory == output_dir:
+            raise ValueError(f"record_snapshots must name a directory inside the job's output directory, got {target!r}")
+    else:
+        raise ValueError(f"record_snapshots must be true or a directory name, got {target!r}")
+    snapshot_recorder = SnapshotRecorder(directory, config)
+    logger.log(f"Recording page snapshots to {directory}", level=logging.INFO)
+
+def start_response_cache(config):
+    """Start the job's record/replay proxy if its config sets response_cache.
+
+    response_cache is "record" or "replay", or a dict with mode, dir (default
+    output_dir/response_cache), ignore_params and, for replay, wait: the cap on the
+    config's page waits. Replay also turns off rate limiting since nothing goes upstream.
+    """
+    global response_proxy
+    settings = config.get("response_cache")
+    if not settings:
+        return None
+    if isinstance(settings, str):
+        settings = {"mode": settings}
+    mode = settings.get("mode", "replay")
+    directory = settings.get("dir") or os.path.join(config.get("output_dir") or ".", "response_cache")
+    response_proxy = CachingProxy(ResponseArchive(directory), mode=mode, ignore_params=settings.get("ignore_params", ())).start()
+    if mode == "replay":
+        wait = settings.get("wait", 0.5)
+        for key in REPLAY_WAIT_KEYS:
+            if key in config:
+                config[key] = min(config[key], wait)
+            else:
+                config[key] = wait
+        replace_rate_limiter(DomainRateLimiter(rate=0))
+    logger.log(f"Response cache: {mode} mode, archive {directory}, proxy {response_proxy.url}", level=logging.INFO)
+    return response_proxy
+
+def stop_response_cache():
+    global response_proxy
+    if not response_proxy:
+        return
+    try:
+        logger.log(f"Response cache: {response_proxy.summary()}", level=logging.INFO)
+        response_proxy.stop()
+        response_proxy.archive.close()
+    finally:
+        response_proxy = None
+
+def record_snapshot(driver, kind, url=None, **details):
+    """Save the driver's current page to the snapshot recording, if one is active"""
+    if not snapshot_recorder:
+        return
+    try:
+        url = url or driver.current_url
+        with tracer.span("record_snapshot", "snapshot"):
+            snapshot_recorder.record(kind, url, driver.page_source, **details)
+    except Exception as e:
+        logger.log(f"Failed to record snapshot of {url}: {str(e)}", level=logging.WARNING)
+
+def throttle(url):
+    """Wait for the target domain's rate limit before sending a request to it"""
+    with tracer.span("rate_limit", "wait"):
+        waited = rate_limiter.acquire(url)
+    if waited:
+        metrics.observe('scraper_rate_limit_wait_seconds', waited)
+
+def load_page(driver, url):
+    """Navigate to url, recording the WebDriver round-trip time"""
+    throttle(url)
+    with tracer.span("navigate", "navigation", url=url), metrics.time('scraper_webdriver_request_seconds', command='get'):
+        driver.get(url)
+
 def download_chromedriver(version=None):
     """Download ChromeDriver manually and return the path to the executable."""
     try:
@@ -581,6 +896,12 @@ def setup_driver(headless=True):
         chrome_options.add_argument('--disable-extensions')
         chrome_options.add_argument('--disable-software-rasterizer')
         
+        # Send all traffic through the job's response cache, which presents its own certificates for HTTPS
+        if response_proxy:
+            chrome_options.add_argument(f'--proxy-server={response_proxy.url}')
+            chrome_options.add_argument('--proxy-bypass-list=<-loopback>')
+            chrome_options.add_argument('--ignore-certificate-errors')
+
         # Add user agent
         chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.7103.93 Safari/537.36')
 
@@ -626,7 +947,7 @@ def setup_driver(headless=True):
                     logger.log(f"Failed to initialize Chrome WebDriver (attempt {retry_count}/{max_retries}): {str(e)}", level=logging.ERROR)
                     if retry_count == max_retries:
                         raise
-                    time.sleep(2)  # Wait before retrying
+                    tracer.sleep(2, "driver_retry_wait")  # Wait before retrying
                     
         except Exception as e:
             logger.log(f"Error using webdriver_manager: {str(e)}", level=logging.ERROR)
@@ -636,6 +957,22 @@ def setup_driver(headless=True):
         logger.log(f"Error setting up Chrome WebDriver: {str(e)}", level=logging.ERROR)
         raise
 
+def reset_driver(driver, headless=True):
+    """Return a clean, live WebDriver for the next job, reusing the given one when possible."""
+    if driver:
+        try:
+            # Drop state left behind by the previous job
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+            return driver
+        except Exception as e:
+            logger.log(f"Warm WebDriver is no longer usable, starting a new one: {str(e)}", level=logging.WARNING)
+            try:
+                driver.quit()
+            except Exception:
+                pass
+    return setup_driver(headless=headless)
+
 def validate_config(config):
     required_keys = ["base_url", "container_selector", "fields"]
     for key in required_keys:
@@ -672,9 +1009,10 @@ def get_total_pages(driver, config):
     """
     try:
         # Wait for pagination elements to load
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, config["next_page_selector"]))
-        )
+        with tracer.span("wait_for_pagination", "wait"):
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, config["next_page_selector"]))
+            )
         
         # Try different methods to find total pages
         pagination_elements = driver.find_elements(By.CSS_SELECTOR, config["next_page_selector"]) 
@@ -734,8 +1072,8 @@ def handle_url_based_pagination(driver, current_url, current_page):
             
         # Try navigating to next page
         old_url = driver.current_url
-        driver.get(next_url)
-        time.sleep(3)  # Wait for page load
+        load_page(driver, next_url)
+        tracer.sleep(3, "page_load_wait")  # Wait for page load
         
         # Verify if page changed successfully
         if driver.current_url != old_url:
@@ -770,9 +1108,10 @@ def handle_click_based_pagination(driver, next_page_selector, current_page):
         for attempt in range(max_attempts):
             try:
                 # Wait for next page button to be present and clickable
-                next_page = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, next_page_selector))
-                )
+                with tracer.span("wait_for_next_button", "wait"):
+                    next_page = WebDriverWait(driver, 10).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, next_page_selector))
+                    )
                 
                 # Check if next page button is enabled and visible
                 if next_page.is_displayed() and next_page.is_enabled():
@@ -786,7 +1125,10 @@ def handle_click_based_pagination(driver, next_page_selector, current_page):
                             block: 'center'
                         });
                     """, next_page)
-                    time.sleep(2)
+                    tracer.sleep(2, "scroll_into_view_wait")
+                    
+                    # A click loads the next page from the same site, so it counts against the rate limit
+                    throttle(old_url)
                     
                     # Try multiple click methods
                     click_success = False
@@ -840,10 +1182,11 @@ def handle_click_based_pagination(driver, next_page_selector, current_page):
                                 return False
                         
                         # Wait for page change with increased timeout
-                        WebDriverWait(driver, 20).until(page_changed)
+                        with tracer.span("wait_for_page_change", "wait"):
+                            WebDriverWait(driver, 20).until(page_changed)
                         
                         # Additional wait to ensure content is fully loaded
-                        time.sleep(3)
+                        tracer.sleep(3, "page_load_wait")
                         
                         # Verify the change
                         new_content = driver.find_elements(By.CSS_SELECTOR, "tr.grid-row")
@@ -876,8 +1219,9 @@ def handle_click_based_pagination(driver, next_page_selector, current_page):
                     try:
                         next_page_num = driver.find_element(By.CSS_SELECTOR, f"{next_page_selector}:not([disabled])")
                         if next_page_num.is_displayed() and next_page_num.is_enabled():
+                            throttle(driver.current_url)
                             next_page_num.click()
-                            time.sleep(3)
+                            tracer.sleep(3, "page_load_wait")
                             return True
                     except:
                         pass
@@ -891,7 +1235,7 @@ def handle_click_based_pagination(driver, next_page_selector, current_page):
                 logger.log(f"Attempt {attempt + 1} failed: {str(e)}", level=logging.WARNING)
                 if attempt == max_attempts - 1:
                     return False
-                time.sleep(2)  # Wait before retrying
+                tracer.sleep(2, "retry_wait")  # Wait before retrying
         
         return False
         
@@ -899,7 +1243,72 @@ def handle_click_based_pagination(driver, next_page_selector, current_page):
         logger.log(f"Click-based navigation failed: {str(e)}", level=logging.WARNING)
         return False
 
-def scrape_subpage(driver, config, url):
+# Text that marks a throttling, block or captcha page rather than real content
+BLOCKED_PAGE_MARKERS = (
+    "access denied",
+    "too many requests",
+    "rate limit exceeded",
+    "unusual traffic",
+    "captcha",
+    "403 forbidden",
+    "service unavailable",
+)
+
+def is_blocked_page(driver, config):
+    """Check whether the loaded page is the site refusing service instead of the requested page"""
+    markers = [m.lower() for m in config.get("blocked_markers", [])] or BLOCKED_PAGE_MARKERS
+    try:
+        text = (driver.title + " " + driver.execute_script(
+            "return document.body ? document.body.innerText.slice(0, 2000) : '';"
+        )).lower()
+    except Exception:
+        return False
+    return any(marker in text for marker in markers)
+
+def extract_subpage_fields(driver, config):
+    """Extract the configured subpage fields from the page the driver has loaded"""
+    subpage_data = {}
+    for key, selector in config.get("subpage_fields", {}).items():
+        try:
+            if isinstance(selector, dict):
+                if selector.get("use_label", False):
+                    # Find the label element first
+                    label_text = selector.get("label", key)
+                    try:
+                        # Try to find label by text content
+                        label = driver.find_element(By.XPATH, f"//label[contains(text(), '{label_text}')]")
+                        
+                        # Get the parent form-group div
+                        form_group = label.find_element(By.XPATH, "./ancestor::div[contains(@class, 'form-group')]")
+                        
+                        # Find the value div (usually the next sibling div with col-md-3 class)
+                        value_div = form_group.find_element(By.XPATH, ".//div[contains(@class, 'col-md-3')][2]")
+                        
+                        # Get the text content, excluding any validation spans
+                        value = value_div.text.strip()
+                        if value:
+                            subpage_data[key] = value
+                        else:
+                            subpage_data[key] = None
+                            logger.log(f"No value found for label '{label_text}'", level=logging.WARNING)
+                            
+                    except Exception as label_error:
+                        logger.log(f"Couldn't find label '{label_text}': {label_error}", level=logging.WARNING)
+                        subpage_data[key] = None
+                else:
+                    # Use regular selector method
+                    elem = driver.find_element(By.CSS_SELECTOR, selector["selector"])
+                    subpage_data[key] = elem.get_attribute(selector["attribute"])
+            else:
+                elem = driver.find_element(By.CSS_SELECTOR, selector)
+                subpage_data[key] = elem.text.strip()
+            logger.field(key, subpage_data[key], source="subpage")
+        except Exception as e:
+            subpage_data[key] = None
+            logger.log(f"Couldn't extract subpage field '{key}': {e}", level=logging.WARNING)
+    return subpage_data
+
+def scrape_subpage(driver, config, url, controller=None, slot_started=None):
     """
     Scrape data from a subpage.
     
@@ -907,65 +1316,46 @@ def scrape_subpage(driver, config, url):
         driver: Selenium WebDriver instance
         config: Scraping configuration
         url: URL of the subpage to scrape
+        controller: Optional AIMDController to report the page's latency and outcome to
+        slot_started: time.monotonic() when the request was started, for the controller
         
     Returns:
-        dict: Extracted data from the subpage
+        dict: Extracted data from the subpage, or None if the page failed to load or was blocked
     """
+    started = time.perf_counter()
+    reported = False
     try:
         # Store current URL to return to main page later
         main_page_url = driver.current_url
         
         # Navigate to subpage
-        driver.get(url)
-        time.sleep(config.get("subpage_wait", 3))
+        load_page(driver, url)
+        load_seconds = time.perf_counter() - started
+        if is_blocked_page(driver, config):
+            logger.log(f"Subpage {url} looks like a block or throttling page", level=logging.WARNING)
+            metrics.inc('scraper_subpages_total', outcome='blocked')
+            if controller:
+                controller.record(slot_started, load_seconds, ok=False, throttled=True)
+            return None
+        if controller:
+            controller.record(slot_started, load_seconds)
+            reported = True
+        tracer.sleep(config.get("subpage_wait", 3), "subpage_wait")
         
         # Extract data using subpage selectors
-        subpage_data = {}
-        for key, selector in config.get("subpage_fields", {}).items():
-            try:
-                if isinstance(selector, dict):
-                    if selector.get("use_label", False):
-                        # Find the label element first
-                        label_text = selector.get("label", key)
-                        try:
-                            # Try to find label by text content
-                            label = driver.find_element(By.XPATH, f"//label[contains(text(), '{label_text}')]")
-                            
-                            # Get the parent form-group div
-                            form_group = label.find_element(By.XPATH, "./ancestor::div[contains(@class, 'form-group')]")
-                            
-                            # Find the value div (usually the next sibling div with col-md-3 class)
-                            value_div = form_group.find_element(By.XPATH, ".//div[contains(@class, 'col-md-3')][2]")
-                            
-                            # Get the text content, excluding any validation spans
-                            value = value_div.text.strip()
-                            if value:
-                                subpage_data[key] = value
-                                logger.log(f"Extracted '{key}' using label '{label_text}': {value}", level=logging.INFO)
-                            else:
-                                subpage_data[key] = None
-                                logger.log(f"No value found for label '{label_text}'", level=logging.WARNING)
-                                
-                        except Exception as label_error:
-                            logger.log(f"Couldn't find label '{label_text}': {label_error}", level=logging.WARNING)
-                            subpage_data[key] = None
-                    else:
-                        # Use regular selector method
-                        elem = driver.find_element(By.CSS_SELECTOR, selector["selector"])
-                        subpage_data[key] = elem.get_attribute(selector["attribute"])
-                else:
-                    elem = driver.find_element(By.CSS_SELECTOR, selector)
-                    subpage_data[key] = elem.text.strip()
-                logger.log(f"Extracted subpage field '{key}': {subpage_data[key]}", level=logging.INFO)
-            except Exception as e:
-                subpage_data[key] = None
-                logger.log(f"Couldn't extract subpage field '{key}': {e}", level=logging.WARNING)
+        subpage_data = extract_subpage_fields(driver, config)
         
+        metrics.inc('scraper_subpages_total', outcome='ok')
+        metrics.observe('scraper_subpage_seconds', time.perf_counter() - started)
+        record_snapshot(driver, "subpage", url, fields=subpage_data)
         return subpage_data
         
     except Exception as e:
         logger.log(f"Failed to scrape subpage {url}: {e}", level=logging.ERROR)
-        return {}
+        metrics.inc('scraper_subpages_total', outcome='timeout' if isinstance(e, TimeoutException) else 'error')
+        if controller and not reported:
+            controller.record(slot_started, time.perf_counter() - started, ok=False)
+        return None
 
 def handle_load_more_button(driver, config):
     """Handle dynamic 'Load More' or 'Show More' buttons that appear while scrolling."""
@@ -977,9 +1367,10 @@ def handle_load_more_button(driver, config):
             
         # Wait briefly for the button to be visible
         try:
-            load_more_button = WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, load_more_selector))
-            )
+            with tracer.span("wait_for_load_more", "wait"):
+                load_more_button = WebDriverWait(driver, 5).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, load_more_selector))
+                )
         except TimeoutException:
             return False
             
@@ -991,7 +1382,7 @@ def handle_load_more_button(driver, config):
             # Scroll button into view and highlight it
             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", load_more_button)
             driver.execute_script("arguments[0].style.border='3px solid red';", load_more_button)
-            time.sleep(1)  # Pause to show the highlighted button
+            tracer.sleep(1, "highlight_wait")  # Pause to show the highlighted button
             
             try:
                 driver.execute_script("arguments[0].click();", load_more_button)
@@ -1005,7 +1396,7 @@ def handle_load_more_button(driver, config):
                     return False
             
             # Wait for new content to load
-            time.sleep(config.get("load_more_wait", 3))
+            tracer.sleep(config.get("load_more_wait", 3), "load_more_wait")
             
             # Verify new items were loaded
             new_count = len(driver.find_elements(By.CSS_SELECTOR, config["container_selector"]))
@@ -1022,6 +1413,63 @@ def handle_load_more_button(driver, config):
         logger.log(f"Error handling 'Load More' button: {str(e)}", level=logging.WARNING)
         return False
 
+# Rows sent per Sheets API request, so a large result never has to be held as one list of lists
+SHEETS_CHUNK_ROWS = 5000
+
+def sheet_value_chunks(data, header=True, chunk_rows=SHEETS_CHUNK_ROWS):
+    """Rows of data as lists of cell values for the Sheets API, in chunks of at most chunk_rows.
+
+    The header row, if asked for, starts the first chunk.
+    """
+    if isinstance(data, pd.DataFrame):
+        columns = data.columns.tolist()
+        rows = (row for start in range(0, len(data), chunk_rows) for row in data.iloc[start:start + chunk_rows].values.tolist())
+    else:
+        if not isinstance(data, ResultBuffer):
+            data = ResultBuffer.from_rows(data)
+        columns = data.columns
+        # Cells must be JSON scalars; nested values are sent as their JSON text and missing ones as blanks
+        rows = (['' if value is None else cell_value(value) for value in row] for row in data.rows_as_lists(columns))
+    chunk = [columns] if header else []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def write_sheet_values(service, spreadsheet_id, data, sheet=None, header=True, append=False):
+    """Write data to a sheet chunk by chunk and return the number of data rows written.
+
+    Without append, the chunks are written from A1 down, each at the row after the
+    previous one, just as a single update from A1 would place them. With append, each
+    chunk is appended after the sheet's existing rows.
+    """
+    prefix = f"{sheet}!" if sheet else ''
+    written = 0
+    next_row = 1
+    for index, chunk in enumerate(sheet_value_chunks(data, header=header)):
+        if append:
+            service.spreadsheets().values().append(
+                spreadsheetId=spreadsheet_id,
+                range=f"{prefix}A:A",  # Append to the end
+                valueInputOption='RAW',
+                insertDataOption='INSERT_ROWS',
+                body={'values': chunk}
+            ).execute()
+        else:
+            # An explicit start row, since appending would land after rows left from earlier content
+            service.spreadsheets().values().update(
+                spreadsheetId=spreadsheet_id,
+                range=f"{prefix}A{next_row}",
+                valueInputOption='RAW',
+                body={'values': chunk}
+            ).execute()
+            next_row += len(chunk)
+        written += len(chunk) - (1 if header and index == 0 else 0)
+    return written
+
 def create_google_sheet(service, title, folder_id):
     """Create a new Google Sheet and return its ID."""
     try:
@@ -1045,28 +1493,8 @@ def create_google_sheet(service, title, folder_id):
 def update_google_sheet(service, spreadsheet_id, data):
     """Update a Google Sheet with the scraped data."""
     try:
-        # Convert data to list of lists format
-        if isinstance(data, pd.DataFrame):
-            values = [data.columns.tolist()] + data.values.tolist()
-        else:
-            # Convert list of dicts to DataFrame first
-            df = pd.DataFrame(data)
-            values = [df.columns.tolist()] + df.values.tolist()
-        
-        # Prepare the update request
-        body = {
-            'values': values
-        }
-        
-        # Update the sheet
-        result = service.spreadsheets().values().update(
-            spreadsheetId=spreadsheet_id,
-            range='A1',  # Start from A1
-            valueInputOption='RAW',
-            body=body
-        ).execute()
-        
-        logger.log(f"Updated {result.get('updatedCells')} cells in Google Sheet", level=logging.INFO)
+        rows = write_sheet_values(service, spreadsheet_id, data)
+        logger.log(f"Updated Google Sheet with {rows} rows of data", level=logging.INFO)
         return True
     except Exception as e:
         logger.log(f"Error updating Google Sheet: {str(e)}", level=logging.ERROR)
@@ -1244,73 +1672,18 @@ def upload_to_google_sheets(data, file_name):
                     
                     if len(existing_rows) > 1:  # More than just header
                         # Append new data (skip header since it already exists)
-                        if isinstance(data, pd.DataFrame):
-                            new_df = data
-                        else:
-                            new_df = pd.DataFrame(data)
-                        
-                        # Convert to list of lists (skip header)
-                        values = new_df.values.tolist()
-                        
-                        # Append the new data
-                        body = {
-                            'values': values
-                        }
-                        
-                        result = sheets_service.spreadsheets().values().append(
-                            spreadsheetId=existing_file_id,
-                            range='Properties!A:A',  # Append to the end
-                            valueInputOption='RAW',
-                            insertDataOption='INSERT_ROWS',
-                            body=body
-                        ).execute()
-                        
-                        logger.log(f"Appended {len(values)} new rows to existing 'Properties' sheet", level=logging.INFO)
+                        rows = write_sheet_values(sheets_service, existing_file_id, data, sheet='Properties', header=False, append=True)
+                        logger.log(f"Appended {rows} new rows to existing 'Properties' sheet", level=logging.INFO)
                     else:
                         # No existing data, add header and data
-                        if isinstance(data, pd.DataFrame):
-                            new_df = data
-                        else:
-                            new_df = pd.DataFrame(data)
-                        
-                        # Convert to list of lists (include header)
-                        values = [new_df.columns.tolist()] + new_df.values.tolist()
-                        
-                        # Update the sheet with header and data
-                        body = {
-                            'values': values
-                        }
-                        
-                        result = sheets_service.spreadsheets().values().update(
-                            spreadsheetId=existing_file_id,
-                            range='Properties!A1',
-                            valueInputOption='RAW',
-                            body=body
-                        ).execute()
-                        
-                        logger.log(f"Created 'Properties' sheet with {len(values)-1} rows of data", level=logging.INFO)
+                        rows = write_sheet_values(sheets_service, existing_file_id, data, sheet='Properties')
+                        logger.log(f"Created 'Properties' sheet with {rows} rows of data", level=logging.INFO)
                         
                 except Exception as e:
                     logger.log(f"Error checking existing data: {str(e)}", level=logging.WARNING)
                     # Fallback to update method
-                    if isinstance(data, pd.DataFrame):
-                        new_df = data
-                    else:
-                        new_df = pd.DataFrame(data)
-                    
-                    values = [new_df.columns.tolist()] + new_df.values.tolist()
-                    body = {
-                        'values': values
-                    }
-                    
-                    result = sheets_service.spreadsheets().values().update(
-                        spreadsheetId=existing_file_id,
-                        range='Properties!A1',
-                        valueInputOption='RAW',
-                        body=body
-                    ).execute()
-                    
-                    logger.log(f"Updated 'Properties' sheet with {len(values)-1} rows of data (fallback)", level=logging.INFO)
+                    rows = write_sheet_values(sheets_service, existing_file_id, data, sheet='Properties')
+                    logger.log(f"Updated 'Properties' sheet with {rows} rows of data (fallback)", level=logging.INFO)
                 return existing_file_id
                 
             except Exception as e:
@@ -1323,24 +1696,8 @@ def upload_to_google_sheets(data, file_name):
             # Create Properties sheet
             if create_sheet_in_spreadsheet(sheets_service, spreadsheet_id, 'Properties'):
                 # Update the Properties sheet with data
-                if isinstance(data, pd.DataFrame):
-                    new_df = data
-                else:
-                    new_df = pd.DataFrame(data)
-                
-                values = [new_df.columns.tolist()] + new_df.values.tolist()
-                body = {
-                    'values': values
-                }
-                
-                result = sheets_service.spreadsheets().values().update(
-                    spreadsheetId=spreadsheet_id,
-                    range='Properties!A1',
-                    valueInputOption='RAW',
-                    body=body
-                ).execute()
-                
-                logger.log(f"Created new spreadsheet with 'Properties' sheet containing {len(values)-1} rows of data", level=logging.INFO)
+                rows = write_sheet_values(sheets_service, spreadsheet_id, data, sheet='Properties')
+                logger.log(f"Created new spreadsheet with 'Properties' sheet containing {rows} rows of data", level=logging.INFO)
                 return spreadsheet_id
         
         return None
@@ -1349,7 +1706,287 @@ def upload_to_google_sheets(data, file_name):
         logger.log(f"Error uploading to Google Sheets: {str(e)}", level=logging.ERROR)
         return None
 
-def scrape_data(config):
+def make_subpage_controller(config):
+    """Build the AIMD controller for a job's subpages from its concurrent_settings"""
+    settings = config.get("concurrent_settings", {})
+    bounds = settings.get("adaptive_concurrency", {})
+    subpage_wait = config.get("subpage_wait", 3)
+    if bounds is False:
+        # Fixed pacing: one subpage at a time with subpage_wait between them
+        return AIMDController(1, 1, subpage_wait, subpage_wait, subpage_wait, target_latency=None)
+    # Never more browsers than the scheduler granted the job
+    max_limit = subpage_browser_limit(config)
+    return AIMDController(
+        min_limit=min(bounds.get("min_concurrency", 1), max_limit),
+        max_limit=max_limit,
+        min_delay=bounds.get("min_delay", 0),
+        max_delay=bounds.get("max_delay", 30),
+        initial_delay=subpage_wait,
+        target_latency=bounds.get("target_latency", 10)
+    )
+
+def scrape_subpage_with_retry(driver, config, url, controller, retry_policy, breakers):
+    """Scrape a subpage, retrying failures with backoff; returns None once every attempt has failed"""
+    domain = domain_of(url)
+    breaker = breakers.get(domain)
+    for attempt in range(1, retry_policy.attempts + 1):
+        # Hold off while the domain's circuit is open
+        wait, ticket = breaker.admit()
+        while wait:
+            tracer.sleep(wait, "circuit_open")
+            wait, ticket = breaker.admit()
+
+        subpage_data = scrape_subpage(driver, config, url, controller, time.monotonic())
+        if breaker.record(subpage_data is not None, ticket):
+            logger.log(f"Too many subpage failures on {domain}, pausing requests to it for {breaker.cooldown:.0f}s", level=logging.WARNING)
+            metrics.inc('scraper_circuit_breaker_opened_total')
+        if subpage_data is not None:
+            return subpage_data
+
+        if attempt < retry_policy.attempts:
+            delay = retry_policy.delay(attempt)
+            logger.log(f"Retrying subpage {url} in {delay:.1f}s (attempt {attempt + 1}/{retry_policy.attempts})", level=logging.INFO)
+            metrics.inc('scraper_subpage_retries_total')
+            tracer.sleep(delay, "retry_backoff")
+    return None
+
+class SubpagePipeline:
+    """Scrapes the subpages of listing items on a pool of browsers as items are submitted.
+
+    Subpage fields are written into the item's row of the result buffer, so results
+    keep their listing order however the subpages finish. Worker threads start their browser only once the controller
+    lets concurrency grow. The work queue is bounded by queue_size (0 for no bound);
+    submit() blocks while it is full, which holds pagination back to the pace of the
+    subpage workers. Items whose browser could not start or whose subpage failed
+    every attempt are retried once more on the job's driver by finish().
+    """
+    def __init__(self, config, results, queue_size=0, total_items=None):
+        self.config = config
+        self.results = results
+        self.total_items = total_items
+        self.controller = make_subpage_controller(config)
+        settings = config.get("concurrent_settings", {})
+        self.retry_policy = RetryPolicy(**settings.get("retry", {}))
+        self.breakers = CircuitBreakers(**settings.get("circuit_breaker", {}))
+        self.submitted = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = threading.Event()
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._requeue = []  # Items whose subpage failed every attempt, retried once more at the end
+        self._workers = []
+        self._alive = 0
+
+    def start(self, workers):
+        """Start worker threads that each use a browser of their own"""
+        for n in range(1, workers + 1):
+            thread = threading.Thread(target=self._work, args=(None,), name=f"subpage-worker-{n}", daemon=True)
+            with self._lock:
+                self._alive += 1
+            self._workers.append(thread)
+            thread.start()
+        return self
+
+    def submit(self, index, link):
+        """Queue the subpage link of results row index (from 1), waiting while the queue is full"""
+        self.submitted += 1
+        entry = (index, link)
+        if self._queue.full():
+            metrics.inc('scraper_subpage_queue_full_total')
+        with tracer.span("subpage_queue", "wait"):
+            while True:
+                with self._lock:
+                    if self._workers and not self._alive:
+                        # No worker browser is left, so finish() scrapes it on the job's driver
+                        self._requeue.append(entry)
+                        return
+                try:
+                    self._queue.put(entry, timeout=1)
+                    return
+                except queue.Full:
+                    continue
+
+    def _next(self):
+        while not self._stopped.is_set():
+            try:
+                return self._queue.get(timeout=0.2)
+            except queue.Empty:
+                if self._closed.is_set():
+                    return None
+        return None
+
+    def _work(self, worker_driver):
+        owns_worker_driver = worker_driver is None
+        try:
+            while True:
+                entry = self._next()
+                if entry is None:
+                    return
+                index, link = entry
+                self.controller.acquire()
+                try:
+                    if worker_driver is None:
+                        try:
+                            worker_driver = setup_driver(headless=True)
+                        except Exception as e:
+                            logger.log(f"Could not start an extra browser for subpages: {str(e)}", level=logging.WARNING)
+                            with self._lock:
+                                self._requeue.append(entry)
+                            return
+                    position = f"{index}/{self.total_items}" if self.total_items else f"{index}"
+                    logger.log(f"Processing subpage {position}: {link}", level=logging.INFO)
+                    with tracer.span("subpage", "subpage", url=link):
+                        subpage_data = scrape_subpage_with_retry(worker_driver, self.config, link, self.controller, self.retry_policy, self.breakers)
+                    if subpage_data is None:
+                        with self._lock:
+                            self._requeue.append(entry)
+                    else:
+                        self.results.update(index - 1, subpage_data)
+                        self.results.discard(index - 1, "_temp_link")  # Remove temporary link field
+                finally:
+                    self.controller.release()
+                tracer.sleep(self.controller.delay, "subpage_wait")  # Wait between subpage requests
+        finally:
+            if owns_worker_driver:
+                with self._lock:
+                    self._alive -= 1
+                if worker_driver:
+                    try:
+                        worker_driver.quit()
+                    except Exception:
+                        pass
+
+    def finish(self, driver):
+        """Help drain the queue with the job's driver, wait for the workers and retry failures"""
+        self._closed.set()
+        self._work(driver)
+        for thread in self._workers:
+            thread.join()
+        # Left behind by workers whose browser stopped
+        while True:
+            try:
+                self._requeue.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        # Give failed subpages one more round now that the site has had time to recover
+        if self._requeue:
+            logger.log(f"Retrying {len(self._requeue)} failed subpages...", level=logging.INFO)
+            failed = 0
+            for index, link in sorted(self._requeue, key=lambda entry: entry[0]):
+                self.controller.acquire()
+                try:
+                    with tracer.span("subpage", "subpage", url=link, requeued=True):
+                        subpage_data = scrape_subpage_with_retry(driver, self.config, link, self.controller, self.retry_policy, self.breakers)
+                finally:
+                    self.controller.release()
+                if subpage_data is None:
+                    failed += 1
+                    metrics.inc('scraper_subpages_failed_total')
+                    logger.log(f"Giving up on subpage {index}/{self.total_items or self.submitted}: {link}", level=logging.WARNING)
+                else:
+                    self.results.update(index - 1, subpage_data)
+                self.results.discard(index - 1, "_temp_link")  # Remove temporary link field
+            logger.log(f"Recovered {len(self._requeue) - failed} of {len(self._requeue)} failed subpages", level=logging.INFO)
+
+        state = self.controller.state()
+        logger.log(
+            f"Subpage concurrency ended at {state['limit']} with {state['delay']}s between requests "
+            f"({self.controller.increases} increases, {self.controller.decreases} decreases)",
+            level=logging.INFO
+        )
+
+    def stop(self):
+        """Abandon queued work and wait for the workers to close their browsers"""
+        self._stopped.set()
+        self._closed.set()
+        for thread in self._workers:
+            thread.join()
+
+def process_subpages(driver, config, results):
+    """Scrape the subpage of every item that has a link, updating its row of the result buffer.
+
+    Subpages are spread over up to max_concurrency browsers. The first uses the job's
+    driver; the others are started only once the controller lets concurrency grow.
+    """
+    pipeline = SubpagePipeline(config, results, total_items=len(results))
+    for index, link in enumerate(results.column("_temp_link"), 1):
+        if link:
+            pipeline.submit(index, link)
+    pipeline.start(min(pipeline.controller.max_limit, pipeline.submitted) - 1)
+    pipeline.finish(driver)
+
+def scroll_to_bottom(driver, config):
+    """Scroll down until the page stops growing, so lazily loaded content is rendered"""
+    logger.log("Starting to scroll down the page to load all content...", level=logging.INFO)
+    last_height = driver.execute_script("return document.body.scrollHeight")
+    scroll_attempts = 0
+    max_scroll_attempts = config.get("max_scroll_attempts", 20)  # Prevent infinite scrolling
+    
+    while scroll_attempts < max_scroll_attempts:
+        # Smooth scroll animation
+        driver.execute_script("""
+            window.scrollTo({
+                top: document.body.scrollHeight,
+                behavior: 'smooth'
+            });
+        """)
+        tracer.sleep(config.get("scroll_wait", 3), "scroll_wait")
+        new_height = driver.execute_script("return document.body.scrollHeight")
+        if new_height == last_height:
+            break
+        last_height = new_height
+        scroll_attempts += 1
+
+def extract_main_items(containers, config, results):
+    """Extract the main fields of every container into results; returns the number of items added"""
+    page_items = 0
+    for c in containers:
+        item = {}
+        scraping_successful = True
+        
+        # Extract main page data
+        for key, selector in config["fields"].items():
+            try:
+                if isinstance(selector, dict):
+                    elem = c.find_element(By.CSS_SELECTOR, selector["selector"])
+                    item[key] = elem.get_attribute(selector["attribute"])
+                    
+                    # If this is the link field, store it for later subpage scraping
+                    if selector.get("is_link", False):
+                        item["_temp_link"] = item[key]  # Store link with temporary key
+                else:
+                    elem = c.find_element(By.CSS_SELECTOR, selector)
+                    item[key] = elem.text.strip()
+                    logger.field(key, item[key])
+            except Exception as e:
+                item[key] = None
+                scraping_successful = False
+                logger.log(f"Couldn't extract '{key}': {e}", level=logging.WARNING)
+        
+        # Only add to results if scraping was successful
+        if scraping_successful:
+            results.append(item)
+            page_items += 1
+        else:
+            logger.log("Skipping item due to failed field extraction", level=logging.WARNING)
+    return page_items
+
+def scrape_data(config, driver=None):
+    """Run the scraping job described by config.
+
+    When a driver is passed in (e.g. a warm browser held by a pool worker) it is
+    reused and left open for the caller; otherwise a new one is created and quit.
+    """
+    owns_driver = driver is None
+    pipeline = None
+    results = None
+    if response_proxy and not owns_driver:
+        # A warm browser was started without the proxy, so it can't record or replay
+        logger.log("Response cache is active, starting a browser that uses it instead of the warm one", level=logging.INFO)
+        driver = None
+        owns_driver = True
+
     if not validate_config(config):
         logger.log("Invalid configuration. Exiting.", level=logging.ERROR)
         return 1  # Return error code for invalid config
@@ -1357,7 +1994,6 @@ def scrape_data(config):
     logger.log("Starting scraper with configuration:", level=logging.INFO)
     logger.log(json.dumps({k: v for k, v in config.items() if k not in ['fields', 'subpage_fields']}, indent=2), level=logging.INFO)
 
-    driver = None
     try:
         # Validate base URL
         if not config["base_url"].startswith(("http://", "https://")):
@@ -1375,12 +2011,15 @@ def scrape_data(config):
             return 1
 
         # Initialize driver with headless mode disabled
-        driver = setup_driver(headless=False)
+        tracer.phase("setup")
+        if owns_driver:
+            driver = setup_driver(headless=False)
         if not driver:
             logger.log("Failed to initialize Chrome driver", level=logging.ERROR)
             return 1
 
-        results = []
+        # Rows are kept column-wise and spill to disk past result_buffer_mb
+        results = ResultBuffer(memory_limit=int(config.get("result_buffer_mb", 64) * 1024 * 1024), spill_dir=config.get("output_dir") or None)
         page_num = config.get("start_page", 1)
         max_pages = config.get("max_pages", 10)
         skip_pages = config.get("skip_pages", 0)  # Get number of pages to skip
@@ -1390,31 +2029,41 @@ def scrape_data(config):
             logger.log(f"Job started for user {config.get('user_id')} (Job ID: {config.get('job_id')})", level=logging.INFO)
         
         # Phase 1: Collect all main fields and links
+        tracer.phase("pagination")
         logger.log("Phase 1: Collecting main fields and links from all pages...", level=logging.INFO)
+        if config.get("scrape_subpages", False) and config.get("pipeline_subpages", False):
+            # Subpages are scraped on other browsers while pagination continues. The job's
+            # own driver counts against max_concurrency like in the default mode, so a
+            # limit of 1 leaves no browser to pipeline with.
+            if subpage_browser_limit(config) > 1:
+                pipeline = SubpagePipeline(config, results, queue_size=config.get("subpage_queue_size", 50))
+                pipeline.start(pipeline.controller.max_limit - 1)
+                logger.log(f"Pipelining subpages on up to {pipeline.controller.max_limit - 1} extra browsers", level=logging.INFO)
+            else:
+                logger.log("Subpage concurrency is 1, so subpages are scraped after pagination", level=logging.INFO)
         try:
-            driver.get(config["base_url"])
+            load_page(driver, config["base_url"])
             logger.log(f"Navigated to base URL: {config['base_url']}", level=logging.INFO)
             
             # Add explicit wait after navigation
             wait_time = config.get("initial_wait", 5)
             logger.log(f"Waiting {wait_time} seconds for page to load...", level=logging.INFO)
-            time.sleep(wait_time)
+            tracer.sleep(wait_time, "initial_wait")
             
         except Exception as e:
             logger.log(f"Failed to navigate to base URL: {str(e)}", level=logging.ERROR)
             return 1
         
-        # Add delay for concurrent scraping
-        if config.get("concurrent"):
-            time.sleep(config.get("request_delay", 1))
-        else:
-            time.sleep(config.get("initial_wait", 5))
+        # Concurrent jobs are paced by the shared per-domain rate limiter instead of a fixed delay
+        if not config.get("concurrent"):
+            tracer.sleep(config.get("initial_wait", 5), "initial_wait")
         
         # Verify page loaded successfully
         try:
-            WebDriverWait(driver, config.get("initial_wait", 5)).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, config["container_selector"]))
-            )
+            with tracer.span("wait_for_containers", "wait"):
+                WebDriverWait(driver, config.get("initial_wait", 5)).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, config["container_selector"]))
+                )
         except TimeoutException:
             logger.log(f"Timeout waiting for container selector '{config['container_selector']}' to appear", level=logging.ERROR)
             return 1
@@ -1446,76 +2095,52 @@ def scrape_data(config):
                         logger.log("Failed to skip pages using click-based navigation", level=logging.ERROR)
                         return 1
                 page_num += 1
-                time.sleep(config.get("page_wait", 5))
+                tracer.sleep(config.get("page_wait", 5), "page_wait")
             logger.log(f"Successfully skipped {skip_pages} pages. Starting scrape from page {page_num}", level=logging.INFO)
         
         while True:
             logger.log(f"Scraping main fields from page {page_num}...", level=logging.INFO)
+            page_started = time.perf_counter()
             
             if page_num > max_pages:
                 logger.log(f"Reached maximum page limit ({max_pages}). Stopping.", level=logging.INFO)
                 break
             
-            # Scroll if needed
-            if config.get("scroll", False):
-                logger.log("Starting to scroll down the page to load all content...", level=logging.INFO)
-                last_height = driver.execute_script("return document.body.scrollHeight")
-                scroll_attempts = 0
-                max_scroll_attempts = config.get("max_scroll_attempts", 20)  # Prevent infinite scrolling
+            with tracer.span("page", "page", page=page_num):
+                # Scroll if needed
+                if config.get("scroll", False):
+                    scroll_to_bottom(driver, config)
+
+                # Expand 'Load More' lists only for configs that opt in with max_load_more_clicks
+                max_clicks = config.get("max_load_more_clicks", 0)
+                if max_clicks and config.get("load_more_selector"):
+                    clicks = 0
+                    while clicks < max_clicks and handle_load_more_button(driver, config):
+                        clicks += 1
+
+                # Find all containers
+                containers = driver.find_elements(By.CSS_SELECTOR, config["container_selector"])
+                if not containers:
+                    logger.log("No containers found on page. Stopping.", level=logging.WARNING)
+                    break
                 
-                while scroll_attempts < max_scroll_attempts:
-                    # Smooth scroll animation
-                    driver.execute_script("""
-                        window.scrollTo({
-                            top: document.body.scrollHeight,
-                            behavior: 'smooth'
-                        });
-                    """)
-                    time.sleep(config.get("scroll_wait", 3))
-                    new_height = driver.execute_script("return document.body.scrollHeight")
-                    if new_height == last_height:
-                        break
-                    last_height = new_height
-                    scroll_attempts += 1
+                logger.log(f"Found {len(containers)} containers on page {page_num}", level=logging.INFO)
+                
+                # Extract main data from containers
+                page_items = extract_main_items(containers, config, results)
             
-            # Find all containers
-            containers = driver.find_elements(By.CSS_SELECTOR, config["container_selector"])
-            if not containers:
-                logger.log("No containers found on page. Stopping.", level=logging.WARNING)
-                break
+            record_snapshot(driver, "listing", page=page_num, items=results[len(results) - page_items:])
+            if pipeline:
+                for index in range(len(results) - page_items, len(results)):
+                    link = results.get(index, "_temp_link")
+                    if link:
+                        pipeline.submit(index + 1, link)
             
-            logger.log(f"Found {len(containers)} containers on page {page_num}", level=logging.INFO)
-            
-            # Extract main data from containers
-            for c in containers:
-                item = {}
-                scraping_successful = True
-                
-                # Extract main page data
-                for key, selector in config["fields"].items():
-                    try:
-                        if isinstance(selector, dict):
-                            elem = c.find_element(By.CSS_SELECTOR, selector["selector"])
-                            item[key] = elem.get_attribute(selector["attribute"])
-                            
-                            # If this is the link field, store it for later subpage scraping
-                            if selector.get("is_link", False):
-                                item["_temp_link"] = item[key]  # Store link with temporary key
-                        else:
-                            elem = c.find_element(By.CSS_SELECTOR, selector)
-                            item[key] = elem.text.strip()
-                            logger.log(f"Extracted '{key}': {item[key]}", level=logging.INFO)
-                    except Exception as e:
-                        item[key] = None
-                        scraping_successful = False
-                        logger.log(f"Couldn't extract '{key}': {e}", level=logging.WARNING)
-                
-                # Only add to results if scraping was successful
-                if scraping_successful:
-                    results.append(item)
-                    logger.log("Successfully added item to results", level=logging.INFO)
-                else:
-                    logger.log("Skipping item due to failed field extraction", level=logging.WARNING)
+            metrics.inc('scraper_pages_total')
+            metrics.inc('scraper_items_total', page_items)
+            metrics.observe('scraper_page_seconds', time.perf_counter() - page_started)
+            logger.field_summary(f"on page {page_num}")
+            logger.log(f"Added {page_items} items from page {page_num} to results", level=logging.INFO, page=page_num, items=page_items)
             
             # Check if we should continue to next page
             if not config.get("paginate", False):
@@ -1538,33 +2163,21 @@ def scrape_data(config):
                     break
             
             page_num += 1
-            time.sleep(config.get("page_wait", 5))
+            tracer.sleep(config.get("page_wait", 5), "page_wait")
 
         # Phase 2: Process subpages if configured
-        if config.get("scrape_subpages", False):
+        if pipeline:
+            tracer.phase("subpages")
+            logger.log(f"\nPhase 2: Finishing {pipeline.submitted} pipelined subpages...", level=logging.INFO)
+            pipeline.finish(driver)
+            pipeline = None
+            logger.field_summary("from subpages")
+        elif config.get("scrape_subpages", False):
+            tracer.phase("subpages")
             logger.log("\nPhase 2: Processing subpages...", level=logging.INFO)
-            total_items = len(results)
-            
-            for index, item in enumerate(results, 1):
-                if item.get("_temp_link"):
-                    logger.log(f"Processing subpage {index}/{total_items}: {item['_temp_link']}", level=logging.INFO)
-                    subpage_data = scrape_subpage(driver, config, item["_temp_link"])
-                    item.update(subpage_data)
-                    del item["_temp_link"]  # Remove temporary link field
-                    time.sleep(config.get("subpage_wait", 3))  # Wait between subpage requests
-
-        # Add delays for concurrent scraping throughout the process
-        if config.get("concurrent"):
-            request_delay = config.get("request_delay", 1)
-            
-            # Add delay between page navigations
-            if config.get("paginate", False):
-                time.sleep(request_delay)
-            
-            # Add delay between subpage scraping
-            if config.get("scrape_subpages", False):
-                time.sleep(request_delay)
-                
+            process_subpages(driver, config, results)
+            logger.field_summary("from subpages")
+
         # Only save results if scraping was successful and we have data
         if results:
             # Set default output directory and filenames if not provided or empty
@@ -1588,13 +2201,22 @@ def scrape_data(config):
             os.makedirs(os.path.dirname(output_json), exist_ok=True)
             
             # Save the data
+            tracer.phase("save")
             try:
-                # Save JSON file locally
-                with open(output_json, "w", encoding="utf-8") as f:
-                    json.dump(results, f, ensure_ascii=False, indent=4)
+                # Save JSON file locally, one row per line with a row index for paged reads
+                write_json_rows(output_json, results)
+                
+                # Excel is written from the buffer too, one row at a time
+                output_excel = config.get("output_excel")
+                if output_excel:
+                    try:
+                        write_xlsx_rows(output_excel, results.columns, results.rows_as_lists())
+                        logger.log(f"Results saved to Excel: {output_excel}", level=logging.INFO)
+                    except Exception as e:
+                        logger.log(f"Error saving Excel file: {str(e)}", level=logging.WARNING)
                 
-                # Convert results to DataFrame
-                df = pd.DataFrame(results)
+                logger.log(f"Result buffer: {len(results)} rows, {results.memory_bytes() / 1048576:.1f} MB in memory, "
+                           f"{results.spilled_bytes / 1048576:.1f} MB spilled to disk", level=logging.INFO)
                 
                 # Generate Google Sheets filename
                 timestamp = time.strftime("%Y%m%d_%H%M%S")
@@ -1604,9 +2226,10 @@ def scrape_data(config):
                 logger.log(f"Results saved to JSON: {output_json}", level=logging.INFO)
                 
                 # Upload to Google Sheets
+                tracer.phase("upload")
                 try:
                     logger.log("Attempting to upload to Google Sheets...", level=logging.INFO)
-                    sheets_id = upload_to_google_sheets(df, sheets_filename)
+                    sheets_id = upload_to_google_sheets(results, sheets_filename)
                     if sheets_id:
                         logger.log(f"Successfully uploaded data to Google Sheets with ID: {sheets_id}", level=logging.INFO)
                         # Get the web view link
@@ -1615,8 +2238,10 @@ def scrape_data(config):
                         logger.log(f"Google Sheet can be accessed at: {file.get('webViewLink')}", level=logging.INFO)
                     else:
                         logger.log("Failed to upload data to Google Sheets", level=logging.WARNING)
+                        metrics.inc('scraper_upload_failures_total', target='google_sheets')
                 except Exception as e:
                     logger.log(f"Error during Google Sheets upload: {str(e)}", level=logging.ERROR)
+                    metrics.inc('scraper_upload_failures_total', target='google_sheets')
 
                 return 0  # Success
             except Exception as e:
@@ -1628,27 +2253,30 @@ def scrape_data(config):
 
     except Exception as e:
         logger.log(f"Error during scraping: {str(e)}", level=logging.ERROR)
-        if driver:
-            driver.quit()
         return 1
     finally:
-        if driver:
+        if pipeline:
+            pipeline.stop()
+        if results is not None:
+            results.close()
+        if driver and owns_driver:
             driver.quit()
 
-def main():
-    parser = argparse.ArgumentParser(description='Web Scraper')
-    parser.add_argument('--config', required=True, help='Path to config file')
-    args = parser.parse_args()
-    
+def run_config(config, driver=None):
+    """Run one job from an already loaded config and return its exit code."""
+    file_handler = None
     try:
-        # Load configuration
-        with open(args.config, 'r', encoding='utf-8') as f:
-            global config
-            config = json.load(f)
+        logger.configure(config)
+        metrics.start()
+        configure_rate_limiter(config)
+        configure_snapshots(config)
+        start_response_cache(config)
+        output_dir = config.get('output_dir')
+        tracer.start(os.path.join(output_dir, 'trace.json') if output_dir else None, enabled=config.get('trace', True))
         
         # Add file handler if log file is specified
         if config.get('log_file'):
-            logger.add_file_handler(config['log_file'])
+            file_handler = logger.add_file_handler(config['log_file'])
         
         # Log start message
         logger.log(f"Starting scraper with configuration:")
@@ -1658,13 +2286,56 @@ def main():
         
         # Run scraper
         if validate_config(config):
-            return_code = scrape_data(config)
+            return_code = scrape_data(config, driver=driver)
             if return_code != 0:
                 logger.log(f"Scraper failed with return code {return_code}", level=logging.ERROR)
-            sys.exit(return_code)
+            return return_code
         else:
             logger.log("Invalid configuration", level=logging.ERROR)
-            sys.exit(1)
+            return 1
+    finally:
+        try:
+            trace_path = tracer.save()
+            if trace_path:
+                logger.log(f"Trace written to {trace_path}", level=logging.INFO)
+        except Exception as e:
+            logger.log(f"Failed to write trace: {str(e)}", level=logging.WARNING)
+        logger.log(f"Timing summary: {tracer.summary()}", level=logging.INFO)
+        stop_response_cache()
+        metrics.flush()
+        logger.flush()
+        if file_handler:
+            logger.remove_handler(file_handler)
+
+def main():
+    parser = argparse.ArgumentParser(description='Web Scraper')
+    parser.add_argument('--config', help='Path to config file')
+    parser.add_argument('--worker-server', help='Run as a worker node leasing jobs from this server URL')
+    parser.add_argument('--capacity', type=int, default=1, help='Jobs a worker node runs at once')
+    parser.add_argument('--node-id', help='Stable worker node id (default: assigned by the server)')
+    args = parser.parse_args()
+    
+    if args.worker_server:
+        from remote_workers import WorkerNode
+        logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s - %(message)s')
+        WorkerNode(
+            args.worker_server,
+            capacity=max(1, args.capacity),
+            token=os.environ.get('SCRAPER_WORKER_TOKEN'),
+            node_id=args.node_id,
+            command=os.environ.get('SCRAPER_COMMAND')
+        ).run()
+        sys.exit(0)
+    if not args.config:
+        parser.error('--config is required unless --worker-server is given')
+    
+    try:
+        # Load configuration
+        with open(args.config, 'r', encoding='utf-8') as f:
+            global config
+            config = json.load(f)
+        
+        sys.exit(run_config(config))
     except Exception as e:
         logger.log(f"Fatal error in main: {str(e)}", level=logging.ERROR)
         sys.exit(1)
@@ -1,12 +1,9 @@
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, jsonify, request, send_file, Response
 import subprocess
 import threading
-import asyncio
 import signal
 import sys
 from flask_cors import CORS
-import websockets
-import queue
 import json
 import os
 import uuid
@@ -14,16 +11,37 @@ from datetime import datetime
 import time
 import logging
 from dotenv import load_dotenv
-from flask_socketio import SocketIO, emit, join_room, leave_room
+from flask_socketio import SocketIO, emit, join_room
 import socket
+from worker_pool import ScraperWorkerPool
+from remote_workers import RemoteWorkerRegistry, TOKEN_HEADER
+from rate_limit import DEFAULT_REQUEST_DELAY
+from log_broadcast import LogBroadcaster
+from job_logs import JobLogBuffer
+from metrics import MetricsRegistry
+from scheduler import JobScheduler, QueueFullError, SharedSlotBudget, browser_slot_budget
+from adaptive import job_browser_demand
+from job_store import JobStore, TERMINAL_STATUSES
+from results import ResultsFile
+from exports import EXPORT_FORMATS, ExportUnavailable, export_results
+from config_store import ConfigStore, VERSION_KEY
+from retention import RetentionEngine, RetentionPolicy, thaw
+from shared_state import CommandListener, claim_single_worker, create_state_backend
+from push_channel import COMPACT_ROOM_SUFFIX, compact_log_frame, create_client_manager
+import re
+import zlib
+import hmac
+import functools
+import shlex
+
+try:
+    import brotli  # Optional: enables br response encoding
+except ImportError:
+    brotli = None
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize event loop
-loop = asyncio.new_event_loop()
-asyncio.set_event_loop(loop)
-
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -47,9 +65,63 @@ IS_AZURE = bool(AZURE_WEBSITE_HOSTNAME)
 # Adjust WebSocket configuration for Azure
 WS_PING_INTERVAL = int(os.environ.get('WS_PING_INTERVAL', 30))  # Increased from 25
 WS_PING_TIMEOUT = int(os.environ.get('WS_PING_TIMEOUT', 25))   # Increased from 20
-WS_CLOSE_TIMEOUT = int(os.environ.get('WS_CLOSE_TIMEOUT', 25)) # Increased from 20
-WS_HOST = os.environ.get('WS_HOST', '0.0.0.0')
-WS_PORT = int(os.environ.get('WS_PORT', PORT))
+SOCKETIO_CLIENT_QUEUE_MAX = int(os.environ.get('SOCKETIO_CLIENT_QUEUE_MAX', 256))  # Packets a client may have pending before its log frames are dropped
+SOCKETIO_LOG_PACKETS = os.environ.get('SOCKETIO_LOG_PACKETS', 'False').lower() == 'true'  # Log every Socket.IO packet (debugging only)
+
+# Scraper execution settings: 'subprocess' starts scrap.py per job, 'pool' reuses warm worker processes
+SCRAPER_EXECUTION_MODE = os.environ.get('SCRAPER_EXECUTION_MODE', 'subprocess').lower()
+SCRAPER_POOL_SIZE = int(os.environ.get('SCRAPER_POOL_SIZE', max(1, (os.cpu_count() or 2) // 2)))
+SCRAPER_POOL_WARM_BROWSER = os.environ.get('SCRAPER_POOL_WARM_BROWSER', 'True').lower() == 'true'
+SCRAPER_POOL_MAX_JOBS_PER_WORKER = int(os.environ.get('SCRAPER_POOL_MAX_JOBS_PER_WORKER', 50))
+# Command 'subprocess' mode runs per job, followed by --config <path> (load tests swap in a stub scraper)
+SCRAPER_COMMAND = shlex.split(os.environ.get('SCRAPER_COMMAND', 'python -u scrap.py'), posix=os.name != 'nt')
+
+# Worker nodes ('remote' execution mode) run `scrap.py --worker-server <url>` and lease jobs over HTTP
+SCRAPER_WORKER_TOKEN = os.environ.get('SCRAPER_WORKER_TOKEN')  # Shared secret nodes authenticate with; required in remote mode
+REMOTE_WORKER_TIMEOUT = float(os.environ.get('REMOTE_WORKER_TIMEOUT', 30))  # Seconds without a heartbeat before a node is dropped
+
+# Log streaming: lines are sent to clients in frames of up to N lines or T milliseconds per job
+LOG_BATCH_MAX_LINES = int(os.environ.get('LOG_BATCH_MAX_LINES', 50))
+LOG_BATCH_INTERVAL_MS = int(os.environ.get('LOG_BATCH_INTERVAL_MS', 250))
+LOG_ROOM_QUEUE_MAX = int(os.environ.get('LOG_ROOM_QUEUE_MAX', 2000))
+JOB_LOG_BUFFER_LINES = int(os.environ.get('JOB_LOG_BUFFER_LINES', 1000))  # Recent lines kept in memory per job
+JOB_LOG_PAGE_MAX = 1000  # Largest page /job-logs returns
+
+# Job scheduler: how many browsers may run at once on this host and how many jobs may wait
+SCRAPER_BROWSER_MEMORY_MB = int(os.environ.get('SCRAPER_BROWSER_MEMORY_MB', 500))
+SCRAPER_CPUS_PER_BROWSER = float(os.environ.get('SCRAPER_CPUS_PER_BROWSER', 1))
+SCRAPER_MAX_BROWSERS = int(os.environ.get('SCRAPER_MAX_BROWSERS', 0))  # 0 derives the budget from CPU and memory
+SCHEDULER_MAX_QUEUED = int(os.environ.get('SCHEDULER_MAX_QUEUED', 100))
+SCHEDULER_MAX_PRIORITY = 9
+
+# Persistent job registry
+JOB_DB_PATH = os.environ.get('JOB_DB_PATH', os.path.join('data', 'jobs.sqlite'))
+LIST_JOBS_PAGE_DEFAULT = 50
+LIST_JOBS_PAGE_MAX = 500
+RESULTS_PAGE_DEFAULT = 100
+RESULTS_PAGE_MAX = 10000
+
+# Retention of finished jobs' output/ directories; 0 disables a limit, and the deleting limits are off by default
+RETENTION_MAX_AGE_DAYS = float(os.environ.get('RETENTION_MAX_AGE_DAYS', 0))
+RETENTION_MAX_TOTAL_MB = float(os.environ.get('RETENTION_MAX_TOTAL_MB', 0))
+RETENTION_MAX_USER_MB = float(os.environ.get('RETENTION_MAX_USER_MB', 0))
+RETENTION_COMPACT_AFTER_HOURS = float(os.environ.get('RETENTION_COMPACT_AFTER_HOURS', 24))
+RETENTION_COMPRESSION = os.environ.get('RETENTION_COMPRESSION', 'gzip').lower()  # gzip or zstd (needs zstandard)
+RETENTION_TEMP_MAX_AGE_HOURS = float(os.environ.get('RETENTION_TEMP_MAX_AGE_HOURS', 24))
+RETENTION_SWEEP_INTERVAL = int(os.environ.get('RETENTION_SWEEP_INTERVAL', 3600))
+
+# Token buckets shared by all scraper processes so jobs on the same site share one request rate
+RATE_LIMIT_DB = os.environ.get('RATE_LIMIT_DB', os.path.join('data', 'rate_limits.sqlite'))
+
+# Per-user response archives for configs that set response_cache, kept apart from output/ so retention doesn't prune them
+RESPONSE_CACHE_DIR = os.environ.get('RESPONSE_CACHE_DIR', os.path.join('data', 'response_cache'))
+
+# State shared between API workers: 'memory' (single worker), 'sqlite' (workers on one node) or 'redis' (several nodes)
+SHARED_STATE_BACKEND = os.environ.get('SHARED_STATE_BACKEND', 'memory')
+SHARED_STATE_URL = os.environ.get('SHARED_STATE_URL')  # SQLite path or redis:// URL
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')  # e.g. redis://host:6379/1; unset for a single worker
+SERVER_NODE_ID = os.environ.get('SERVER_NODE_ID', f"{socket.gethostname()}-{os.getpid()}")
+CLIENT_COUNT_CACHE_SECONDS = 1.0  # How long a user's shared client count is reused by send_log_to_clients
 
 # Add WebSocket connection retry settings
 WS_RECONNECT_ATTEMPTS = 10
@@ -78,49 +150,20 @@ def find_available_port(start_port):
         except OSError:
             port += 1
 
-async def websocket_handler(websocket):
-    user_id = None
-    client_info = "unknown"
-    try:
-        client_info = f"{websocket.remote_address[0]}:{websocket.remote_address[1]}"
-        logger.info(f"New WebSocket client connected from {client_info}")
-        
-        # Wait for initial message with user ID
-        message = await websocket.recv()
-        data = json.loads(message)
-        
-        if data.get("type") == "init":
-            user_id = data.get("user_id")
-            if user_id:
-                logger.info(f"✅ WEBSOCKET CLIENT REGISTERED - User ID: {user_id}")
-                connected_clients[websocket] = user_id
-                await websocket.send(json.dumps({
-                    "type": "connection",
-                    "status": "connected",
-                    "user_id": user_id,
-                    "message": "Connected successfully"
-                }))
-    except Exception as e:
-        logger.error(f"WebSocket handler error: {e}")
-    finally:
-        if websocket in connected_clients:
-            del connected_clients[websocket]
-
 app = Flask(__name__)
 
 # Initialize SocketIO with Azure-specific settings
 logger.info("Initializing Socket.IO with configuration:")
 logger.info(f"Ping Interval: {WS_PING_INTERVAL}")
 logger.info(f"Ping Timeout: {WS_PING_TIMEOUT}")
-logger.info(f"Close Timeout: {WS_CLOSE_TIMEOUT}")
 
 socketio = SocketIO(
     app,
     cors_allowed_origins=ALLOWED_ORIGINS,
     ping_interval=WS_PING_INTERVAL,
     ping_timeout=WS_PING_TIMEOUT,
-    logger=True,
-    engineio_logger=True,
+    logger=SOCKETIO_LOG_PACKETS,
+    engineio_logger=SOCKETIO_LOG_PACKETS,
     transports=['polling', 'websocket'],
     async_mode='threading',
     max_http_buffer_size=1e8,
@@ -138,8 +181,12 @@ socketio = SocketIO(
     websocket_ping_interval=WS_PING_INTERVAL,
     websocket_ping_timeout=WS_PING_TIMEOUT,
     websocket_max_message_size=10485760,
-    websocket_compression=True,
-    websocket_per_message_deflate=True
+    # Polling responses are compressed; the websocket transport negotiates permessage-deflate
+    http_compression=True,
+    compression_threshold=1024,
+    # Log frames are dropped for clients that fall behind; with a message queue, emits
+    # from any worker reach clients connected to every other worker
+    client_manager=create_client_manager(SOCKETIO_MESSAGE_QUEUE, SOCKETIO_CLIENT_QUEUE_MAX, droppable_events=('log', 'logc'))
 )
 
 # Add error handlers for SocketIO
@@ -153,6 +200,53 @@ def default_error_handler(e):
 
 logger.info("Socket.IO initialized successfully")
 
+def user_room(user_id, compact=False):
+    """Socket.IO room of a user's clients; clients that asked for compact frames have their own"""
+    return f"user_{user_id}{COMPACT_ROOM_SUFFIX if compact else ''}"
+
+def emit_log_frame(room, payload):
+    socketio.emit('log', payload, to=room, namespace='/')
+    socketio.emit('logc', compact_log_frame(payload), to=room + COMPACT_ROOM_SUFFIX, namespace='/')
+
+# Batch job log lines into per-room frames instead of emitting one message per line
+log_broadcaster = LogBroadcaster(
+    emit_log_frame,
+    max_batch_lines=LOG_BATCH_MAX_LINES,
+    max_batch_delay=LOG_BATCH_INTERVAL_MS / 1000,
+    max_queue_lines=LOG_ROOM_QUEUE_MAX
+)
+log_broadcaster.start()
+
+# Metrics exposed on /metrics in the Prometheus text format; scraper processes report theirs over stdout
+metrics_registry = MetricsRegistry()
+jobs_started_total = metrics_registry.counter('scraper_jobs_started_total', 'Scraper jobs started')
+jobs_finished_total = metrics_registry.counter('scraper_jobs_finished_total', 'Scraper jobs finished, by final status')
+log_lines_total = metrics_registry.counter('scraper_log_lines_total', 'Log lines received from scraper processes')
+metrics_registry.counter('scraper_pages_total', 'Listing pages scraped')
+metrics_registry.counter('scraper_items_total', 'Items extracted from listing pages')
+metrics_registry.counter('scraper_subpages_total', 'Subpages processed, by outcome')
+metrics_registry.counter('scraper_upload_failures_total', 'Failed result uploads, by target')
+metrics_registry.counter('scraper_subpage_retries_total', 'Subpage fetches retried after a failure')
+metrics_registry.counter('scraper_subpages_failed_total', 'Subpages given up on after every retry and the requeue pass')
+metrics_registry.counter('scraper_circuit_breaker_opened_total', 'Times a domain circuit breaker paused subpage requests')
+metrics_registry.histogram('scraper_page_seconds', 'Time to extract one listing page')
+metrics_registry.histogram('scraper_subpage_seconds', 'Time to load and extract one subpage')
+metrics_registry.histogram('scraper_webdriver_request_seconds', 'WebDriver round-trip time, by command')
+metrics_registry.histogram('scraper_rate_limit_wait_seconds', 'Time requests waited for their domain rate limit')
+metrics_registry.counter('scraper_log_frames_total', 'Log frames emitted to Socket.IO clients', func=lambda: log_broadcaster.frames_sent)
+metrics_registry.counter('scraper_log_lines_dropped_total', 'Log lines dropped because clients fell behind', func=lambda: log_broadcaster.lines_dropped)
+metrics_registry.counter('scraper_push_frames_dropped_total', 'Log frames skipped for clients whose send queue was full', func=lambda: socketio.server.manager.frames_dropped)
+metrics_registry.gauge('scraper_active_jobs', 'Jobs currently running', func=lambda: count_jobs_with_status('running'))
+metrics_registry.gauge('scraper_queued_jobs', 'Jobs accepted but not started yet', func=lambda: job_scheduler.queued_count())
+metrics_registry.gauge('scraper_browser_slots', 'Browser slots the scheduler may fill', func=lambda: job_scheduler.slots)
+metrics_registry.gauge('scraper_browser_slots_used', 'Browser slots granted to running jobs', func=lambda: job_scheduler.slots_used)
+metrics_registry.counter('scraper_jobs_rejected_total', 'Jobs turned away because the scheduler queue was full', func=lambda: job_scheduler.rejected)
+metrics_registry.gauge('scraper_worker_node_capacity', 'Browser slots offered by registered worker nodes', func=lambda: remote_workers.capacity if remote_workers else 0)
+metrics_registry.counter('scraper_retention_jobs_evicted_total', 'Job output directories deleted by the retention policy', func=lambda: retention_engine.jobs_evicted)
+metrics_registry.counter('scraper_retention_bytes_evicted_total', 'Bytes freed by evicting job outputs', func=lambda: retention_engine.bytes_evicted)
+metrics_registry.counter('scraper_retention_jobs_compacted_total', 'Job outputs compressed after going cold', func=lambda: retention_engine.jobs_compacted)
+metrics_registry.gauge('scraper_active_browsers', 'Browser sessions held by running jobs or warm pool workers', func=lambda: count_active_browsers())
+
 # Configure CORS with Azure-specific settings
 CORS(app, resources={
     r"/*": {
@@ -161,7 +255,7 @@ CORS(app, resources={
         "allow_headers": ["Content-Type", "X-User-Id", "Authorization", "Access-Control-Allow-Origin", "Access-Control-Allow-Headers", "Access-Control-Allow-Methods"],
         "supports_credentials": True,
         "max_age": 3600,
-        "expose_headers": ["Content-Type", "X-User-Id", "Authorization", "Access-Control-Allow-Origin"],
+        "expose_headers": ["Content-Type", "X-User-Id", "Authorization", "Access-Control-Allow-Origin", "X-Next-Cursor"],
         "send_wildcard": False,
         "automatic_options": True
     }
@@ -172,10 +266,21 @@ CORS(app, resources={
 def after_request(response):
     return response
 
-# Store WebSocket clients with user-specific rooms
-connected_clients = {}  # Maps client_id to user_id
-user_rooms = {}  # Maps user_id to set of client_ids
-active_connections = {}  # Maps user_id to active WebSocket connections
+# Socket.IO clients, job ownership and cross-worker commands, shared by every API worker
+state_backend = create_state_backend(SHARED_STATE_BACKEND, SHARED_STATE_URL)
+# Entries a previous process with the same node id left behind are stale
+state_backend.clear_node(SERVER_NODE_ID)
+client_counts = {}  # Maps user_id to (checked_at, count)
+
+def user_has_clients(user_id):
+    """Whether any worker has a Socket.IO client of the user, cached briefly per user"""
+    now = time.monotonic()
+    cached = client_counts.get(user_id)
+    if cached and now - cached[0] < CLIENT_COUNT_CACHE_SECONDS:
+        return cached[1] > 0
+    count = state_backend.client_count(user_id)
+    client_counts[user_id] = (now, count)
+    return count > 0
 
 # Add request logging middleware
 @app.before_request
@@ -222,26 +327,237 @@ def init_data_directories():
 # Initialize directories when server starts
 init_data_directories()
 
+# In-process state only works for one worker, so a second one sharing the job store is refused.
+# The debug reloader's parent only watches files; its child serves and takes the lock.
+single_worker_lock = None
+reloader_parent = DEBUG and __name__ == '__main__' and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'
+if not state_backend.shared_between_processes() and not reloader_parent:
+    single_worker_lock = claim_single_worker(JOB_DB_PATH + '.worker.lock')
+
+# Every job's state and history; active_jobs below only holds live handles of unfinished jobs
+job_store = JobStore(JOB_DB_PATH)
+# Jobs owned by another live API worker are still running there
+interrupted_jobs = job_store.mark_interrupted(keep=lambda job_id: state_backend.job_owner(job_id) not in (None, SERVER_NODE_ID))
+if interrupted_jobs:
+    logger.warning(f"Marked {interrupted_jobs} jobs left unfinished by a previous server run as interrupted")
+
+def read_legacy_job_info(job_dir):
+    """Start time and user of a job from before the job store, parsed from its scraper.log"""
+    log_file = os.path.join(job_dir, 'scraper.log')
+    if os.path.exists(log_file):
+        with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if "Job started for user" in line:
+                    try:
+                        # Split by first occurrence of " - INFO - "
+                        timestamp_part, rest = line.split(" - INFO - ", 1)
+                        start_time = datetime.strptime(timestamp_part.strip(), '%Y-%m-%d %H:%M:%S,%f')
+                        user_id = rest.split("Job started for user ")[1].split(" ")[0]
+                        return start_time, user_id
+                    except (ValueError, IndexError) as e:
+                        logger.error(f"Error parsing timestamp from log: {e}")
+                    break
+    return datetime.fromtimestamp(os.path.getmtime(job_dir)), "unknown"
+
+def backfill_job_store():
+    """Add output directories of jobs run before the job store existed; runs once per store"""
+    if job_store.get_meta('legacy_backfill') or not os.path.exists('output'):
+        return
+    added = 0
+    for job_id in os.listdir('output'):
+        job_dir = os.path.join('output', job_id)
+        if not os.path.isdir(job_dir) or job_store.get(job_id):
+            continue
+        try:
+            start_time, user_id = read_legacy_job_info(job_dir)
+        except OSError as e:
+            logger.error(f"Could not read legacy job {job_id}: {str(e)}")
+            continue
+        job_store.create(
+            job_id, user_id, "completed", start_time,
+            completed_at=start_time,
+            output_dir=job_dir,
+            output_json=os.path.join(job_dir, 'scraped_data.json'),
+            log_file=os.path.join(job_dir, 'scraper.log')
+        )
+        added += 1
+    job_store.set_meta('legacy_backfill', datetime.now().isoformat())
+    if added:
+        logger.info(f"Added {added} legacy jobs from the output directory to the job store")
+
+backfill_job_store()
+
+# Parsed user configs, cached by file mtime and written atomically
+config_store = ConfigStore(os.path.join('data', 'user_configs'))
+
 # Job management
 class ScraperJob:
-    def __init__(self, job_id, user_id):
+    def __init__(self, job_id, user_id, priority=0):
         self.job_id = job_id
         self.user_id = user_id
         self.process = None
-        self.log_queue = queue.Queue()
-        self.status = "pending"
+        self._status = "queued"
+        self.priority = priority
         self.start_time = datetime.now()
-        self.completion_time = None  # Add completion time tracking
+        self._completion_time = None  # Add completion time tracking
+        self.item_count = None
         self.output_dir = f"output/{job_id}"
         self.should_stop = False  # Flag to indicate if the scraper should be stopped
+        self.browser_slots = None  # Granted by the scheduler when the job starts
+        self.stopping = False  # Set when stop_job owns the job's final state and release
+        self._ending = False
+        self._end_lock = threading.Lock()
         os.makedirs(self.output_dir, exist_ok=True)
+        self.log_buffer = JobLogBuffer(self.output_dir, capacity=JOB_LOG_BUFFER_LINES)
+        job_store.create(
+            job_id, user_id, self._status, self.start_time,
+            priority=priority,
+            output_dir=self.output_dir,
+            output_json=os.path.join(self.output_dir, 'scraped_data.json'),
+            log_file=os.path.join(self.output_dir, 'scraper.log')
+        )
+        # Lets other API workers route stop requests for this job here
+        state_backend.set_job_owner(job_id, SERVER_NODE_ID)
         logger.info(f"Created new job {job_id} for user {user_id}")
 
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, status):
+        # Status changes are written through to the job store
+        self._status = status
+        fields = {'status': status}
+        if status == "running":
+            fields['started_at'] = datetime.now()
+        elif status in TERMINAL_STATUSES:
+            if not self._completion_time:
+                self._completion_time = datetime.now()
+            fields['completed_at'] = self._completion_time
+            fields['item_count'] = self.item_count
+            state_backend.clear_job_owner(self.job_id)
+        job_store.update(self.job_id, **fields)
+
+    def claim_end(self, stopping=False):
+        """Let exactly one of the job's runner and stop_job send its final state and release it"""
+        with self._end_lock:
+            if self._ending:
+                return False
+            self._ending = True
+            self.stopping = stopping
+            return True
+
+    def spawn_process(self, spawn):
+        """Start the job's process with spawn() unless stop_job already took the job; returns it or None"""
+        with self._end_lock:
+            if self.stopping:
+                return None
+            self.process = spawn()
+            return self.process
+
+    @property
+    def completion_time(self):
+        return self._completion_time
+
+    @completion_time.setter
+    def completion_time(self, completion_time):
+        self._completion_time = completion_time
+        job_store.update(self.job_id, completed_at=completion_time)
+
 # Store active scraping jobs and connected clients with their user IDs
 active_jobs = {}
 
+# Compacts and evicts finished jobs' outputs; swept after every job and periodically, by one API worker at a time
+retention_engine = RetentionEngine(
+    job_store,
+    RetentionPolicy(
+        max_age_days=RETENTION_MAX_AGE_DAYS,
+        max_total_mb=RETENTION_MAX_TOTAL_MB,
+        max_user_mb=RETENTION_MAX_USER_MB,
+        compact_after_hours=RETENTION_COMPACT_AFTER_HOURS,
+        compression=RETENTION_COMPRESSION,
+        temp_max_age_hours=RETENTION_TEMP_MAX_AGE_HOURS
+    ),
+    interval=RETENTION_SWEEP_INTERVAL,
+    lock_path=JOB_DB_PATH + '.retention.lock'
+)
+retention_engine.start()
+retention_engine.request_sweep()
+
+def finish_job(job):
+    """Release a finished job's live handles as soon as it ends; its record stays in the job store"""
+    if job.process and job.process.poll() is None:
+        try:
+            job.process.terminate()
+            job.process.wait(timeout=5)
+        except Exception:
+            job.process.kill()
+    job.process = None
+    # Persist the log journal index so finished jobs can still be paged through
+    job.log_buffer.close()
+    active_jobs.pop(job.job_id, None)
+    retention_engine.request_sweep()
+
+# Pre-started scraper workers, only used in 'pool' execution mode
+worker_pool = None
+if SCRAPER_EXECUTION_MODE == 'pool':
+    worker_pool = ScraperWorkerPool(
+        SCRAPER_POOL_SIZE,
+        warm_browser=SCRAPER_POOL_WARM_BROWSER,
+        max_jobs_per_worker=SCRAPER_POOL_MAX_JOBS_PER_WORKER
+    )
+    worker_pool.start()
+
+# Scraper nodes on other machines, only used in 'remote' execution mode
+remote_workers = None
+if SCRAPER_EXECUTION_MODE == 'remote':
+    # Behind a reverse proxy every request looks local, so nodes are only trusted by their token
+    if not SCRAPER_WORKER_TOKEN:
+        raise RuntimeError("SCRAPER_EXECUTION_MODE=remote needs SCRAPER_WORKER_TOKEN, the secret worker nodes authenticate with")
+    # Browser slots are whatever the registered nodes offer
+    remote_workers = RemoteWorkerRegistry(REMOTE_WORKER_TIMEOUT, on_capacity_change=lambda capacity: job_scheduler.set_slots(capacity))
+    remote_workers.start()
+
+def init_job_scheduler():
+    slots = SCRAPER_MAX_BROWSERS or browser_slot_budget(SCRAPER_BROWSER_MEMORY_MB, SCRAPER_CPUS_PER_BROWSER)
+    max_jobs = None
+    if worker_pool:
+        # Pool workers each run one job at a time, so more jobs would only wait inside the pool
+        max_jobs = worker_pool.size
+    shared = None
+    if remote_workers:
+        # Nodes run the browsers, and their capacity counts jobs
+        slots = remote_workers.capacity
+    elif state_backend.shared_between_processes():
+        # API workers on one host lease their jobs' browsers from one budget
+        shared = SharedSlotBudget(state_backend, SERVER_NODE_ID, socket.gethostname(), slots).start()
+    scheduler = JobScheduler(lambda job: run_scraper_process(job), slots, max_queued=SCHEDULER_MAX_QUEUED,
+                             max_jobs=max_jobs, shared=shared)
+    scheduler.start()
+    return scheduler
+
+# Every job goes through the scheduler, which starts it once a browser slot is free
+job_scheduler = init_job_scheduler()
+
+def count_jobs_with_status(status):
+    return job_store.count(status)
+
+def count_active_browsers():
+    running = count_jobs_with_status('running')
+    if worker_pool and worker_pool.warm_browser:
+        # Warm workers keep a browser open even while idle
+        return max(running, worker_pool.size)
+    return running
+
 def signal_handler(sig, frame):
     print("Shutting down gracefully...")
+    try:
+        state_backend.clear_node(SERVER_NODE_ID)
+    except Exception:
+        pass
+    if worker_pool:
+        worker_pool.shutdown()
     # Force stop all active jobs immediately
     for job in active_jobs.values():
         if job.process:
@@ -289,6 +605,11 @@ def handle_connect():
     if not user_id and hasattr(request, 'auth') and request.auth and 'X-User-Id' in request.auth:
         user_id = request.auth['X-User-Id']
         logger.info(f"Got user ID from auth parameter: {user_id}")
+    
+    # Clients may ask for compact log frames ('logc' events) instead of verbose 'log' events
+    encoding = request.args.get('encoding')
+    if not encoding and hasattr(request, 'auth') and request.auth:
+        encoding = request.auth.get('encoding')
         
     logger.info(f"⚡ New client connection attempt - SID: {client_id}")
     
@@ -297,21 +618,14 @@ def handle_connect():
         return False  # Reject connection without user ID
     
     try:
-        # Store the client ID with user ID
-        connected_clients[client_id] = user_id
-        
-        # Initialize or update user room
-        if user_id not in user_rooms:
-            user_rooms[user_id] = set()
-        user_rooms[user_id].add(client_id)
-        
-        # Add to active connections
-        active_connections[user_id] = request.namespace
+        # Register the client with the user's room in the shared state
+        state_backend.add_client(client_id, user_id, SERVER_NODE_ID)
+        client_counts.pop(user_id, None)
         
         logger.info(f"✅ Client connected successfully - User: {user_id} - SID: {client_id}")
         
         # Join user-specific room
-        join_room(f"user_{user_id}")
+        join_room(user_room(user_id, compact=encoding == 'compact'))
         
         # Send connection confirmation
         emit('connection', {
@@ -319,6 +633,7 @@ def handle_connect():
             'status': 'connected',
             'message': 'Connected successfully',
             'user_id': user_id,
+            'encoding': 'compact' if encoding == 'compact' else 'verbose',
             'timestamp': datetime.now().isoformat()
         }, room=client_id)
         
@@ -328,32 +643,21 @@ def handle_connect():
         return False
 
 @socketio.on('disconnect')
-def handle_disconnect():
+def handle_disconnect(reason=None):
     client_id = request.sid
     try:
-        # Get user ID associated with this client
-        user_id = connected_clients.get(client_id)
-        
-        # Remove this client from connected clients
-        if client_id in connected_clients:
-            del connected_clients[client_id]
+        # Remove this client and find out whether its user still has others on any worker
+        user_id, remaining = state_backend.remove_client(client_id)
+        if user_id:
+            client_counts.pop(user_id, None)
         
-        # Remove from user's room if applicable
-        if user_id and user_id in user_rooms:
-            if client_id in user_rooms[user_id]:
-                user_rooms[user_id].remove(client_id)
-            
-            # If user has no more connected clients, clean up user room
-            if not user_rooms[user_id]:
-                del user_rooms[user_id]
-                if user_id in active_connections:
-                    del active_connections[user_id]
+        # If user has no more connected clients, drop their pending log lines
+        if user_id and not remaining:
+            log_broadcaster.discard(user_room(user_id))
+            log_broadcaster.discard(user_room(user_id, compact=True))
         
+        # Socket.IO removes the client from its rooms itself
         logger.info(f"Client disconnected - SID: {client_id}, User: {user_id or 'unknown'}")
-        
-        # Leave user room
-        if user_id:
-            leave_room(f"user_{user_id}")
             
     except Exception as e:
         logger.error(f"Error in disconnect handler: {str(e)}")
@@ -372,19 +676,12 @@ def handle_init(data):
         return
     
     try:
-        # Update connected clients mapping
-        connected_clients[client_id] = user_id
-        
-        # Initialize or update user room
-        if user_id not in user_rooms:
-            user_rooms[user_id] = set()
-        user_rooms[user_id].add(client_id)
-        
-        # Add to active connections
-        active_connections[user_id] = request.namespace
+        # Update the client's user in the shared state
+        state_backend.add_client(client_id, user_id, SERVER_NODE_ID)
+        client_counts.pop(user_id, None)
         
         # Join user-specific room
-        join_room(f"user_{user_id}")
+        join_room(user_room(user_id, compact=data.get('encoding') == 'compact'))
         
         logger.info(f"✅ Client initialized - User: {user_id} - SID: {client_id}")
         
@@ -394,63 +691,51 @@ def handle_init(data):
             'status': 'initialized',
             'message': 'Connection initialized successfully',
             'user_id': user_id,
+            'encoding': 'compact' if data.get('encoding') == 'compact' else 'verbose',
             'timestamp': datetime.now().isoformat()
         }, room=client_id)
     except Exception as e:
         logger.error(f"❌ Error in init handler: {str(e)}")
 
 def send_log_to_clients(job_id: str, message: str):
-    """Send a log message to all connected clients for a specific job"""
+    """Queue a log message for all connected clients of a specific job"""
     if not job_id:
         logger.warning("Attempt to send log with no job_id")
         return
         
     try:
+        # Filter log messages if needed
+        if should_filter_log_message(message):
+            return
+            
         job = active_jobs.get(job_id)
         if not job:
             logger.warning(f"Cannot send log for unknown job {job_id}")
             return
             
+        # Keep every line for /job-logs, even when nobody is connected right now
+        seq = job.log_buffer.append(message)
+        
         user_id = job.user_id
         if not user_id:
             logger.warning(f"Job {job_id} has no associated user_id")
             return
             
-        # Check if user has active connections
-        if user_id not in user_rooms or not user_rooms[user_id]:
-            logger.info(f"No active clients for user {user_id}, skipping log message")
-            return
-            
-        log_msg = {
-            'type': 'log',
-            'job_id': job_id,
-            'message': message,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        # Filter log messages if needed
-        if should_filter_log_message(message):
+        # Check if user has active connections on any worker
+        if not user_has_clients(user_id):
+            logger.debug(f"No active clients for user {user_id}, skipping log message")
             return
             
-        # Send to room instead of individual clients to avoid connection issues
-        try:
-            room_name = f"user_{user_id}"
-            socketio.emit('log', log_msg, room=room_name, namespace='/')
-            logger.debug(f"Log sent to room {room_name}: {message[:50]}...")
-        except Exception as e:
-            # Just log the error but don't crash
-            logger.error(f"Failed to send log to room {room_name}: {str(e)}")
+        # Send to room instead of individual clients; the broadcaster batches lines into frames
+        log_broadcaster.publish(user_room(user_id), job_id, message, seq)
     except Exception as e:
         logger.error(f"Error sending log message: {str(e)}")
 
 def send_state_update(job_id, status):
     """Send a state update to all connected clients for the specific user."""
     try:
-        user_id = None
-        for job in active_jobs.values():
-            if job.job_id == job_id:
-                user_id = job.user_id
-                break
+        job = active_jobs.get(job_id)
+        user_id = job.user_id if job else None
         
         if not user_id:
             logger.error(f"No user ID found for job {job_id}")
@@ -464,10 +749,11 @@ def send_state_update(job_id, status):
             'timestamp': datetime.now().isoformat()
         }
         
-        # Send only to clients in the user's room
-        if user_id in user_rooms:
-            for client_id in user_rooms[user_id]:
-                socketio.emit('state', data, room=client_id)
+        # Deliver the job's pending log lines before its new state
+        log_broadcaster.flush(user_room(user_id))
+        
+        # Send only to clients in the user's rooms, wherever they are connected
+        socketio.emit('state', data, to=[user_room(user_id), user_room(user_id, compact=True)])
     except Exception as e:
         logger.error(f"Error sending state update to clients: {str(e)}")
 
@@ -501,13 +787,13 @@ def get_base_config():
         }
     }
 
-def get_user_config_path(user_id):
-    """Get the path to a user's configuration file"""
-    return os.path.join('data', 'user_configs', f'config_{user_id}.json')
-
 def create_default_config(user_id):
-    """Create a default configuration for a new user"""
-    default_config = {
+    """Return the user's configuration, creating the default one for a new user"""
+    return config_store.get_or_create(user_id, default_user_config)
+
+def default_user_config():
+    """Default configuration written for a new user"""
+    return {
         "base_url": "",
         "container_selector": "",
         "fields": {},
@@ -534,16 +820,6 @@ def create_default_config(user_id):
             "job_spacing_delay": 3
         }
     }
-    
-    # Ensure user configs directory exists
-    os.makedirs(os.path.join('data', 'user_configs'), exist_ok=True)
-    
-    # Save the default config
-    config_path = get_user_config_path(user_id)
-    with open(config_path, 'w', encoding='utf-8') as f:
-        json.dump(default_config, f, indent=4)
-    
-    return default_config
 
 @app.route('/ping', methods=['GET'])
 def ping():
@@ -569,15 +845,6 @@ def ping():
 def welcome():
     return jsonify({"message": "Welcome to the Web Scraper API! hari"})
 
-@app.route('/ws')
-def handle_websocket():
-    if request.environ.get('wsgi.websocket'):
-        ws = request.environ['wsgi.websocket']
-        while True:
-            message = ws.receive()
-            ws.send(message)
-    return ''
-
 @app.route('/run-scraper', methods=['POST'])
 def run_scraper():
     try:
@@ -591,52 +858,86 @@ def run_scraper():
         
         print(f"User ID from request: {user_id}")
         
-        # Get user config path
-        user_config_path = get_user_config_path(user_id)
-        
-        # Check if config exists
-        if not os.path.exists(user_config_path):
-            # Create default config if it doesn't exist
-            create_default_config(user_id)
+        # Load user's configuration, creating the default one if it doesn't exist
+        user_config = create_default_config(user_id)
         
-        # Load user's configuration
-        with open(user_config_path, 'r', encoding='utf-8') as f:
-            user_config = json.load(f)
-        
-        # Check concurrent job limits
+        # A user's jobs beyond their concurrent limit wait in the queue instead of being refused
         max_jobs = user_config.get("concurrent_settings", {}).get("max_concurrent_jobs", 3)
-        user_jobs = [job for job in active_jobs.values() if job.user_id == user_id]
+        try:
+            priority = min(SCHEDULER_MAX_PRIORITY, max(0, int(request.json.get('priority', 0))))
+        except (TypeError, ValueError):
+            return jsonify({
+                "status": "error",
+                "message": "priority must be an integer"
+            }), 400
         
-        if len(user_jobs) >= max_jobs:
+        if job_scheduler.queued_count() >= job_scheduler.max_queued:
             return jsonify({
                 "status": "error",
-                "message": f"Maximum number of concurrent jobs ({max_jobs}) reached for user {user_id}. Please wait for some jobs to complete."
+                "message": "The scraper queue is full. Please try again later."
             }), 429
         
         # Generate job ID
         job_id = str(uuid.uuid4())
         
         # Create new job
-        job = ScraperJob(job_id, user_id)
+        job = ScraperJob(job_id, user_id, priority)
         active_jobs[job_id] = job
         
-        # Start scraper in separate thread
-        threading.Thread(target=run_scraper_process, args=(job,)).start()
+        # Queue the job; the scheduler starts it when a browser slot is free and grants
+        # it up to one slot per browser it may use, subpage browsers included
+        browsers = 1 if remote_workers else job_browser_demand(user_config)
+        try:
+            position = job_scheduler.submit(job, priority=priority, user_limit=max_jobs, browsers=browsers)
+        except QueueFullError as e:
+            del active_jobs[job_id]
+            job.status = "stopped"
+            job.log_buffer.close()
+            return jsonify({"status": "error", "message": str(e)}), 429
         
+        send_state_update(job_id, "queued")
+        send_log_to_clients(job_id, f"Job queued at position {position}")
         print(f"Active jobs: {list(active_jobs.keys())}")
         
         return jsonify({
             "status": "success",
-            "message": "Scraper started successfully",
+            "message": "Scraper queued successfully",
             "job_id": job_id,
-            "user_id": user_id
+            "user_id": user_id,
+            "queue_position": position
         })
     except Exception as e:
         print(f"Error in run_scraper: {str(e)}")  # Add debug logging
         return jsonify({"status": "error", "message": str(e)}), 500
 
+# Final summary line of a successful scrap.py run
+ITEM_COUNT_PATTERN = re.compile(r"Scraping complete\. (\d+) items scraped")
+
+def handle_scraper_output(job, output):
+    """Relay one line of scraper output to the job's clients"""
+    # Strip whitespace and send log message using Socket.IO
+    stripped_output = output.strip()
+    if stripped_output:
+        # Metrics reports share the channel but are not shown to users
+        if metrics_registry.ingest_line(stripped_output):
+            return
+        log_lines_total.inc()
+        send_log_to_clients(job.job_id, stripped_output)
+        
+        item_count = ITEM_COUNT_PATTERN.search(stripped_output)
+        if item_count:
+            job.item_count = int(item_count.group(1))
+        
+        # Check if this is a completion message
+        if "Scraper completed successfully" in stripped_output:
+            job.should_stop = True
+            logger.info(f"Setting should_stop flag for job {job.job_id}")
+
 def run_scraper_process(job):
     try:
+        # Stopped right after admission: stop_job sends the final state and releases the job
+        if job.stopping:
+            return
         # Create unique config for this job
         job_config = create_job_config(job)
         
@@ -649,44 +950,51 @@ def run_scraper_process(job):
         
         # Update job status
         job.status = "running"
+        jobs_started_total.inc()
         
-        # Start the scraper process with unbuffered output and explicit encoding
-        process = subprocess.Popen(
-            ['python', '-u', 'scrap.py', '--config', job_config],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            encoding='utf-8',
-            errors='replace',  # Replace invalid characters instead of failing
-            bufsize=1
-        )
-        
-        job.process = process
-        
-        # Monitor the process output
-        while True:
-            try:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    # Strip whitespace and send log message using Socket.IO
-                    stripped_output = output.strip()
-                    if stripped_output:
-                        send_log_to_clients(job.job_id, stripped_output)
-                        
-                        # Check if this is a completion message
-                        if "Scraper completed successfully" in stripped_output:
-                            job.should_stop = True
-                            logger.info(f"Setting should_stop flag for job {job.job_id}")
-            except UnicodeDecodeError as e:
-                # Handle any remaining encoding issues
-                logger.error(f"Unicode decode error: {str(e)}")
-                # Continue processing
-                continue
+        # Stopped between admission and here: stop_job sends the final state and releases the job
+        if job.stopping:
+            return
+        if worker_pool:
+            # Hand the job to a warm worker and relay its log lines as they arrive
+            return_code = worker_pool.run_job(job.job_id, job_config, lambda output: handle_scraper_output(job, output))
+        elif remote_workers:
+            # Queue the job for a worker node, which streams its log lines back
+            return_code = remote_workers.run_job(job.job_id, job_config, lambda output: handle_scraper_output(job, output))
+        else:
+            # Start the scraper process with unbuffered output and explicit encoding
+            process = job.spawn_process(lambda: subprocess.Popen(
+                SCRAPER_COMMAND + ['--config', job_config],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                universal_newlines=True,
+                encoding='utf-8',
+                errors='replace',  # Replace invalid characters instead of failing
+                bufsize=1
+            ))
+            if process is None:
+                return
+            
+            # Monitor the process output
+            while True:
+                try:
+                    output = process.stdout.readline()
+                    if output == '' and process.poll() is not None:
+                        break
+                    if output:
+                        handle_scraper_output(job, output)
+                except UnicodeDecodeError as e:
+                    # Handle any remaining encoding issues
+                    logger.error(f"Unicode decode error: {str(e)}")
+                    # Continue processing
+                    continue
+            
+            # Get the return code
+            return_code = process.poll()
         
-        # Get the return code
-        return_code = process.poll()
+        # A job stopped by the user gets its final state from stop_job
+        if not job.claim_end():
+            return
         
         # Send final state based on return code
         if return_code == 0:
@@ -713,25 +1021,25 @@ def run_scraper_process(job):
 
             # Send one final state update to ensure UI is updated
             send_state_update(job.job_id, "completed")
+            jobs_finished_total.inc(status="completed")
         else:
             send_state_update(job.job_id, "failed")
             send_log_to_clients(job.job_id, f"Scraper failed with return code {return_code}")
             job.status = "failed"
+            jobs_finished_total.inc(status="failed")
     except Exception as e:
         logger.error(f"Error in scraper process: {str(e)}")
-        send_state_update(job.job_id, "error")
-        send_log_to_clients(job.job_id, f"Error in scraper process: {str(e)}")
-        job.status = "error"
+        # Report the error unless stop_job has taken over the job's final state
+        if job.claim_end() or not job.stopping:
+            send_state_update(job.job_id, "error")
+            send_log_to_clients(job.job_id, f"Error in scraper process: {str(e)}")
+            job.status = "error"
+            jobs_finished_total.inc(status="error")
     finally:
-        # Clean up the process if it's still running
-        if job.process and job.process.poll() is None:
-            try:
-                job.process.terminate()
-                job.process.wait(timeout=5)
-            except:
-                if job.process:
-                    job.process.kill()
-            job.process = None
+        # The job ended (its process exited or its worker reported back), so release it now,
+        # unless stop_job is still sending its final frames and releases it itself
+        if not job.stopping:
+            finish_job(job)
 
 @app.route('/get-config', methods=['GET'])
 def get_config():
@@ -739,12 +1047,10 @@ def get_config():
         # Get user ID from request
         user_id = request.headers.get('X-User-Id', 'anonymous')
         print(f"User ID: {user_id}")
-        user_config_path = get_user_config_path(user_id)
-
         # If user config exists, return it
-        if os.path.exists(user_config_path):
-            with open(user_config_path, 'r', encoding='utf-8') as f:
-                return jsonify(json.load(f))
+        user_config = config_store.get(user_id)
+        if user_config is not None:
+            return jsonify(user_config)
         
         # Otherwise return base config
         return jsonify(get_base_config())
@@ -787,9 +1093,6 @@ def update_config():
         logger.info(f"Updating configuration for user {user_id}")
         logger.info(f"Configuration data: {json.dumps(config_data, indent=2)}")
         
-        # Ensure user configs directory exists
-        os.makedirs(os.path.join('data', 'user_configs'), exist_ok=True)
-        
         # Add concurrent scraping settings if not present
         if "concurrent_settings" not in config_data:
             config_data["concurrent_settings"] = {
@@ -799,17 +1102,16 @@ def update_config():
                 "job_spacing_delay": 3
             }
         
-        # Save user-specific config
-        user_config_path = get_user_config_path(user_id)
-        with open(user_config_path, 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, ensure_ascii=False, indent=4)
+        # Save user-specific config; readers see either the old or the new file, never a partial one
+        version = config_store.put(user_id, config_data)
         
-        logger.info(f"Successfully updated configuration for user {user_id}")
+        logger.info(f"Successfully updated configuration for user {user_id} (version {version})")
         
         return jsonify({
             "status": "success",
             "message": "Configuration updated successfully",
-            "user_id": user_id
+            "user_id": user_id,
+            "config_version": version
         })
             
     except Exception as e:
@@ -824,11 +1126,9 @@ def create_job_config(job):
     """Create a job-specific config file"""
     try:
         # Get user-specific config or fall back to base config
-        user_config_path = get_user_config_path(job.user_id)
-        if os.path.exists(user_config_path):
-            with open(user_config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                logger.info(f"Using configuration for user {job.user_id}")
+        config = config_store.get(job.user_id)
+        if config is not None:
+            logger.info(f"Using configuration for user {job.user_id} (version {config.get(VERSION_KEY, 0)})")
         else:
             config = get_base_config()
             logger.info(f"No user configuration found for {job.user_id}, using base config")
@@ -843,12 +1143,29 @@ def create_job_config(job):
             "output_json": os.path.join(job.output_dir, 'scraped_data.json'),
             "output_excel": os.path.join(job.output_dir, 'scraped_data.xlsx'),
             "log_file": os.path.join(job.output_dir, 'scraper.log'),
-            "request_delay": config.get("concurrent_settings", {}).get("base_request_delay", 1) * (len(active_jobs) + 1),
+            "request_delay": config.get("concurrent_settings", {}).get("base_request_delay", DEFAULT_REQUEST_DELAY),
+            "rate_limit_db": os.path.abspath(RATE_LIMIT_DB),
             "max_concurrent_requests": config.get("concurrent_settings", {}).get("max_concurrent_requests", 2),
             "job_start_time": job.start_time.isoformat(),
+            # Browsers the scheduler granted, subpage browsers included; worker nodes budget their own
+            "browser_slots": None if remote_workers else job.browser_slots,
             "headless": True  # Force headless mode for concurrent jobs
         }
         
+        # A user's jobs record into and replay from one archive, so a recording outlives its job
+        response_cache = job_config.get("response_cache")
+        if response_cache:
+            if isinstance(response_cache, str):
+                response_cache = {"mode": response_cache}
+            response_cache = dict(response_cache)
+            # Each user's archive is fixed by the server; a dir from the request is ignored
+            response_cache["dir"] = os.path.abspath(os.path.join(RESPONSE_CACHE_DIR, re.sub(r'[^\w-]', '_', job.user_id)))
+            job_config["response_cache"] = response_cache
+
+        # Record which version of the user's config the job ran with
+        job_config[VERSION_KEY] = config.get(VERSION_KEY, 0)
+        job_store.update(job.job_id, config_version=job_config[VERSION_KEY])
+        
         # Save job-specific config
         job_config_path = os.path.join(job.output_dir, 'config.json')
         with open(job_config_path, 'w', encoding='utf-8') as f:
@@ -860,25 +1177,26 @@ def create_job_config(job):
         logger.error(f"Failed to create job config: {str(e)}")
         raise
 
-@app.route('/stop-scraper', methods=['POST'])
-def stop_scraper():
+def stop_job(job_id):
+    """Stop a job held by this worker, whether it is still queued or already running"""
+    job = active_jobs.get(job_id)
+    if job is None:
+        return
+    
+    # A job that hasn't started yet only has to leave the queue
+    if job_scheduler.cancel(job_id):
+        job.status = "stopped"
+        job.completion_time = datetime.now()
+        send_state_update(job_id, "stopped")
+        send_log_to_clients(job_id, "Queued scraper cancelled by user")
+        finish_job(job)
+        return
+    
+    # A job that is already finishing on its own keeps the state it ends with
+    if not job.claim_end(stopping=True):
+        return
+    
     try:
-        # Get job_id from request
-        job_id = request.json.get('job_id')
-        if not job_id:
-            return jsonify({
-                "status": "error", 
-                "message": "No job ID provided"
-            }), 400
-            
-        if job_id not in active_jobs:
-            return jsonify({
-                "status": "error", 
-                "message": f"Invalid job ID: {job_id}"
-            }), 404
-        
-        job = active_jobs[job_id]
-        
         # Set the should_stop flag to signal the scraper to stop gracefully
         job.should_stop = True
         
@@ -889,13 +1207,20 @@ def stop_scraper():
         # Wait for a short time to allow graceful shutdown
         time.sleep(2)
         
+        # Pool jobs run inside a shared worker, so stop that worker instead of a process of our own
+        if worker_pool and worker_pool.cancel(job_id):
+            send_log_to_clients(job_id, "Stopped scraper worker")
+        if remote_workers and remote_workers.cancel(job_id):
+            send_log_to_clients(job_id, "Asked the scraper node to stop")
+        
         # If process is still running, force terminate it
-        if job.process and job.process.poll() is None:
+        process = job.process
+        if process and process.poll() is None:
             try:
-                job.process.terminate()
-                job.process.wait(timeout=5)
+                process.terminate()
+                process.wait(timeout=5)
             except subprocess.TimeoutExpired:
-                job.process.kill()
+                process.kill()
                 send_log_to_clients(job_id, "Force killed scraper process")
             
             job.process = None
@@ -903,10 +1228,50 @@ def stop_scraper():
         # Update job status
         job.status = "stopped"
         job.completion_time = datetime.now()
+        jobs_finished_total.inc(status="stopped")
         
         # Send final state update
         send_state_update(job_id, "stopped")
         send_log_to_clients(job_id, "Scraper stopped by user")
+    finally:
+        # The runner left the job to us, so release it once its final frames are out
+        finish_job(job)
+
+def handle_worker_command(command):
+    """Run a command another API worker addressed to this one"""
+    if command.get('type') == 'stop' and command.get('job_id') in active_jobs:
+        logger.info(f"Stopping job {command['job_id']} on request of another worker")
+        stop_job(command['job_id'])
+
+# Commands from other API workers, such as stopping a job this worker runs
+CommandListener(state_backend, SERVER_NODE_ID, handle_worker_command).start()
+
+@app.route('/stop-scraper', methods=['POST'])
+def stop_scraper():
+    try:
+        # Get job_id from request
+        job_id = request.json.get('job_id')
+        if not job_id:
+            return jsonify({
+                "status": "error", 
+                "message": "No job ID provided"
+            }), 400
+            
+        if job_id not in active_jobs:
+            # The job may be running on another API worker; ask that worker to stop it
+            owner = state_backend.job_owner(job_id)
+            if owner and owner != SERVER_NODE_ID:
+                state_backend.send_command(owner, {'type': 'stop', 'job_id': job_id})
+                return jsonify({
+                    "status": "success",
+                    "message": "Stop requested from the worker running the scraper"
+                }), 202
+            return jsonify({
+                "status": "error", 
+                "message": f"Invalid job ID: {job_id}"
+            }), 404
+        
+        stop_job(job_id)
         
         return jsonify({
             "status": "success",
@@ -923,67 +1288,198 @@ def stop_scraper():
 @app.route('/job-status', methods=['GET'])
 def get_job_status():
     job_id = request.args.get('job_id')
-    if not job_id or job_id not in active_jobs:
+    job = job_store.get(job_id) if job_id else None
+    if not job:
         return jsonify({"status": "error", "message": "Invalid job ID"}), 404
     
-    job = active_jobs[job_id]
-    return jsonify({
-        "status": job.status,
-        "start_time": job.start_time.isoformat(),
-        "user_id": job.user_id
-    })
+    response = {
+        "status": job['status'],
+        "start_time": job['created_at'],
+        "started_at": job['started_at'],
+        "completed_at": job['completed_at'],
+        "user_id": job['user_id'],
+        "priority": job['priority'],
+        "item_count": job['item_count'],
+        "config_version": job['config_version'],
+        "evicted_at": job['evicted_at']
+    }
+    if job['status'] == "queued":
+        response["queue_position"] = job_scheduler.position(job_id)
+        response["queue_length"] = job_scheduler.queued_count()
+    return jsonify(response)
 
 @app.route('/job-logs', methods=['GET'])
 def get_job_logs():
+    """Return a job's log records after a cursor: /job-logs?job_id=&since=<seq>&limit="""
     job_id = request.args.get('job_id')
-    if not job_id or job_id not in active_jobs:
+    if not job_id:
         return jsonify({"status": "error", "message": "Invalid job ID"}), 404
     
-    job = active_jobs[job_id]
-    logs = []
-    while not job.log_queue.empty():
-        logs.append(job.log_queue.get())
+    try:
+        since = max(0, int(request.args.get('since', 0)))
+        limit = min(JOB_LOG_PAGE_MAX, max(1, int(request.args.get('limit', 100))))
+    except ValueError:
+        return jsonify({"status": "error", "message": "since and limit must be integers"}), 400
+    
+    job = active_jobs.get(job_id)
+    if job:
+        log_buffer = job.log_buffer
+    else:
+        # Finished jobs are served from their on-disk journal
+        output_dir = os.path.join('output', os.path.basename(job_id))
+        if not thaw(os.path.join(output_dir, 'job_log.jsonl')):
+            return jsonify({"status": "error", "message": "Invalid job ID"}), 404
+        log_buffer = JobLogBuffer(output_dir, capacity=0)
     
-    return jsonify({"logs": logs})
+    records = log_buffer.read(since, limit)
+    next_seq = records[-1]['seq'] if records else since
+    return jsonify({
+        "logs": [record['message'] for record in records],
+        "records": records,
+        "next": next_seq,
+        "last_seq": log_buffer.last_seq,
+        "has_more": next_seq < log_buffer.last_seq
+    })
 
 @app.route('/download-results', methods=['GET'])
 def download_results():
+    """Download a job's results as json, csv, ndjson, xlsx (alias excel) or parquet"""
     job_id = request.args.get('job_id')
-    file_type = request.args.get('type', 'json')  # 'json' or 'excel'
+    file_type = request.args.get('type', 'json').lower()
+    if file_type == 'excel':
+        file_type = 'xlsx'
     
-    if not job_id or job_id not in active_jobs:
+    job = job_store.get(job_id) if job_id else None
+    if not job:
         return jsonify({"status": "error", "message": "Invalid job ID"}), 404
+    if file_type not in EXPORT_FORMATS:
+        return jsonify({"status": "error", "message": f"Unsupported type: {file_type}. Use one of {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    json_file = get_results_path(job_id)
+    if not json_file:
+        return jsonify({"status": "error", "message": "Results file not found"}), 404
     
-    job = active_jobs[job_id]
+    extension, mimetype = EXPORT_FORMATS[file_type]
+    download_name = f"scraped_data_{job_id}.{extension}"
+    try:
+        kind, result = export_results(json_file, file_type)
+    except ExportUnavailable as e:
+        return jsonify({"status": "error", "message": str(e)}), 501
+    except Exception as e:
+        logger.error(f"Error converting results of job {job_id} to {file_type}: {str(e)}")
+        return jsonify({"status": "error", "message": f"Error converting results: {str(e)}"}), 500
     
-    if file_type == 'json':
-        file_path = os.path.join(job.output_dir, 'scraped_data.json')
+    if kind == 'file':
+        # Cached exports are sent straight from disk
+        return send_file(os.path.abspath(result), mimetype=mimetype, as_attachment=True,
+                         download_name=download_name, conditional=True)
+    
+    # First download of this format: send chunks as they are converted
+    response = Response(result, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+    return response
+
+def get_results_path(job_id):
+    """Path of a job's scraped_data.json, or None if the job has no results"""
+    job = job_store.get(job_id)
+    if job and job['output_json']:
+        json_file = job['output_json']
     else:
-        file_path = os.path.join(job.output_dir, 'scraped_data.xlsx')
+        json_file = os.path.join('output', os.path.basename(job_id), 'scraped_data.json')
+    # Cold results may have been compacted by the retention policy
+    return thaw(json_file)
+
+def choose_response_encoding():
+    """Best compression the client accepts: br (if brotli is installed), gzip, or None"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def encode_chunks(chunks, encoding):
+    """Compress a stream of byte chunks on the fly"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=5)
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+        return
+    yield from chunks
+
+@app.route('/results/<job_id>', methods=['GET'])
+def get_results_page(job_id):
+    """Stream one page of a job's result rows: /results/<job_id>?offset=&limit= (or cursor= instead of offset)"""
+    json_file = get_results_path(job_id)
+    if not json_file:
+        return jsonify({"status": "error", "message": f"No data found for job ID: {job_id}"}), 404
     
-    if not os.path.exists(file_path):
-        return jsonify({"status": "error", "message": "Results file not found"}), 404
+    try:
+        offset = max(0, int(request.args.get('cursor') or request.args.get('offset', 0)))
+        limit = min(RESULTS_PAGE_MAX, max(1, int(request.args.get('limit', RESULTS_PAGE_DEFAULT))))
+    except ValueError:
+        return jsonify({"status": "error", "message": "offset, cursor and limit must be integers"}), 400
     
-    return send_file(file_path, as_attachment=True)
+    try:
+        results_file = ResultsFile(json_file)
+        total = results_file.row_count
+        size, mtime_ns = results_file.stat()
+    except Exception as e:
+        logger.error(f"Error indexing results of job {job_id}: {str(e)}")
+        return jsonify({"status": "error", "message": f"Error retrieving data: {str(e)}"}), 500
+    
+    encoding = choose_response_encoding()
+    etag = f"{size:x}-{mtime_ns:x}-{offset}-{limit}" + (f"-{encoding}" if encoding else "")
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    
+    next_offset = offset + limit if offset + limit < total else None
+    header = json.dumps({
+        "job_id": job_id,
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "next_cursor": str(next_offset) if next_offset is not None else None
+    })[:-1].encode('utf-8')
+    
+    def generate():
+        yield header + b', "rows": ['
+        for number, row in enumerate(results_file.rows(offset, limit)):
+            yield (b',' if number else b'') + row
+        yield b']}'
+    
+    response = Response(encode_chunks(generate(), encoding), mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.set_etag(etag)
+    return response
 
 @app.route('/get-scraped-data/<job_id>', methods=['GET'])
 def get_scraped_data_by_id(job_id):
     try:
-        # Construct the path to the job's output directory
-        output_dir = os.path.join('output', job_id)
-        json_file = os.path.join(output_dir, 'scraped_data.json')
-        
-        # Check if the directory and file exist
-        if not os.path.exists(output_dir) or not os.path.exists(json_file):
+        json_file = get_results_path(job_id)
+        if not json_file:
             return jsonify({
                 "status": "error",
                 "message": f"No data found for job ID: {job_id}"
             }), 404
-            
-        # Read and return the JSON data
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return jsonify(data)
+        
+        # Send the file as is; conditional=True adds ETag/If-None-Match and Range support
+        return send_file(os.path.abspath(json_file), mimetype='application/json', conditional=True)
             
     except Exception as e:
         return jsonify({
@@ -999,7 +1495,7 @@ def get_excel_data_by_id(job_id):
         excel_file = os.path.join(output_dir, 'scraped_data.xlsx')
         
         # Check if the directory and file exist
-        if not os.path.exists(output_dir) or not os.path.exists(excel_file):
+        if not os.path.exists(output_dir) or not thaw(excel_file):
             return jsonify({
                 "status": "error",
                 "message": f"No Excel data found for job ID: {job_id}"
@@ -1015,56 +1511,52 @@ def get_excel_data_by_id(job_id):
 
 @app.route('/list-jobs', methods=['GET'])
 def list_jobs():
+    """The caller's jobs, newest first: /list-jobs?user_id=&status=&since=&until=&cursor=&limit=
+
+    Without limit or cursor the body lists every matching job, as it always has. With
+    either, it is one page, and the cursor of the next page is sent in the X-Next-Cursor header.
+    """
     try:
-        jobs = []
-        output_dir = 'output'
-        
-        # Check if output directory exists
-        if not os.path.exists(output_dir):
-            return jsonify([])
-            
-        # List all job directories
-        for job_id in os.listdir(output_dir):
-            job_dir = os.path.join(output_dir, job_id)
-            if os.path.isdir(job_dir):
-                # Try to get job status from log file
-                log_file = os.path.join(job_dir, 'scraper.log')
-                status = "completed"  # Default status
-                start_time = None
-                user_id = None
-                
-                if os.path.exists(log_file):
-                    with open(log_file, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            if "Job started for user" in line:
-                                # Extract timestamp and user ID
-                                try:
-                                    # Split by first occurrence of " - INFO - "
-                                    timestamp_part, rest = line.split(" - INFO - ", 1)
-                                    # Parse the timestamp
-                                    dt = datetime.strptime(timestamp_part.strip(), '%Y-%m-%d %H:%M:%S,%f')
-                                    start_time = dt.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'  # Convert to ISO format with milliseconds
-                                    # Extract user ID
-                                    user_id = rest.split("Job started for user ")[1].split(" ")[0]
-                                except (ValueError, IndexError) as e:
-                                    logger.error(f"Error parsing timestamp from log: {e}")
-                                    start_time = None
-                                break
-                
-                # Check if job is in active_jobs
-                if job_id in active_jobs:
-                    status = active_jobs[job_id].status
-                    start_time = active_jobs[job_id].start_time.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
-                    user_id = active_jobs[job_id].user_id
-                
-                jobs.append({
-                    "id": job_id,
-                    "status": status,
-                    "start_time": start_time,
-                    "user_id": user_id or "unknown"
-                })
+        user_id = request.args.get('user_id') or request.headers.get('X-User-Id')
+        if not user_id or user_id == 'anonymous':
+            return jsonify({"status": "error", "message": "user_id or an X-User-Id header is required"}), 400
+        statuses = [status for status in request.args.get('status', '').split(',') if status]
+        paged = 'limit' in request.args or 'cursor' in request.args
+        try:
+            limit = min(LIST_JOBS_PAGE_MAX, max(1, int(request.args.get('limit', LIST_JOBS_PAGE_DEFAULT))))
+        except ValueError:
+            return jsonify({"status": "error", "message": "limit must be an integer"}), 400
         
-        return jsonify(jobs)
+        rows = []
+        cursor = request.args.get('cursor')
+        try:
+            while True:
+                page, cursor = job_store.list(
+                    user_id=user_id,
+                    status=statuses,
+                    since=request.args.get('since'),
+                    until=request.args.get('until'),
+                    cursor=cursor,
+                    limit=limit if paged else LIST_JOBS_PAGE_MAX
+                )
+                rows.extend(page)
+                if paged or not cursor:
+                    break
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        
+        jobs = [{
+            "id": job['job_id'],
+            "status": job['status'],
+            "start_time": format_start_time(job['created_at']),
+            "completed_at": job['completed_at'],
+            "item_count": job['item_count'],
+            "user_id": job['user_id'] or "unknown"
+        } for job in rows]
+        response = jsonify(jobs)
+        if cursor:
+            response.headers['X-Next-Cursor'] = cursor
+        return response
             
     except Exception as e:
         logger.error(f"Error in list_jobs: {str(e)}")
@@ -1073,154 +1565,133 @@ def list_jobs():
             "message": f"Error listing jobs: {str(e)}"
         }), 500
 
-# Filter function to remove Chrome driver exception messages
-def should_filter_log_message(message):
-    """Check if a log message should be filtered out."""
-    if isinstance(message, str):
-        try:
-            # Try to parse as JSON
-            parsed = json.loads(message)
-            log_content = parsed.get("message", "")
-            
-            # Check for Chrome driver exception patterns
-            if "Exception ignored in: <function Chrome.__del__" in log_content or \
-               "OSError: [WinError 6] The handle is invalid" in log_content:
-                return True
-        except json.JSONDecodeError:
-            # Not valid JSON, check the raw message
-            if "Exception ignored in: <function Chrome.__del__" in message or \
-               "OSError: [WinError 6] The handle is invalid" in message:
-                return True
-        except Exception as e:
-            # Log any other errors but don't filter the message
-            logger.debug(f"Error in should_filter_log_message: {str(e)}")
-    return False
-
-async def start_websocket_server():
+def format_start_time(created_at):
+    """A stored ISO timestamp in the ISO-with-milliseconds form /list-jobs has always returned"""
+    if not created_at:
+        return None
     try:
-        # Log WebSocket server startup
-        logger.info(f"🚀 WEBSOCKET SERVER STARTING on ws://{WS_HOST}:{WS_PORT}")
-        
-        try:
-            # Start WebSocket server with configuration from environment
-            server = await websockets.serve(
-                websocket_handler, 
-                WS_HOST,
-                WS_PORT,
-                ping_interval=WS_PING_INTERVAL,
-                ping_timeout=WS_PING_TIMEOUT,
-                close_timeout=WS_CLOSE_TIMEOUT
-            )
-            
-            logger.info(f"✅ WEBSOCKET SERVER RUNNING on ws://{WS_HOST}:{WS_PORT}")
-            
-            # Keep server running forever
-            await asyncio.Future()
-        except OSError as e:
-            if "address already in use" in str(e).lower():
-                alt_port = find_available_port(WS_PORT + 1)
-                logger.warning(f"WebSocket port {WS_PORT} is in use. Trying alternative port {alt_port}")
-                
-                # Try with alternative port
-                server = await websockets.serve(
-                    websocket_handler, 
-                    WS_HOST,
-                    alt_port,
-                    ping_interval=WS_PING_INTERVAL,
-                    ping_timeout=WS_PING_TIMEOUT,
-                    close_timeout=WS_CLOSE_TIMEOUT
-                )
-                
-                logger.info(f"✅ WEBSOCKET SERVER RUNNING on ws://{WS_HOST}:{alt_port}")
-                
-                # Keep server running forever
-                await asyncio.Future()
-            else:
-                raise
-                
-    except Exception as e:
-        logger.error(f"WebSocket server error: {str(e)}", exc_info=True)
-        # Try to restart
-        await asyncio.sleep(5)
-        await start_websocket_server()
+        return datetime.fromisoformat(created_at).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+    except ValueError:
+        return created_at
+
+def worker_request_allowed():
+    """Whether a request may act as a worker node"""
+    return bool(SCRAPER_WORKER_TOKEN) and hmac.compare_digest(request.headers.get(TOKEN_HEADER, ''), SCRAPER_WORKER_TOKEN)
+
+def worker_endpoint(handler):
+    """Reject worker node requests when remote mode is off or the node can't authenticate"""
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        if not remote_workers:
+            return jsonify({"status": "error", "message": "Worker nodes are not enabled on this server"}), 404
+        if not worker_request_allowed():
+            return jsonify({"status": "error", "message": "Invalid worker token"}), 403
+        return handler(*args, **kwargs)
+    return wrapper
 
-def start_websocket_server_thread():
+@app.route('/workers', methods=['GET'])
+@worker_endpoint
+def list_worker_nodes():
+    return jsonify({"capacity": remote_workers.capacity, "nodes": remote_workers.nodes()})
+
+@app.route('/workers/register', methods=['POST'])
+@worker_endpoint
+def register_worker_node():
+    data = request.get_json(silent=True) or {}
     try:
-        # Start the WebSocket server with better error handling
-        try:
-            loop.run_until_complete(start_websocket_server())
-        except Exception as e:
-            print(f"Error in WebSocket server main loop: {e}")
-            logger.error(f"Error in WebSocket server main loop: {str(e)}", exc_info=True)
-    except Exception as e:
-        print(f"Error starting WebSocket server thread: {e}")
-        logger.error(f"WebSocket server thread error: {str(e)}", exc_info=True)
-    finally:
-        try:
-            # Clean up the event loop
-            if loop.is_running():
-                loop.stop()
-            if not loop.is_closed():
-                loop.close()
-            print("WebSocket server thread closed")
-        except Exception as e:
-            print(f"Error cleaning up WebSocket server: {e}")
-            logger.error(f"Error cleaning up WebSocket server: {str(e)}")
-
-def check_and_stop_completed_scrapers():
-    """Periodically check for and stop completed scrapers."""
+        capacity = int(data.get('capacity', 1))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "capacity must be an integer"}), 400
+    node_id = remote_workers.register(data.get('hostname') or request.remote_addr, capacity, node_id=data.get('node_id'))
+    return jsonify({"node_id": node_id, "heartbeat_timeout": REMOTE_WORKER_TIMEOUT})
+
+@app.route('/workers/<node_id>/heartbeat', methods=['POST'])
+@worker_endpoint
+def worker_node_heartbeat(node_id):
+    stop = remote_workers.heartbeat(node_id)
+    if stop is None:
+        return jsonify({"status": "error", "message": f"Unknown node: {node_id}"}), 404
+    return jsonify({"stop": stop})
+
+@app.route('/workers/<node_id>/leave', methods=['POST'])
+@worker_endpoint
+def worker_node_leave(node_id):
+    remote_workers.unregister(node_id)
+    return jsonify({"status": "success"})
+
+@app.route('/workers/<node_id>/lease', methods=['POST'])
+@worker_endpoint
+def lease_job(node_id):
+    """Long-poll for the next job; 204 when none became available in time"""
     try:
-        current_time = datetime.now()
-        for job_id, job in list(active_jobs.items()):
-            # Check if the job is completed but still has a process
-            if job.status == "completed" and job.process:
-                logger.info(f"Stopping completed scraper {job_id} immediately")
-                try:
-                    job.process.terminate()
-                    job.process.wait(timeout=1)  # Reduced timeout to 1 second
-                except:
-                    if job.process:
-                        job.process.kill()
-                job.process = None
-                
-                # Set completion time if not already set
-                if not job.completion_time:
-                    job.completion_time = current_time
-            
-            # Remove completed jobs from active_jobs but keep their files
-            if job.status == "completed" and job.completion_time:
-                try:
-                    # Remove the job from active_jobs but keep the output directory
-                    del active_jobs[job_id]
-                    logger.info(f"Removed completed job {job_id} from active jobs")
-                except Exception as e:
-                    logger.error(f"Error removing job {job_id}: {str(e)}")
-    except Exception as e:
-        logger.error(f"Error in check_and_stop_completed_scrapers: {str(e)}")
+        lease = remote_workers.lease(node_id)
+    except KeyError:
+        return jsonify({"status": "error", "message": f"Unknown node: {node_id}"}), 404
+    if lease is None:
+        return '', 204
+    job_id, config = lease
+    return jsonify({"job_id": job_id, "config": config})
 
-# Start a background thread to periodically check for completed scrapers
-def start_cleanup_thread():
-    def cleanup_loop():
-        while True:
-            try:
-                check_and_stop_completed_scrapers()
-                time.sleep(60)  # Check every minute
-            except Exception as e:
-                logger.error(f"Error in cleanup loop: {str(e)}")
-                time.sleep(60)  # Wait before retrying
-    
-    cleanup_thread = threading.Thread(target=cleanup_loop, daemon=True)
-    cleanup_thread.start()
-    logger.info("Started cleanup thread for completed scrapers")
+@app.route('/workers/<node_id>/jobs/<job_id>/logs', methods=['POST'])
+@worker_endpoint
+def worker_job_logs(node_id, job_id):
+    lines = (request.get_json(silent=True) or {}).get('lines') or []
+    if not remote_workers.add_logs(node_id, job_id, [str(line) for line in lines]):
+        return jsonify({"status": "error", "message": f"Node {node_id} does not hold job {job_id}"}), 409
+    return jsonify({"status": "success"})
+
+@app.route('/workers/<node_id>/jobs/<job_id>/files/<path:file_path>', methods=['PUT'])
+@worker_endpoint
+def upload_worker_job_file(node_id, job_id, file_path):
+    """Store one output file of a job under output/<job_id>/"""
+    if not remote_workers.holds(node_id, job_id):
+        return jsonify({"status": "error", "message": f"Node {node_id} does not hold job {job_id}"}), 409
+    job_dir = os.path.abspath(os.path.join('output', job_id))
+    target = os.path.abspath(os.path.join(job_dir, file_path))
+    if not target.startswith(job_dir + os.sep):
+        return jsonify({"status": "error", "message": "Invalid file path"}), 400
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            while True:
+                chunk = request.stream.read(1024 * 1024)
+                if not chunk:
+                    break
+                f.write(chunk)
+        os.replace(temp_path, target)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return jsonify({"status": "success"})
 
-# Start the cleanup thread when the server starts
-start_cleanup_thread()
+@app.route('/workers/<node_id>/jobs/<job_id>/done', methods=['POST'])
+@worker_endpoint
+def worker_job_done(node_id, job_id):
+    return_code = (request.get_json(silent=True) or {}).get('return_code', 1)
+    if not remote_workers.finish(node_id, job_id, return_code):
+        return jsonify({"status": "error", "message": f"Node {node_id} does not hold job {job_id}"}), 409
+    return jsonify({"status": "success"})
+
+# Chrome driver exception messages that are noise for the frontend, matched in one pass
+FILTERED_LOG_PATTERN = re.compile(
+    r"Exception ignored in: <function Chrome\.__del__|OSError: \[WinError 6\] The handle is invalid"
+)
+
+# Filter function to remove Chrome driver exception messages
+def should_filter_log_message(message):
+    """Check if a log message should be filtered out."""
+    # JSON-encoded messages carry the same text, so one search covers both forms
+    return isinstance(message, str) and FILTERED_LOG_PATTERN.search(message) is not None
 
 # Add a new route for force shutdown
 @app.route('/force-shutdown', methods=['POST'])
 def force_shutdown():
     """Force shutdown the server immediately"""
     try:
+        if worker_pool:
+            worker_pool.shutdown()
+        
         # Force stop all active jobs
         for job in active_jobs.values():
             if job.process:
@@ -1254,6 +1725,11 @@ def health_check():
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 def main():
     init_data_directories()
     logger.info("Initialized data directories")
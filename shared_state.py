@@ -0,0 +1,471 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+
+try:
+    import redis  # Optional: only needed by RedisStateBackend
+except ImportError:
+    redis = None
+
+try:
+    import fcntl  # Not on Windows, where the single-worker check is skipped
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class StateBackend:
+    """State the API workers share: which Socket.IO clients belong to which user,
+    which worker owns each unfinished job, and commands addressed to a worker.
+
+    MemoryStateBackend keeps everything in the process, which is all a single worker
+    needs and doubles as the stand-in for tests. SQLiteStateBackend shares state between
+    workers on one node and RedisStateBackend between nodes.
+    """
+    def add_client(self, client_id, user_id, node_id):
+        raise NotImplementedError
+
+    def remove_client(self, client_id):
+        """Forget a client; returns (user_id, clients the user still has) or (None, 0)"""
+        raise NotImplementedError
+
+    def user_of(self, client_id):
+        raise NotImplementedError
+
+    def client_count(self, user_id):
+        raise NotImplementedError
+
+    def set_job_owner(self, job_id, node_id):
+        raise NotImplementedError
+
+    def job_owner(self, job_id):
+        raise NotImplementedError
+
+    def clear_job_owner(self, job_id):
+        raise NotImplementedError
+
+    def send_command(self, node_id, command):
+        """Queue a JSON-serializable command for a worker"""
+        raise NotImplementedError
+
+    def take_commands(self, node_id):
+        """Remove and return the commands queued for a worker, oldest first"""
+        raise NotImplementedError
+
+    def acquire_slots(self, job_id, node_id, host, user_id, wanted, total, user_limit=None, ttl=60):
+        """Lease up to `wanted` of host's `total` browser slots for a job.
+
+        Returns the number of slots granted: 0 when none is free or the user already
+        runs user_limit jobs across all workers. Leases expire after ttl seconds
+        unless renewed, so a worker that dies without releasing frees its slots.
+        """
+        raise NotImplementedError
+
+    def renew_slots(self, node_id, ttl=60):
+        """Extend every lease a worker holds by ttl seconds from now"""
+        raise NotImplementedError
+
+    def release_slots(self, job_id):
+        raise NotImplementedError
+
+    def shared_between_processes(self):
+        """Whether other API worker processes see this state"""
+        return True
+
+    def clear_node(self, node_id):
+        """Drop everything a worker registered, e.g. when it starts up again or shuts down"""
+        raise NotImplementedError
+
+
+class MemoryStateBackend(StateBackend):
+    def __init__(self):
+        self._clients = {}  # Maps client_id to (user_id, node_id)
+        self._user_clients = defaultdict(set)
+        self._owners = {}
+        self._commands = defaultdict(deque)
+        self._leases = {}  # Maps job_id to [node_id, host, user_id, slots, expires]
+        self._lock = threading.Lock()
+
+    def add_client(self, client_id, user_id, node_id):
+        with self._lock:
+            previous = self._clients.get(client_id)
+            if previous and previous[0] != user_id:
+                self._user_clients[previous[0]].discard(client_id)
+            self._clients[client_id] = (user_id, node_id)
+            self._user_clients[user_id].add(client_id)
+
+    def remove_client(self, client_id):
+        with self._lock:
+            entry = self._clients.pop(client_id, None)
+            if not entry:
+                return None, 0
+            user_id = entry[0]
+            clients = self._user_clients.get(user_id, set())
+            clients.discard(client_id)
+            if not clients:
+                self._user_clients.pop(user_id, None)
+            return user_id, len(clients)
+
+    def user_of(self, client_id):
+        entry = self._clients.get(client_id)
+        return entry[0] if entry else None
+
+    def client_count(self, user_id):
+        return len(self._user_clients.get(user_id, ()))
+
+    def set_job_owner(self, job_id, node_id):
+        self._owners[job_id] = node_id
+
+    def job_owner(self, job_id):
+        return self._owners.get(job_id)
+
+    def clear_job_owner(self, job_id):
+        self._owners.pop(job_id, None)
+
+    def send_command(self, node_id, command):
+        with self._lock:
+            self._commands[node_id].append(command)
+
+    def take_commands(self, node_id):
+        with self._lock:
+            commands = list(self._commands.pop(node_id, ()))
+        return commands
+
+    def acquire_slots(self, job_id, node_id, host, user_id, wanted, total, user_limit=None, ttl=60):
+        now = time.time()
+        with self._lock:
+            for lease_job, lease in list(self._leases.items()):
+                if lease[4] < now:
+                    del self._leases[lease_job]
+            used = sum(lease[3] for lease in self._leases.values() if lease[1] == host)
+            user_jobs = sum(1 for lease in self._leases.values() if lease[2] == user_id)
+            if used >= total or (user_limit and user_jobs >= user_limit):
+                return 0
+            granted = min(wanted, total - used)
+            self._leases[job_id] = [node_id, host, user_id, granted, now + ttl]
+            return granted
+
+    def renew_slots(self, node_id, ttl=60):
+        expires = time.time() + ttl
+        with self._lock:
+            for lease in self._leases.values():
+                if lease[0] == node_id:
+                    lease[4] = expires
+
+    def release_slots(self, job_id):
+        with self._lock:
+            self._leases.pop(job_id, None)
+
+    def shared_between_processes(self):
+        return False
+
+    def clear_node(self, node_id):
+        with self._lock:
+            for client_id, (user_id, client_node) in list(self._clients.items()):
+                if client_node == node_id:
+                    del self._clients[client_id]
+                    self._user_clients[user_id].discard(client_id)
+                    if not self._user_clients[user_id]:
+                        del self._user_clients[user_id]
+            for job_id, owner in list(self._owners.items()):
+                if owner == node_id:
+                    del self._owners[job_id]
+            for job_id, lease in list(self._leases.items()):
+                if lease[0] == node_id:
+                    del self._leases[job_id]
+            self._commands.pop(node_id, None)
+
+
+class SQLiteStateBackend(StateBackend):
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS clients (client_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, node_id TEXT NOT NULL);
+    CREATE INDEX IF NOT EXISTS clients_user ON clients (user_id);
+    CREATE TABLE IF NOT EXISTS job_owners (job_id TEXT PRIMARY KEY, node_id TEXT NOT NULL);
+    CREATE TABLE IF NOT EXISTS commands (id INTEGER PRIMARY KEY AUTOINCREMENT, node_id TEXT NOT NULL, command TEXT NOT NULL);
+    CREATE INDEX IF NOT EXISTS commands_node ON commands (node_id, id);
+    CREATE TABLE IF NOT EXISTS slot_leases (
+        job_id TEXT PRIMARY KEY, node_id TEXT NOT NULL, host TEXT NOT NULL, user_id TEXT NOT NULL,
+        slots INTEGER NOT NULL, expires REAL NOT NULL
+    );
+    """
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(self.SCHEMA)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def add_client(self, client_id, user_id, node_id):
+        self._execute('INSERT OR REPLACE INTO clients (client_id, user_id, node_id) VALUES (?, ?, ?)', (client_id, user_id, node_id))
+
+    def remove_client(self, client_id):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute('SELECT user_id FROM clients WHERE client_id = ?', (client_id,)).fetchone()
+                if not row:
+                    self._conn.execute('COMMIT')
+                    return None, 0
+                self._conn.execute('DELETE FROM clients WHERE client_id = ?', (client_id,))
+                remaining = self._conn.execute('SELECT COUNT(*) FROM clients WHERE user_id = ?', (row[0],)).fetchone()[0]
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return row[0], remaining
+
+    def user_of(self, client_id):
+        rows = self._execute('SELECT user_id FROM clients WHERE client_id = ?', (client_id,))
+        return rows[0][0] if rows else None
+
+    def client_count(self, user_id):
+        return self._execute('SELECT COUNT(*) FROM clients WHERE user_id = ?', (user_id,))[0][0]
+
+    def set_job_owner(self, job_id, node_id):
+        self._execute('INSERT OR REPLACE INTO job_owners (job_id, node_id) VALUES (?, ?)', (job_id, node_id))
+
+    def job_owner(self, job_id):
+        rows = self._execute('SELECT node_id FROM job_owners WHERE job_id = ?', (job_id,))
+        return rows[0][0] if rows else None
+
+    def clear_job_owner(self, job_id):
+        self._execute('DELETE FROM job_owners WHERE job_id = ?', (job_id,))
+
+    def send_command(self, node_id, command):
+        self._execute('INSERT INTO commands (node_id, command) VALUES (?, ?)', (node_id, json.dumps(command)))
+
+    def take_commands(self, node_id):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = self._conn.execute('SELECT id, command FROM commands WHERE node_id = ? ORDER BY id', (node_id,)).fetchall()
+                if rows:
+                    self._conn.execute('DELETE FROM commands WHERE node_id = ? AND id <= ?', (node_id, rows[-1][0]))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return [json.loads(command) for _, command in rows]
+
+    def acquire_slots(self, job_id, node_id, host, user_id, wanted, total, user_limit=None, ttl=60):
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute('DELETE FROM slot_leases WHERE expires < ?', (now,))
+                used = self._conn.execute('SELECT COALESCE(SUM(slots), 0) FROM slot_leases WHERE host = ?', (host,)).fetchone()[0]
+                user_jobs = self._conn.execute('SELECT COUNT(*) FROM slot_leases WHERE user_id = ?', (user_id,)).fetchone()[0]
+                granted = 0
+                if used < total and not (user_limit and user_jobs >= user_limit):
+                    granted = min(wanted, total - used)
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO slot_leases (job_id, node_id, host, user_id, slots, expires) VALUES (?, ?, ?, ?, ?, ?)',
+                        (job_id, node_id, host, user_id, granted, now + ttl)
+                    )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return granted
+
+    def renew_slots(self, node_id, ttl=60):
+        self._execute('UPDATE slot_leases SET expires = ? WHERE node_id = ?', (time.time() + ttl, node_id))
+
+    def release_slots(self, job_id):
+        self._execute('DELETE FROM slot_leases WHERE job_id = ?', (job_id,))
+
+    def clear_node(self, node_id):
+        with self._lock:
+            for table in ('clients', 'job_owners', 'commands', 'slot_leases'):
+                self._conn.execute(f'DELETE FROM {table} WHERE node_id = ?', (node_id,))
+
+
+class RedisStateBackend(StateBackend):
+    """Shared state in Redis (or any server speaking its protocol, e.g. Valkey)"""
+    PREFIX = 'scraper:'
+
+    # Slot leases are a hash of job_id -> JSON lease, changed atomically by these scripts
+    ACQUIRE_SLOTS_SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local used, user_jobs = 0, 0
+    local leases = redis.call('HGETALL', KEYS[1])
+    for i = 1, #leases, 2 do
+        local lease = cjson.decode(leases[i + 1])
+        if lease.expires < now then
+            redis.call('HDEL', KEYS[1], leases[i])
+        else
+            if lease.host == ARGV[4] then used = used + lease.slots end
+            if lease.user == ARGV[5] then user_jobs = user_jobs + 1 end
+        end
+    end
+    local wanted, total, user_limit = tonumber(ARGV[6]), tonumber(ARGV[7]), tonumber(ARGV[8])
+    if used >= total or (user_limit > 0 and user_jobs >= user_limit) then return 0 end
+    local granted = math.min(wanted, total - used)
+    redis.call('HSET', KEYS[1], ARGV[2], cjson.encode({node = ARGV[3], host = ARGV[4], user = ARGV[5],
+                                                       slots = granted, expires = now + tonumber(ARGV[9])}))
+    return granted
+    """
+    RENEW_SLOTS_SCRIPT = """
+    local leases = redis.call('HGETALL', KEYS[1])
+    for i = 1, #leases, 2 do
+        local lease = cjson.decode(leases[i + 1])
+        if lease.node == ARGV[1] then
+            lease.expires = tonumber(ARGV[2])
+            redis.call('HSET', KEYS[1], leases[i], cjson.encode(lease))
+        end
+    end
+    return 0
+    """
+    CLEAR_SLOTS_SCRIPT = """
+    local leases = redis.call('HGETALL', KEYS[1])
+    for i = 1, #leases, 2 do
+        if cjson.decode(leases[i + 1]).node == ARGV[1] then redis.call('HDEL', KEYS[1], leases[i]) end
+    end
+    return 0
+    """
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("The redis package is required for the redis shared state backend")
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    def _key(self, *parts):
+        return self.PREFIX + ':'.join(parts)
+
+    def add_client(self, client_id, user_id, node_id):
+        previous = self._redis.hget(self._key('clients'), client_id)
+        pipe = self._redis.pipeline()
+        if previous:
+            pipe.srem(self._key('user', previous.split('|', 1)[0]), client_id)
+        pipe.hset(self._key('clients'), client_id, f"{user_id}|{node_id}")
+        pipe.sadd(self._key('user', user_id), client_id)
+        pipe.sadd(self._key('node', node_id, 'clients'), client_id)
+        pipe.execute()
+
+    def remove_client(self, client_id):
+        entry = self._redis.hget(self._key('clients'), client_id)
+        if not entry:
+            return None, 0
+        user_id, node_id = entry.split('|', 1)
+        pipe = self._redis.pipeline()
+        pipe.hdel(self._key('clients'), client_id)
+        pipe.srem(self._key('user', user_id), client_id)
+        pipe.srem(self._key('node', node_id, 'clients'), client_id)
+        pipe.scard(self._key('user', user_id))
+        remaining = pipe.execute()[-1]
+        return user_id, remaining
+
+    def user_of(self, client_id):
+        entry = self._redis.hget(self._key('clients'), client_id)
+        return entry.split('|', 1)[0] if entry else None
+
+    def client_count(self, user_id):
+        return self._redis.scard(self._key('user', user_id))
+
+    def set_job_owner(self, job_id, node_id):
+        self._redis.hset(self._key('job_owners'), job_id, node_id)
+
+    def job_owner(self, job_id):
+        return self._redis.hget(self._key('job_owners'), job_id)
+
+    def clear_job_owner(self, job_id):
+        self._redis.hdel(self._key('job_owners'), job_id)
+
+    def send_command(self, node_id, command):
+        self._redis.rpush(self._key('node', node_id, 'commands'), json.dumps(command))
+
+    def take_commands(self, node_id):
+        key = self._key('node', node_id, 'commands')
+        pipe = self._redis.pipeline()
+        pipe.lrange(key, 0, -1)
+        pipe.delete(key)
+        commands, _ = pipe.execute()
+        return [json.loads(command) for command in commands]
+
+    def acquire_slots(self, job_id, node_id, host, user_id, wanted, total, user_limit=None, ttl=60):
+        return int(self._redis.eval(self.ACQUIRE_SLOTS_SCRIPT, 1, self._key('slot_leases'),
+                                    time.time(), job_id, node_id, host, user_id, wanted, total, user_limit or 0, ttl))
+
+    def renew_slots(self, node_id, ttl=60):
+        self._redis.eval(self.RENEW_SLOTS_SCRIPT, 1, self._key('slot_leases'), node_id, time.time() + ttl)
+
+    def release_slots(self, job_id):
+        self._redis.hdel(self._key('slot_leases'), job_id)
+
+    def clear_node(self, node_id):
+        for client_id in self._redis.smembers(self._key('node', node_id, 'clients')):
+            self.remove_client(client_id)
+        owners = self._redis.hgetall(self._key('job_owners'))
+        stale = [job_id for job_id, owner in owners.items() if owner == node_id]
+        if stale:
+            self._redis.hdel(self._key('job_owners'), *stale)
+        self._redis.eval(self.CLEAR_SLOTS_SCRIPT, 1, self._key('slot_leases'), node_id)
+        self._redis.delete(self._key('node', node_id, 'commands'), self._key('node', node_id, 'clients'))
+
+
+def claim_single_worker(path):
+    """Hold an exclusive lock on path for the life of the process.
+
+    The memory backend can't see other workers' clients or jobs; a second worker
+    would mark the first one's running jobs interrupted. Raises RuntimeError if a
+    live process already holds the lock; the lock goes away when its holder exits.
+    """
+    handle = open(path, 'a')
+    if fcntl is None:
+        return handle
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        raise RuntimeError(
+            "Another API worker is already using this job store with the in-process 'memory' state backend. "
+            "Run one worker, or set SHARED_STATE_BACKEND to 'sqlite' or 'redis' for several."
+        )
+    return handle
+
+
+def create_state_backend(kind, url=None):
+    """Build the backend named by SHARED_STATE_BACKEND"""
+    kind = (kind or 'memory').lower()
+    if kind == 'memory':
+        return MemoryStateBackend()
+    if kind == 'sqlite':
+        return SQLiteStateBackend(url or 'data/shared_state.sqlite')
+    if kind == 'redis':
+        return RedisStateBackend(url or 'redis://localhost:6379/0')
+    raise ValueError(f"Unknown shared state backend: {kind}")
+
+
+class CommandListener:
+    """Polls the backend for commands addressed to this worker and hands them to a callback"""
+    def __init__(self, backend, node_id, handler, interval=1.0):
+        self.backend = backend
+        self.node_id = node_id
+        self.handler = handler  # Callable taking one command
+        self.interval = interval
+
+    def start(self):
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                commands = self.backend.take_commands(self.node_id)
+            except Exception as e:
+                logger.error(f"Error reading commands for {self.node_id}: {str(e)}")
+                continue
+            for command in commands:
+                try:
+                    self.handler(command)
+                except Exception as e:
+                    logger.error(f"Error handling command {command}: {str(e)}")
@@ -0,0 +1,317 @@
+import gzip
+import json
+import os
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urldefrag, urljoin
+
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+from selenium.webdriver.common.by import By
+
+try:
+    import lxml.html  # Optional: only needed to replay snapshots
+    from lxml import etree
+except ImportError:
+    lxml = None
+    etree = None
+
+try:
+    from cssselect import HTMLTranslator  # Optional: CSS selectors for replayed snapshots
+except ImportError:
+    HTMLTranslator = None
+
+MANIFEST_NAME = 'manifest.jsonl'
+CONFIG_NAME = 'config.json'
+PAGES_DIR = 'pages'
+
+# Elements whose text starts on a new line when rendered, like Selenium's element.text
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'fieldset', 'figcaption',
+    'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav',
+    'ol', 'p', 'pre', 'section', 'table', 'tbody', 'thead', 'tfoot', 'tr', 'ul',
+}
+CELL_TAGS = {'td', 'th'}
+SKIPPED_TAGS = {'script', 'style', 'noscript', 'template', 'head'}
+BOOLEAN_ATTRIBUTES = {'checked', 'disabled', 'hidden', 'multiple', 'readonly', 'required', 'selected'}
+URL_ATTRIBUTES = {'href', 'src', 'action'}
+HIDDEN_STYLE = re.compile(r'display\s*:\s*none|visibility\s*:\s*hidden', re.IGNORECASE)
+
+
+class SnapshotRecorder:
+    """Saves the HTML of every page a job extracts from, with what was extracted from it.
+
+    The directory holds the job's config, one gzipped HTML file per page under pages/
+    and manifest.jsonl with one entry per page in the order they were recorded.
+    Recording into a directory replaces what was recorded there before.
+    """
+    def __init__(self, directory, config=None):
+        self.directory = directory
+        self._count = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, PAGES_DIR), exist_ok=True)
+        with open(os.path.join(directory, MANIFEST_NAME), 'w', encoding='utf-8'):
+            pass
+        if config is not None:
+            with open(os.path.join(directory, CONFIG_NAME), 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=2)
+
+    def record(self, kind, url, html, **details):
+        """Save one page; kind is 'listing' or 'subpage', details go into its manifest entry"""
+        with self._lock:
+            self._count += 1
+            seq = self._count
+        file_name = f"{PAGES_DIR}/{seq:05d}.html.gz"
+        with gzip.open(os.path.join(self.directory, file_name), 'wt', encoding='utf-8') as f:
+            f.write(html)
+        entry = {'seq': seq, 'kind': kind, 'url': url, 'file': file_name, 'recorded_at': datetime.now().isoformat()}
+        entry.update(details)
+        with self._lock:
+            with open(os.path.join(self.directory, MANIFEST_NAME), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+def load_snapshots(directory):
+    """Manifest entries of a recording, in recording order"""
+    entries = []
+    with open(os.path.join(directory, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entries.append(json.loads(line))
+    entries.sort(key=lambda entry: entry['seq'])
+    return entries
+
+
+def load_snapshot_config(directory):
+    """The config of the recorded job, or None if it wasn't saved"""
+    path = os.path.join(directory, CONFIG_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _visible_text(node):
+    """Approximation of the text Selenium reports for an element"""
+    parts = []
+
+    def walk(element):
+        if not isinstance(element.tag, str) or element.tag in SKIPPED_TAGS or _hidden(element):
+            return
+        if element.tag in BLOCK_TAGS:
+            parts.append('\n')
+        if element.text:
+            parts.append(element.text)
+        for child in element:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+        if element.tag in BLOCK_TAGS:
+            parts.append('\n')
+        elif element.tag in CELL_TAGS:
+            parts.append(' ')
+
+    walk(node)
+    lines = (re.sub(r'\s+', ' ', line).strip() for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def _hidden(element):
+    return element.get('hidden') is not None or bool(HIDDEN_STYLE.search(element.get('style') or '')) \
+        or (element.tag == 'input' and (element.get('type') or '').lower() == 'hidden')
+
+
+class ReplayElement:
+    """WebElement stand-in for a node of a replayed snapshot"""
+    def __init__(self, driver, node):
+        self._driver = driver
+        self._node = node
+
+    @property
+    def tag_name(self):
+        self._driver.commands['tag_name'] += 1
+        return self._node.tag
+
+    @property
+    def text(self):
+        self._driver.commands['text'] += 1
+        return _visible_text(self._node)
+
+    def get_attribute(self, name):
+        self._driver.commands['get_attribute'] += 1
+        if name in ('textContent', 'innerText'):
+            return _visible_text(self._node) if name == 'innerText' else self._node.text_content()
+        if name in ('innerHTML', 'outerHTML'):
+            html = etree.tostring(self._node, encoding='unicode', method='html', with_tail=False)
+            if name == 'innerHTML':
+                html = html[html.find('>') + 1:html.rfind('<')]
+            return html
+        value = self._node.get(name)
+        if name in BOOLEAN_ATTRIBUTES:
+            return 'true' if value is not None else None
+        if name in URL_ATTRIBUTES and value is not None:
+            # Selenium returns the resolved property, i.e. an absolute URL
+            return urljoin(self._driver.current_entry['url'], value)
+        return value
+
+    def is_displayed(self):
+        self._driver.commands['is_displayed'] += 1
+        node = self._node
+        while node is not None:
+            if _hidden(node):
+                return False
+            node = node.getparent()
+        return True
+
+    def is_enabled(self):
+        self._driver.commands['is_enabled'] += 1
+        return self._node.get('disabled') is None
+
+    def click(self):
+        self._driver.commands['click'] += 1
+        self._driver._click(self._node)
+
+    def find_element(self, by=By.ID, value=None):
+        self._driver.commands['find_element'] += 1
+        return self._driver._first(self._node, by, value)
+
+    def find_elements(self, by=By.ID, value=None):
+        self._driver.commands['find_elements'] += 1
+        return self._driver._find(self._node, by, value)
+
+
+class ReplayDriver:
+    """WebDriver stand-in that serves recorded snapshots instead of live pages.
+
+    It supports the calls scrap.py's extraction code makes: get(), current_url, title,
+    page_source, find_element(s) by CSS selector, XPath, id, class name, tag name or
+    name, and the few execute_script() snippets the scraper sends. Every call is
+    counted in `commands`, since each is one WebDriver round trip against a browser.
+    Clicking an element on a listing page that isn't a link to another recorded page
+    opens the next recorded listing page, which is how button pagination replays.
+    """
+    def __init__(self, directory):
+        if lxml is None or HTMLTranslator is None:
+            raise RuntimeError("Replaying snapshots needs the lxml and cssselect packages")
+        self.directory = directory
+        self.entries = load_snapshots(directory)
+        self._by_url = {}
+        for entry in self.entries:
+            # A URL recorded more than once (e.g. button pagination) replays its first visit
+            self._by_url.setdefault(urldefrag(entry['url'])[0], entry)
+        self.commands = Counter()
+        self.current_entry = None
+        self._tree = None
+        self._translator = HTMLTranslator()
+        self._xpaths = {}
+
+    # Navigation
+
+    def open(self, entry):
+        """Show a recorded page without counting a round trip"""
+        with gzip.open(os.path.join(self.directory, entry['file']), 'rt', encoding='utf-8') as f:
+            self._tree = lxml.html.document_fromstring(f.read())
+        self.current_entry = entry
+
+    def get(self, url):
+        self.commands['get'] += 1
+        entry = self._by_url.get(urldefrag(url)[0])
+        if entry is None:
+            raise WebDriverException(f"No snapshot recorded for {url}")
+        self.open(entry)
+
+    @property
+    def current_url(self):
+        self.commands['current_url'] += 1
+        return self.current_entry['url'] if self.current_entry else 'about:blank'
+
+    @property
+    def title(self):
+        self.commands['title'] += 1
+        title = self._tree.find('.//title') if self._tree is not None else None
+        return title.text_content().strip() if title is not None else ''
+
+    @property
+    def page_source(self):
+        self.commands['page_source'] += 1
+        return etree.tostring(self._tree, encoding='unicode', method='html') if self._tree is not None else ''
+
+    def _click(self, node):
+        href = node.get('href') if node.tag == 'a' else None
+        if href:
+            entry = self._by_url.get(urldefrag(urljoin(self.current_entry['url'], href))[0])
+            if entry is not None:
+                self.open(entry)
+                return
+        if self.current_entry and self.current_entry['kind'] == 'listing':
+            following = [entry for entry in self.entries if entry['kind'] == 'listing' and entry['seq'] > self.current_entry['seq']]
+            if following:
+                self.open(following[0])
+
+    # Lookups
+
+    def _xpath(self, by, value):
+        key = (by, value)
+        xpath = self._xpaths.get(key)
+        if xpath is None:
+            if by == By.CSS_SELECTOR:
+                xpath = self._translator.css_to_xpath(value, prefix='descendant::')
+            elif by == By.XPATH:
+                xpath = value
+            elif by == By.ID:
+                xpath = f"descendant::*[@id={json.dumps(value)}]"
+            elif by == By.NAME:
+                xpath = f"descendant::*[@name={json.dumps(value)}]"
+            elif by == By.CLASS_NAME:
+                xpath = self._translator.css_to_xpath(f".{value}", prefix='descendant::')
+            elif by == By.TAG_NAME:
+                xpath = f"descendant::{value}"
+            else:
+                raise WebDriverException(f"Locator strategy {by!r} is not supported when replaying snapshots")
+            self._xpaths[key] = xpath
+        return xpath
+
+    def _find(self, root, by, value):
+        if root is None:
+            return []
+        nodes = root.xpath(self._xpath(by, value))
+        return [ReplayElement(self, node) for node in nodes if isinstance(node, etree._Element)]
+
+    def _first(self, root, by, value):
+        elements = self._find(root, by, value)
+        if not elements:
+            raise NoSuchElementException(f"Unable to locate element: {{\"method\":\"{by}\",\"selector\":\"{value}\"}}")
+        return elements[0]
+
+    def find_element(self, by=By.ID, value=None):
+        self.commands['find_element'] += 1
+        return self._first(self._tree, by, value)
+
+    def find_elements(self, by=By.ID, value=None):
+        self.commands['find_elements'] += 1
+        return self._find(self._tree, by, value)
+
+    # Scripts and session calls
+
+    def execute_script(self, script, *args):
+        """Replays the scripts scrap.py sends; anything else does nothing and returns None"""
+        self.commands['execute_script'] += 1
+        if '.click()' in script and args and isinstance(args[0], ReplayElement):
+            self._click(args[0]._node)
+        elif 'scrollHeight' in script and 'return' in script:
+            # The page never grows, so scroll loops stop after their first pass
+            return 0
+        elif 'innerText' in script and 'return' in script:
+            body = self._tree.find('.//body') if self._tree is not None else None
+            return _visible_text(body)[:2000] if body is not None else ''
+        return None
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def quit(self):
+        self._tree = None
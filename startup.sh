@@ -20,7 +20,6 @@ export FLASK_ENV=development
 # More conservative websocket settings
 export WS_PING_INTERVAL=25
 export WS_PING_TIMEOUT=20
-export WS_CLOSE_TIMEOUT=15
 export EVENTLET_NO_GREENDNS=yes  # Prevent DNS resolution issues
 export EVENTLET_WSGI_MULTIPROCESS=0  # Disable multiprocessing
 export EVENTLET_WSGI_MULTITHREAD=1  # Enable multithreading
@@ -0,0 +1,49 @@
+import unittest
+
+from adaptive import AIMDController, job_browser_demand, subpage_browser_limit
+
+
+class AIMDControllerTest(unittest.TestCase):
+    def test_increases_after_a_window_of_healthy_requests(self):
+        controller = AIMDController(min_limit=1, max_limit=3, min_delay=0, max_delay=10, initial_delay=2, delay_step=0.5)
+        started = controller.acquire()
+        controller.release()
+        controller.record(started, 1.0)
+        self.assertEqual(controller.limit, 2)
+        self.assertEqual(controller.delay, 1.5)
+        for _ in range(2):
+            controller.record(started, 1.0)
+        self.assertEqual(controller.limit, 3)
+        for _ in range(3):
+            controller.record(started, 1.0)
+        self.assertEqual(controller.limit, 3)
+
+    def test_decreases_once_per_window(self):
+        controller = AIMDController(min_limit=1, max_limit=8, initial_delay=1, target_latency=5)
+        controller.limit = 8
+        in_flight = [controller.acquire() for _ in range(3)]
+        controller.record(in_flight[0], 1.0, ok=False)
+        self.assertEqual((controller.limit, controller.delay), (4, 2.0))
+        # Requests sent before the decrease report the same congestion and are not counted again
+        controller.record(in_flight[1], 20.0)
+        controller.record(in_flight[2], 1.0, throttled=True)
+        self.assertEqual((controller.limit, controller.delay, controller.decreases), (4, 2.0, 1))
+        controller.record(controller.acquire(), 20.0)
+        self.assertEqual((controller.limit, controller.decreases), (2, 2))
+
+
+class BrowserLimitTest(unittest.TestCase):
+    def test_limit_is_capped_by_the_scheduler_grant(self):
+        config = {"concurrent_settings": {"adaptive_concurrency": {"max_concurrency": 4}}}
+        self.assertEqual(subpage_browser_limit(config), 4)
+        self.assertEqual(subpage_browser_limit(dict(config, browser_slots=2)), 2)
+        self.assertEqual(subpage_browser_limit({"concurrent_settings": {"adaptive_concurrency": False}}), 1)
+
+    def test_demand_counts_subpage_browsers_only_when_scraping_subpages(self):
+        config = {"concurrent_settings": {"max_concurrent_requests": 3}}
+        self.assertEqual(job_browser_demand(config), 1)
+        self.assertEqual(job_browser_demand(dict(config, scrape_subpages=True)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from config_store import VERSION_KEY, ConfigStore
+
+
+class ConfigStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.store = ConfigStore(self.directory)
+
+    def test_every_write_bumps_the_version(self):
+        self.assertIsNone(self.store.get('alice'))
+        self.assertEqual(self.store.put('alice', {'base_url': 'https://a.example'}), 1)
+        self.assertEqual(self.store.put('alice', {'base_url': 'https://b.example'}), 2)
+        self.assertEqual(self.store.get('alice'), {'base_url': 'https://b.example', VERSION_KEY: 2})
+        self.assertEqual(self.store.version('alice'), 2)
+        self.assertIsNone(self.store.version('bob'))
+
+    def test_reads_are_cached_copies(self):
+        self.store.put('alice', {'fields': {'title': 'h1'}})
+        config = self.store.get('alice')
+        config['fields']['title'] = 'changed'
+        self.assertEqual(self.store.get('alice')['fields'], {'title': 'h1'})
+        self.assertEqual(self.store.misses, 0)
+        self.assertEqual(self.store.hits, 2)
+
+    def test_edits_outside_the_server_are_picked_up(self):
+        self.store.put('alice', {'base_url': 'https://a.example'})
+        with open(self.store.path('alice'), 'w', encoding='utf-8') as f:
+            json.dump({'base_url': 'https://edited.example', VERSION_KEY: 1}, f)
+        self.assertEqual(self.store.get('alice')['base_url'], 'https://edited.example')
+        os.remove(self.store.path('alice'))
+        self.assertIsNone(self.store.get('alice'))
+
+    def test_default_config_is_written_once(self):
+        calls = []
+
+        def default():
+            calls.append(1)
+            return {'base_url': 'https://default.example'}
+
+        threads = [threading.Thread(target=self.store.get_or_create, args=('alice', default)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.store.version('alice'), 1)
+        self.assertEqual(os.listdir(self.directory), ['config_alice.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
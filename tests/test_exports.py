@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import exports
+from exports import ExportUnavailable, export_results
+from results import write_json_rows
+
+ROWS = [{'title': 'First', 'price': '1.50'}, {'title': 'Second', 'tags': ['a', 'b']}, {'title': None}]
+
+
+class ExportResultsTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir, True)
+        self.json_file = os.path.join(self.output_dir, 'scraped_data.json')
+        write_json_rows(self.json_file, ROWS)
+
+    def read(self, fmt):
+        kind, value = export_results(self.json_file, fmt)
+        if kind == 'stream':
+            return kind, b''.join(value)
+        with open(value, 'rb') as f:
+            return kind, f.read()
+
+    def test_json_is_the_results_file(self):
+        self.assertEqual(export_results(self.json_file, 'json'), ('file', self.json_file))
+
+    def test_csv_has_every_column_and_flattens_nested_values(self):
+        kind, data = self.read('csv')
+        self.assertEqual(kind, 'stream')
+        self.assertEqual(list(csv.reader(io.StringIO(data.decode('utf-8')))), [
+            ['title', 'price', 'tags'],
+            ['First', '1.50', ''],
+            ['Second', '', '["a", "b"]'],
+            ['', '', ''],
+        ])
+
+    def test_streamed_export_is_cached_once_complete(self):
+        kind, streamed = self.read('ndjson')
+        self.assertEqual(kind, 'stream')
+        self.assertEqual([json.loads(line) for line in streamed.splitlines()], ROWS)
+        self.assertEqual(self.read('ndjson'), ('file', streamed))
+        self.assertEqual(len(os.listdir(os.path.join(self.output_dir, exports.EXPORT_DIR))), 1)
+
+    def test_abandoned_stream_leaves_no_cache_file(self):
+        kind, chunks = export_results(self.json_file, 'csv')
+        next(chunks)
+        chunks.close()
+        self.assertEqual(os.listdir(os.path.join(self.output_dir, exports.EXPORT_DIR)), [])
+
+    def test_new_results_replace_the_cached_export(self):
+        self.read('csv')
+        os.utime(self.json_file, ns=(0, os.stat(self.json_file).st_mtime_ns + 10 ** 9))
+        self.assertEqual(self.read('csv')[0], 'stream')
+        self.assertEqual(len(os.listdir(os.path.join(self.output_dir, exports.EXPORT_DIR))), 1)
+
+    def test_xlsx_is_written_before_it_is_sent(self):
+        from openpyxl import load_workbook
+        kind, path = export_results(self.json_file, 'xlsx')
+        self.assertEqual(kind, 'file')
+        rows = list(load_workbook(path).active.values)
+        self.assertEqual(rows[0], ('title', 'price', 'tags'))
+        self.assertEqual(rows[2], ('Second', None, '["a", "b"]'))
+
+    @unittest.skipIf(exports.pyarrow is not None, "pyarrow is installed")
+    def test_parquet_without_pyarrow_is_unavailable(self):
+        with self.assertRaises(ExportUnavailable):
+            export_results(self.json_file, 'parquet')
+        self.assertEqual(os.listdir(os.path.join(self.output_dir, exports.EXPORT_DIR)), [])
+
+    @unittest.skipIf(exports.pyarrow is None, "pyarrow is not installed")
+    def test_parquet_stores_values_as_text(self):
+        kind, path = export_results(self.json_file, 'parquet')
+        table = exports.pyarrow.parquet.read_table(path)
+        self.assertEqual(table.column('tags').to_pylist(), [None, '["a", "b"]', None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import shutil
+import tempfile
+import unittest
+
+from job_logs import JobLogBuffer
+
+
+class JobLogBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir, True)
+
+    def fill(self, count, **kwargs):
+        buffer = JobLogBuffer(self.output_dir, **kwargs)
+        for number in range(1, count + 1):
+            buffer.append(f"line {number}")
+        return buffer
+
+    def test_recent_records_come_from_memory(self):
+        buffer = self.fill(10, capacity=5)
+        self.assertEqual([record['seq'] for record in buffer.read(since=6, limit=10)], [7, 8, 9, 10])
+
+    def test_older_records_are_read_from_the_journal_index(self):
+        buffer = self.fill(50, capacity=5, index_stride=8)
+        records = buffer.read(since=17, limit=3)
+        self.assertEqual([(record['seq'], record['message']) for record in records],
+                         [(18, 'line 18'), (19, 'line 19'), (20, 'line 20')])
+        self.assertEqual(buffer.read(since=50), [])
+
+    def test_reopened_journal_continues_its_sequence(self):
+        self.fill(20, index_stride=8).close()
+        buffer = JobLogBuffer(self.output_dir, capacity=5, index_stride=8)
+        self.assertEqual(buffer.last_seq, 20)
+        self.assertEqual(buffer.read(since=9, limit=1)[0]['message'], 'line 10')
+        self.assertEqual(buffer.append('line 21'), 21)
+
+    def test_stale_index_is_rebuilt(self):
+        self.fill(20, index_stride=8).close()
+        # A different stride makes the saved index unusable
+        buffer = JobLogBuffer(self.output_dir, capacity=5, index_stride=4)
+        self.assertEqual(buffer.read(since=12, limit=1)[0]['seq'], 13)
+
+    def test_append_after_close_is_ignored(self):
+        buffer = self.fill(3)
+        buffer.close()
+        self.assertIsNone(buffer.append('late'))
+        self.assertEqual(JobLogBuffer(self.output_dir).last_seq, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
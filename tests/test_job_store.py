@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from job_store import JobStore
+
+
+class JobStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.path = os.path.join(self.root, 'jobs.sqlite')
+        self.store = JobStore(self.path)
+        self.start = datetime(2025, 1, 1, 12, 0, 0)
+
+    def add_jobs(self, count):
+        for number in range(count):
+            self.store.create(f"job-{number:02d}", 'alice' if number % 2 else 'bob',
+                              'completed' if number % 3 else 'failed', self.start + timedelta(minutes=number))
+
+    def test_jobs_survive_reopening_the_store(self):
+        self.store.create('job-1', 'alice', 'queued', self.start, priority=2)
+        self.store.update('job-1', status='completed', item_count=7, completed_at=self.start + timedelta(minutes=1))
+        job = JobStore(self.path).get('job-1')
+        self.assertEqual((job['user_id'], job['status'], job['priority'], job['item_count']), ('alice', 'completed', 2, 7))
+        self.assertEqual(job['completed_at'], '2025-01-01T12:01:00')
+        self.assertIsNone(self.store.get('missing'))
+
+    def test_update_rejects_unknown_fields(self):
+        self.store.create('job-1', 'alice', 'queued', self.start)
+        with self.assertRaises(ValueError):
+            self.store.update('job-1', colour='red')
+
+    def test_pages_follow_the_cursor_newest_first(self):
+        self.add_jobs(7)
+        seen = []
+        cursor = None
+        while True:
+            jobs, cursor = self.store.list(cursor=cursor, limit=3)
+            seen.extend(job['job_id'] for job in jobs)
+            if not cursor:
+                break
+        self.assertEqual(seen, [f"job-{number:02d}" for number in reversed(range(7))])
+
+    def test_list_filters_by_user_status_and_time(self):
+        self.add_jobs(12)
+        jobs, cursor = self.store.list(user_id='alice', status=['completed'], since=self.start + timedelta(minutes=3),
+                                       until=self.start + timedelta(minutes=10))
+        self.assertEqual([job['job_id'] for job in jobs], ['job-07', 'job-05'])
+        self.assertIsNone(cursor)
+        with self.assertRaises(ValueError):
+            self.store.list(cursor='not a cursor')
+
+    def test_unfinished_jobs_are_marked_interrupted(self):
+        self.store.create('queued', 'alice', 'queued', self.start)
+        self.store.create('running', 'alice', 'running', self.start)
+        self.store.create('elsewhere', 'alice', 'running', self.start)
+        self.store.create('done', 'alice', 'completed', self.start)
+        self.assertEqual(self.store.mark_interrupted(keep=lambda job_id: job_id == 'elsewhere'), 2)
+        self.assertEqual(self.store.get('running')['status'], 'interrupted')
+        self.assertEqual(self.store.unfinished_job_ids(), {'elsewhere'})
+        self.assertEqual(sorted(self.store.finished(['queued', 'done', 'elsewhere'])), ['done', 'queued'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from unittest import mock
+
+from resilience import CircuitBreaker, RetryPolicy
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('resilience.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_rate=0.5, window=4, min_requests=4, cooldown=10)
+
+    def fail(self, count):
+        opened = False
+        for _ in range(count):
+            wait, ticket = self.breaker.admit()
+            self.assertEqual(wait, 0.0)
+            opened = self.breaker.record(False, ticket) or opened
+        return opened
+
+    def test_opens_once_failure_rate_reached(self):
+        self.assertFalse(self.fail(3))
+        self.assertTrue(self.fail(1))
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        wait, ticket = self.breaker.admit()
+        self.assertEqual((wait, ticket), (10, None))
+
+    def test_half_open_admits_a_single_trial(self):
+        self.fail(4)
+        self.now += 10
+        wait, trial = self.breaker.admit()
+        self.assertEqual(wait, 0.0)
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        wait, ticket = self.breaker.admit()
+        self.assertGreater(wait, 0)
+        self.assertIsNone(ticket)
+        self.assertFalse(self.breaker.record(True, trial))
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_trial_reopens(self):
+        self.fail(4)
+        self.now += 10
+        _, trial = self.breaker.admit()
+        self.assertTrue(self.breaker.record(False, trial))
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.times_opened, 2)
+
+    def test_results_of_requests_from_before_the_opening_are_ignored(self):
+        _, stale_ok = self.breaker.admit()
+        _, stale_failure = self.breaker.admit()
+        self.fail(4)
+        self.now += 10
+        _, trial = self.breaker.admit()
+        # A slow request from before the opening can't close the breaker in place of the trial
+        self.assertFalse(self.breaker.record(True, stale_ok))
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(self.breaker.record(True, trial))
+        # Nor count against the fresh window once it is closed
+        self.assertFalse(self.breaker.record(False, stale_failure))
+        self.assertEqual(len(self.breaker._outcomes), 0)
+
+
+class RetryPolicyTest(unittest.TestCase):
+    def test_delay_stays_within_the_capped_exponential_ceiling(self):
+        policy = RetryPolicy(attempts=5, base_delay=2, max_delay=5)
+        for attempt, ceiling in ((1, 2), (2, 4), (3, 5), (4, 5)):
+            for _ in range(20):
+                self.assertTrue(0 <= policy.delay(attempt) <= ceiling)
+
+
+if __name__ == '__main__':
+    unittest.main()
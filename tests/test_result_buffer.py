@@ -0,0 +1,58 @@
+import unittest
+
+from result_buffer import ResultBuffer
+
+
+class ResultBufferTest(unittest.TestCase):
+    def test_rows_round_trip(self):
+        rows = [{'title': 'A', 'price': 1.5}, {'title': 'B', 'tags': ['x', 'y'], 'note': None}, {}]
+        buffer = ResultBuffer.from_rows(rows)
+        self.assertEqual(list(buffer), rows)
+        self.assertEqual(buffer[-1], {})
+        self.assertEqual(buffer[0:2], rows[:2])
+        self.assertEqual(buffer.columns, ['title', 'price', 'tags', 'note'])
+
+    def test_update_and_discard(self):
+        buffer = ResultBuffer.from_rows([{'title': 'A'}, {'title': 'B'}])
+        buffer.update(1, {'title': 'B2', 'url': 'https://example.com'})
+        buffer.discard(0, 'title')
+        self.assertEqual(buffer.row(0), {})
+        self.assertEqual(buffer.row(1), {'title': 'B2', 'url': 'https://example.com'})
+        self.assertEqual(buffer.get(0, 'title', 'missing'), 'missing')
+        self.assertEqual(buffer.columns, ['title', 'url'])
+        with self.assertRaises(IndexError):
+            buffer.row(2)
+
+    def test_rows_as_lists_fill_missing_cells(self):
+        buffer = ResultBuffer.from_rows([{'a': 1}, {'b': 'two'}])
+        self.assertEqual(list(buffer.rows_as_lists(missing='')), [[1, ''], ['', 'two']])
+
+    def test_spilled_rows_read_back_from_disk(self):
+        buffer = ResultBuffer(memory_limit=64)
+        rows = [{'text': 'ü' * 20, 'index': index} for index in range(50)]
+        for row in rows:
+            buffer.append(row)
+        self.assertGreater(buffer.spills, 0)
+        self.assertGreater(buffer.spilled_bytes, 0)
+        self.assertEqual(list(buffer), rows)
+        buffer.update(3, {'text': 'new'})
+        self.assertEqual(buffer.get(3, 'text'), 'new')
+        buffer.close()
+
+    def test_spill_drops_replaced_cells(self):
+        buffer = ResultBuffer(memory_limit=1000)
+        buffer.append({'text': 'a' * 100})
+        for round_number in range(9):
+            buffer.update(0, {'text': str(round_number) * 100})
+        buffer.append({'text': 'b' * 100})
+        # Only the live cell was written out, not the nine it replaced; the new one stays in memory
+        self.assertEqual(buffer.spills, 1)
+        self.assertEqual(buffer.spilled_bytes, 100)
+        self.assertEqual([row['text'] for row in buffer], ['8' * 100, 'b' * 100])
+        buffer.discard(1, 'text')
+        buffer.append({'text': 'c' * 900})
+        self.assertEqual(list(buffer), [{'text': '8' * 100}, {}, {'text': 'c' * 900}])
+
+
+if __name__ == '__main__':
+    unittest.main()
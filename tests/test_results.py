@@ -0,0 +1,62 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import results
+from results import ResultsFile, write_json_rows
+
+ROWS = [{'title': 'a, "quoted" [x]', 'tags': ['b', 'c']}, {'title': 'back\\slash {}', 'price': 2}, {}]
+
+
+class ResultsFileTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir, True)
+        self.path = os.path.join(self.output_dir, 'scraped_data.json')
+
+    def rows(self, offset=0, limit=None):
+        return [json.loads(row) for row in ResultsFile(self.path).rows(offset, limit)]
+
+    def test_rows_written_one_per_line_are_paged_from_the_index(self):
+        self.assertEqual(write_json_rows(self.path, ROWS), 3)
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), ROWS)
+        self.assertEqual(ResultsFile(self.path).row_count, 3)
+        self.assertEqual(self.rows(1, 5), ROWS[1:])
+
+    def test_indented_file_is_indexed_without_being_rewritten(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(ROWS, f, indent=4)
+        with open(self.path, 'rb') as f:
+            original = f.read()
+        self.assertEqual(self.rows(), ROWS)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), original)
+        self.assertTrue(os.path.exists(self.path + results.RESULTS_INDEX_SUFFIX))
+
+    def test_rows_spanning_scan_chunks(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(ROWS * 5, f, indent=2)
+        chunk_size = results.SCAN_CHUNK_SIZE
+        results.SCAN_CHUNK_SIZE = 3
+        self.addCleanup(setattr, results, 'SCAN_CHUNK_SIZE', chunk_size)
+        self.assertEqual(self.rows(4, 4), (ROWS * 5)[4:8])
+
+    def test_index_is_rebuilt_when_the_file_changes(self):
+        write_json_rows(self.path, ROWS)
+        self.assertEqual(ResultsFile(self.path).row_count, 3)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(ROWS[:2], f, indent=2)
+        self.assertEqual(self.rows(), ROWS[:2])
+
+    def test_non_array_file_is_rejected(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'rows': ROWS}, f)
+        with self.assertRaises(ValueError):
+            ResultsFile(self.path).row_count
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from job_store import JobStore
+from retention import RetentionEngine, RetentionPolicy, thaw
+
+KB = 1024 / (1024 * 1024)  # one KiB in the MB units RetentionPolicy takes
+
+
+class RetentionEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.output_root = os.path.join(self.root, 'output')
+        os.makedirs(self.output_root)
+        self.store = JobStore(os.path.join(self.root, 'jobs.sqlite'))
+        self.now = datetime.now()
+
+    def add_job(self, job_id, user_id, days_ago, status='completed', size=1024):
+        path = self.write_output(job_id, size)
+        finished = self.now - timedelta(days=days_ago)
+        self.store.create(job_id, user_id, status, finished - timedelta(minutes=5), output_dir=path,
+                          completed_at=finished if status == 'completed' else None)
+        return path
+
+    def write_output(self, job_id, size=1024):
+        path = os.path.join(self.output_root, job_id)
+        os.makedirs(path)
+        with open(os.path.join(path, 'scraped_data.xlsx'), 'wb') as f:
+            f.write(b'x' * size)
+        return path
+
+    def sweep(self, **policy):
+        policy.setdefault('compact_after_hours', 0)
+        RetentionEngine(self.store, RetentionPolicy(**policy), output_root=self.output_root,
+                        temp_root=os.path.join(self.root, 'temp')).sweep()
+        return sorted(os.listdir(self.output_root))
+
+    def test_user_quota_evicts_that_users_oldest_jobs(self):
+        self.add_job('a-old', 'alice', 3)
+        self.add_job('a-mid', 'alice', 2)
+        self.add_job('a-new', 'alice', 1)
+        self.add_job('b-old', 'bob', 4)
+        self.assertEqual(self.sweep(max_user_mb=2 * KB), ['a-mid', 'a-new', 'b-old'])
+        self.assertIsNotNone(self.store.get('a-old')['evicted_at'])
+
+    def test_total_quota_evicts_the_oldest_jobs_overall(self):
+        self.add_job('a-old', 'alice', 3)
+        self.add_job('b-old', 'bob', 4)
+        self.add_job('a-new', 'alice', 1)
+        self.assertEqual(self.sweep(max_total_mb=1.5 * KB), ['a-new'])
+
+    def test_max_age_only_applies_when_set(self):
+        self.add_job('ancient', 'alice', 400)
+        self.add_job('recent', 'alice', 1)
+        self.assertEqual(self.sweep(), ['ancient', 'recent'])
+        self.assertEqual(self.sweep(max_age_days=30), ['recent'])
+
+    def test_unfinished_jobs_are_never_evicted(self):
+        self.add_job('running', 'alice', 400, status='running')
+        self.add_job('done', 'alice', 1)
+        self.assertEqual(self.sweep(max_age_days=30, max_total_mb=KB / 2), ['running'])
+
+    def test_legacy_directories_without_a_record_are_evicted_oldest_first(self):
+        legacy = self.write_output('legacy')
+        old = time.time() - 10 * 86400
+        os.utime(legacy, (old, old))
+        self.add_job('recorded', 'alice', 1)
+        self.assertEqual(self.sweep(max_total_mb=1.5 * KB), ['recorded'])
+
+    def test_compacted_files_are_restored_by_thaw(self):
+        path = self.add_job('cold', 'alice', 2)
+        results = os.path.join(path, 'scraped_data.json')
+        with open(results, 'w', encoding='utf-8') as f:
+            f.write('[\n{"title": "a"}\n]\n')
+        with open(results + '.idx', 'wb') as f:
+            f.write(b'stale')
+        mtime_ns = os.stat(results).st_mtime_ns
+
+        self.sweep(compact_after_hours=24)
+        self.assertFalse(os.path.exists(results))
+        self.assertTrue(os.path.exists(results + '.gz'))
+        self.assertFalse(os.path.exists(results + '.idx'))
+        self.assertIsNotNone(self.store.get('cold')['compacted_at'])
+
+        self.assertEqual(thaw(results), results)
+        with open(results, encoding='utf-8') as f:
+            self.assertEqual(f.read(), '[\n{"title": "a"}\n]\n')
+        self.assertEqual(os.stat(results).st_mtime_ns, mtime_ns)
+        self.assertFalse(os.path.exists(results + '.gz'))
+        self.assertIsNone(thaw(os.path.join(path, 'missing.json')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import threading
+import unittest
+
+from scheduler import JobScheduler, QueueFullError
+
+
+class Job:
+    def __init__(self, job_id, user_id):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.browser_slots = None
+
+
+class RecordingRun:
+    """Run callable that records the order jobs start in and holds them until released"""
+    def __init__(self):
+        self.started = []
+        self.release = threading.Event()
+        self._condition = threading.Condition()
+
+    def __call__(self, job):
+        with self._condition:
+            self.started.append(job)
+            self._condition.notify_all()
+        self.release.wait(5)
+
+    def wait_for(self, count, timeout=5):
+        with self._condition:
+            self._condition.wait_for(lambda: len(self.started) >= count, timeout=timeout)
+        return [job.job_id for job in self.started]
+
+
+class QueueOrderTest(unittest.TestCase):
+    def test_positions_rotate_between_users_within_a_priority(self):
+        scheduler = JobScheduler(lambda job: None, slots=1)
+        for job_id in ('a1', 'a2', 'a3'):
+            scheduler.submit(Job(job_id, 'alice'))
+        scheduler.submit(Job('b1', 'bob'))
+        scheduler.submit(Job('urgent', 'carol'), priority=5)
+        order = sorted(('a1', 'a2', 'a3', 'b1', 'urgent'), key=scheduler.position)
+        self.assertEqual(order, ['urgent', 'a1', 'b1', 'a2', 'a3'])
+
+    def test_user_limit_pushes_jobs_back(self):
+        scheduler = JobScheduler(lambda job: None, slots=4)
+        scheduler.submit(Job('a1', 'alice'), user_limit=1)
+        scheduler.submit(Job('a2', 'alice'), user_limit=1)
+        scheduler.submit(Job('b1', 'bob'), user_limit=1)
+        self.assertEqual([scheduler.position(job_id) for job_id in ('a1', 'b1', 'a2')], [1, 2, 3])
+
+    def test_full_queue_rejects(self):
+        scheduler = JobScheduler(lambda job: None, slots=1, max_queued=1)
+        scheduler.submit(Job('a1', 'alice'))
+        with self.assertRaises(QueueFullError):
+            scheduler.submit(Job('a2', 'alice'))
+        self.assertEqual(scheduler.rejected, 1)
+
+    def test_cancel_removes_a_queued_job(self):
+        scheduler = JobScheduler(lambda job: None, slots=1)
+        scheduler.submit(Job('a1', 'alice'))
+        self.assertTrue(scheduler.cancel('a1'))
+        self.assertFalse(scheduler.cancel('a1'))
+        self.assertIsNone(scheduler.position('a1'))
+
+
+class DispatchTest(unittest.TestCase):
+    def setUp(self):
+        self.run = RecordingRun()
+        self.addCleanup(self.run.release.set)
+
+    def test_jobs_start_in_position_order(self):
+        scheduler = JobScheduler(self.run, slots=1)
+        for job_id, user_id in (('a1', 'alice'), ('a2', 'alice'), ('b1', 'bob')):
+            scheduler.submit(Job(job_id, user_id))
+        scheduler.start()
+        self.assertEqual(self.run.wait_for(1), ['a1'])
+        self.run.release.set()
+        self.assertEqual(self.run.wait_for(3), ['a1', 'b1', 'a2'])
+
+    def test_browser_grants_stay_within_the_slots(self):
+        scheduler = JobScheduler(self.run, slots=4)
+        for job_id in ('j1', 'j2', 'j3'):
+            scheduler.submit(Job(job_id, job_id), browsers=3)
+        scheduler.start()
+        self.run.wait_for(2)
+        self.assertEqual([job.browser_slots for job in self.run.started], [3, 1])
+        self.assertEqual(scheduler.slots_used, 4)
+
+    def test_max_jobs_caps_running_jobs(self):
+        scheduler = JobScheduler(self.run, slots=4, max_jobs=1)
+        scheduler.submit(Job('a1', 'alice'))
+        scheduler.submit(Job('b1', 'bob'))
+        scheduler.start()
+        self.assertEqual(self.run.wait_for(2, timeout=0.5), ['a1'])
+        self.assertEqual(scheduler.running_count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,339 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from multiprocessing.connection import Client, Listener
+
+logger = logging.getLogger(__name__)
+
+AUTHKEY_ENV = 'SCRAPER_WORKER_AUTHKEY'
+# A worker that has not reported ready by then (e.g. Chrome hung on start-up) is replaced
+WORKER_START_TIMEOUT = 120
+# How long a terminated worker gets to quit its browser before its process group is killed
+WORKER_STOP_TIMEOUT = 15
+# How often a caller waiting for an idle worker checks for workers that died starting up
+IDLE_WAIT_SECONDS = 5
+
+
+class ScraperWorker:
+    """Handle on one long-lived scraper worker process"""
+    def __init__(self, worker_id, process):
+        self.worker_id = worker_id
+        self.process = process
+        self.conn = None
+        self.job_id = None
+        self.jobs_run = 0
+        self.started = time.monotonic()
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def kill(self):
+        """Kill the worker and its browser, which share its process group"""
+        try:
+            if os.name == 'posix':
+                os.killpg(self.process.pid, signal.SIGKILL)
+            else:
+                self.process.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+class ScraperWorkerPool:
+    """Pool of pre-started scraper processes that run jobs sent over a local IPC channel.
+
+    Each worker imports scrap.py once and keeps a warm Chrome session between jobs,
+    so a job only pays for navigation instead of interpreter, import and driver start-up.
+    """
+    def __init__(self, size, warm_browser=True, max_jobs_per_worker=50):
+        self.size = size
+        self.warm_browser = warm_browser
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._authkey = os.urandom(16)
+        self._listener = None
+        self._workers = {}  # Maps worker_id to ScraperWorker
+        self._running = {}  # Maps job_id to the ScraperWorker running it
+        self._waiting = set()  # Jobs waiting for an idle worker
+        self._cancelled = set()  # Waiting jobs cancelled before they got a worker
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        """Open the IPC listener and start the worker processes"""
+        self._listener = Listener(authkey=self._authkey)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        for _ in range(self.size):
+            self._spawn()
+        logger.info(f"Started scraper worker pool with {self.size} workers on {self._listener.address}")
+
+    def _spawn(self):
+        worker_id = uuid.uuid4().hex[:8]
+        env = dict(os.environ, **{AUTHKEY_ENV: self._authkey.hex()})
+        command = ['python', '-u', 'worker_pool.py', '--address', str(self._listener.address), '--worker-id', worker_id]
+        if not self.warm_browser:
+            command.append('--no-warm-browser')
+        # Own process group, so the worker's chromedriver and Chrome can be killed with it
+        process = subprocess.Popen(command, env=env, start_new_session=(os.name == 'posix'))
+        with self._lock:
+            self._workers[worker_id] = ScraperWorker(worker_id, process)
+        logger.info(f"Spawned scraper worker {worker_id} (pid {process.pid})")
+
+    def _accept_loop(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+                message = conn.recv()
+            except Exception as e:
+                if not self._closed:
+                    logger.error(f"Error accepting scraper worker connection: {str(e)}")
+                continue
+            if not isinstance(message, tuple) or message[0] != 'ready':
+                conn.close()
+                continue
+            with self._lock:
+                worker = self._workers.get(message[1])
+                if worker:
+                    worker.conn = conn
+            if not worker:
+                conn.close()
+                continue
+            self._idle.put(worker)
+            logger.info(f"Scraper worker {worker.worker_id} is ready")
+
+    def _retire(self, worker):
+        """Stop a worker and start a replacement, once per worker"""
+        with self._lock:
+            if self._workers.pop(worker.worker_id, None) is None:
+                return
+        try:
+            if worker.conn:
+                worker.conn.close()
+        except Exception:
+            pass
+        if worker.is_alive():
+            try:
+                worker.process.terminate()
+                worker.process.wait(timeout=WORKER_STOP_TIMEOUT)
+            except Exception:
+                worker.kill()
+        if not self._closed:
+            self._spawn()
+
+    def _replace_unready(self):
+        """Replace workers that died or hung before reporting ready"""
+        now = time.monotonic()
+        with self._lock:
+            stuck = [worker for worker in self._workers.values() if worker.conn is None
+                     and (not worker.is_alive() or now - worker.started > WORKER_START_TIMEOUT)]
+        for worker in stuck:
+            logger.warning(f"Scraper worker {worker.worker_id} never became ready, replacing it")
+            worker.kill()
+            self._retire(worker)
+
+    def _acquire(self):
+        """Block until a live idle worker is available"""
+        while True:
+            try:
+                worker = self._idle.get(timeout=IDLE_WAIT_SECONDS)
+            except queue.Empty:
+                self._replace_unready()
+                continue
+            if worker.is_alive():
+                return worker
+            logger.warning(f"Scraper worker {worker.worker_id} died while idle, replacing it")
+            self._retire(worker)
+
+    def run_job(self, job_id, config_path, on_output):
+        """Run a job on the next free worker, streaming its log lines to on_output.
+
+        Returns the job's exit code, like the return code of a scrap.py subprocess.
+        A job cancelled while it waits for a worker returns -1 without running.
+        """
+        with self._lock:
+            self._waiting.add(job_id)
+        worker = self._acquire()
+        with self._lock:
+            self._waiting.discard(job_id)
+            cancelled = job_id in self._cancelled
+            self._cancelled.discard(job_id)
+            if not cancelled:
+                self._running[job_id] = worker
+        if cancelled:
+            logger.info(f"Job {job_id} was cancelled while waiting for a scraper worker")
+            self._idle.put(worker)
+            return -1
+        worker.job_id = job_id
+
+        return_code = None
+        try:
+            worker.conn.send(('run', job_id, os.path.abspath(config_path)))
+            while True:
+                message = worker.conn.recv()
+                if message[0] == 'log':
+                    on_output(message[1])
+                elif message[0] == 'logs':
+                    for line in message[1]:
+                        on_output(line)
+                elif message[0] == 'done':
+                    return_code = message[2]
+                    break
+        except (EOFError, OSError) as e:
+            logger.warning(f"Lost scraper worker {worker.worker_id} while running job {job_id}: {str(e)}")
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+            worker.job_id = None
+
+        if return_code is None:
+            # The worker crashed or was cancelled; report it like a killed subprocess
+            return_code = worker.process.poll()
+            if return_code is None or return_code == 0:
+                return_code = -1
+            self._retire(worker)
+            return return_code
+
+        worker.jobs_run += 1
+        if self.max_jobs_per_worker and worker.jobs_run >= self.max_jobs_per_worker:
+            # Recycle workers periodically so browser memory growth stays bounded
+            self._retire(worker)
+        else:
+            self._idle.put(worker)
+        return return_code
+
+    def cancel(self, job_id):
+        """Stop the worker running a job; the pool replaces it with a fresh one.
+
+        The worker quits its browser on SIGTERM; if it is still running after
+        WORKER_STOP_TIMEOUT, it is killed together with the browser.
+        """
+        with self._lock:
+            worker = self._running.get(job_id)
+            if not worker and job_id in self._waiting:
+                self._cancelled.add(job_id)
+                return True
+        if not worker:
+            return False
+        logger.info(f"Cancelling job {job_id} on scraper worker {worker.worker_id}")
+        try:
+            worker.process.terminate()
+        except Exception as e:
+            logger.error(f"Error terminating scraper worker {worker.worker_id}: {str(e)}")
+        timer = threading.Timer(WORKER_STOP_TIMEOUT, lambda: worker.is_alive() and worker.kill())
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def shutdown(self):
+        """Kill every worker process"""
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            worker.kill()
+        try:
+            self._listener.close()
+        except Exception:
+            pass
+
+
+class PipeLogHandler(logging.Handler):
+    """Logging handler that forwards formatted records to the pool over the worker connection"""
+    def __init__(self, conn, send_lock):
+        super().__init__()
+        self.conn = conn
+        self.send_lock = send_lock
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+            with self.send_lock:
+                self.conn.send(('log', message))
+        except Exception:
+            self.handleError(record)
+
+    def emit_batch(self, records):
+        """Send a whole buffered batch as a single IPC message"""
+        try:
+            messages = [self.format(record) for record in records if self.filter(record)]
+            if messages:
+                with self.send_lock:
+                    self.conn.send(('logs', messages))
+        except Exception:
+            self.handleError(records[-1])
+
+
+def _exit_on_sigterm(signum, frame):
+    # Unwinds the running job, so the finally blocks quit its browser
+    raise SystemExit(128 + signum)
+
+
+def worker_main(address, worker_id, warm_browser=True):
+    """Entry point of a pool worker process"""
+    import scrap
+
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    conn = Client(address, authkey=bytes.fromhex(os.environ[AUTHKEY_ENV]))
+    send_lock = threading.Lock()
+    scrap.logger.redirect_stream(PipeLogHandler(conn, send_lock))
+
+    def send_metrics_line(line):
+        with send_lock:
+            conn.send(('log', line))
+    scrap.metrics.sink = send_metrics_line
+
+    driver = None
+    if warm_browser:
+        try:
+            driver = scrap.setup_driver(headless=True)
+        except Exception as e:
+            scrap.logger.log(f"Could not start warm browser, jobs will start their own: {str(e)}", level=logging.WARNING)
+
+    with send_lock:
+        conn.send(('ready', worker_id, os.getpid()))
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message[0] == 'shutdown':
+                break
+
+            _, job_id, config_path = message
+            try:
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+                if warm_browser:
+                    driver = scrap.reset_driver(driver, headless=True)
+                return_code = scrap.run_config(config, driver=driver)
+            except Exception as e:
+                scrap.logger.log(f"Fatal error in worker {worker_id}: {str(e)}", level=logging.ERROR)
+                return_code = 1
+
+            with send_lock:
+                conn.send(('done', job_id, return_code))
+    finally:
+        if driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scraper pool worker')
+    parser.add_argument('--address', required=True, help='Address of the pool IPC listener')
+    parser.add_argument('--worker-id', required=True, help='Identifier assigned by the pool')
+    parser.add_argument('--no-warm-browser', action='store_true', help='Start a new browser for every job')
+    args = parser.parse_args()
+    worker_main(args.address, args.worker_id, warm_browser=not args.no_warm_browser)
+    sys.exit(0)